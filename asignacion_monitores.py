@@ -1,431 +1,285 @@
+import os
 import sys
-import pandas as pd
-import re
+import time
+
+T_INICIO = time.perf_counter()
+
 from PySide6.QtWidgets import (
-    QApplication, QWidget, QPushButton, QVBoxLayout, 
+    QApplication, QWidget, QPushButton, QVBoxLayout,
     QHBoxLayout, QTableView, QFileDialog, QLabel, QMessageBox,
-    QProgressBar, QTextEdit
+    QProgressBar, QTextEdit, QSpinBox, QInputDialog, QComboBox, QCheckBox
 )
-from PySide6.QtCore import Qt, QAbstractTableModel, QThread, Signal
+from PySide6.QtCore import Qt, QAbstractTableModel, QThread, Signal, QTimer
 from PySide6.QtGui import QFont
 
 
 # ========================================================
-# CONFIGURACIÓN
-# ========================================================
-CONFIG = {
-    "monitores": {
-        "header_row": 4,
-        "data_start_row": 5,
-        "col_nombre": "Nombre completo",
-        "col_min": None,
-        "col_max": None,
-        "horas_min_default": 8,
-        "horas_max_default": 20
-    },
-    "espacios": {
-        "col_sala": "SALA",
-        "col_dia": "DIA",
-        "col_hora_inicio": "HORA_INICIO",
-        "col_hora_fin": "HORA_FIN",
-        "col_curso": "CURSO"
-    },
-    "asignacion": {
-        "balancear_carga": True,
-        "priorizar_minimo": True,
-        "max_horas_seguidas": 4,
-        "descanso_minimo": 1,
-        "permitir_sobrepasar_max": False
-    }
-}
-
-
-# ========================================================
-# FUNCIONES DE LÓGICA DE ASIGNACIÓN
+# CARGA DIFERIDA DEL MOTOR
 # ========================================================
+#
+# pandas, numpy, openpyxl y el algoritmo viven en motor_asignacion.py y se
+# importan en segundo plano cuando la ventana ya está visible (o en el
+# primer uso, si el usuario se adelanta: el import espera al que ya corre).
+# Los nombres del motor se siguen pudiendo importar desde este módulo.
 
-def parse_time_str(time_str):
-    """Convierte '7:00am' -> 7, '2:00pm' -> 14"""
-    if pd.isna(time_str):
-        return None
-    
-    s = str(time_str).strip().lower()
-    match = re.search(r'(\d{1,2})(?::(\d{2}))?\s*(am|pm)', s)
-    if match:
-        hour = int(match.group(1))
-        meridiem = match.group(3)
-        
-        if meridiem == 'pm' and hour != 12:
-            hour += 12
-        elif meridiem == 'am' and hour == 12:
-            hour = 0
-        
-        return hour
-    
-    match = re.search(r'\d+', s)
-    if match:
-        return int(match.group(0))
-    
-    return None
-
+def __getattr__(nombre):
+    import motor_asignacion
+    try:
+        return getattr(motor_asignacion, nombre)
+    except AttributeError:
+        raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}") from None
 
-def parse_range_cell(cell_value):
-    """Convierte '7:00am-1:00pm' -> [(7, 13)]"""
-    if pd.isna(cell_value):
-        return []
-    
-    s = str(cell_value).strip().lower()
-    
-    if s in ["libre", "disponible", "todo el día", "todo el dia"]:
-        return [(7, 22)]
-    
-    if s in ["no disponible", "no", "n/a", "", "nan"]:
-        return []
-    
-    ranges = []
-    pattern = r'(\d{1,2}(?::\d{2})?\s*(?:am|pm)?)\s*-\s*(\d{1,2}(?::\d{2})?\s*(?:am|pm)?)'
-    
-    matches = re.findall(pattern, s)
-    for match in matches:
-        start = parse_time_str(match[0])
-        end = parse_time_str(match[1])
-        
-        if start is not None and end is not None:
-            ranges.append((start, end))
-    
-    return ranges
-
-
-def normalizar_dia(dia):
-    """Normaliza nombres de días"""
-    if pd.isna(dia):
-        return None
-    
-    d = str(dia).strip().lower()
-    d = d.replace('á', 'a').replace('é', 'e').replace('í', 'i').replace('ó', 'o').replace('ú', 'u')
-    d = re.sub(r'[^a-z]', '', d)
-    
-    mapeo = {
-        'lun': 'lunes',
-        'mar': 'martes',
-        'mie': 'miercoles',
-        'jue': 'jueves',
-        'vie': 'viernes',
-        'sab': 'sabado',
-        'dom': 'domingo'
-    }
-    
-    for abrev, completo in mapeo.items():
-        if d.startswith(abrev):
-            return completo
-    
-    if d in mapeo.values():
-        return d
-    
-    return d if len(d) >= 3 else None
 
+class PrecargaThread(QThread):
+    listo = Signal(float)
 
-def cargar_monitores_desde_excel(ruta):
-    """Carga monitores desde Excel"""
-    cfg = CONFIG["monitores"]
-    
-    df_raw = pd.read_excel(ruta, sheet_name=0, header=None)
-    
-    dias_row = df_raw.iloc[3]
-    jornadas_row = df_raw.iloc[cfg["header_row"]]
-    
-    col_mapping = {}
-    current_dia = None
-    col_nombre_idx = None
-    
-    for idx, val in enumerate(jornadas_row):
-        val_str = str(val).strip()
-        
-        if val_str == cfg["col_nombre"]:
-            col_nombre_idx = idx
-        
-        dia_val = dias_row[idx] if idx < len(dias_row) else None
-        if pd.notna(dia_val) and str(dia_val).strip():
-            current_dia = normalizar_dia(dia_val)
-        
-        val_lower = val_str.lower()
-        if val_lower in ['mañana', 'manana', 'tarde', 'noche']:
-            if current_dia:
-                key = f"{current_dia}_{val_lower}"
-                col_mapping[key] = idx
-    
-    if col_nombre_idx is None:
-        raise ValueError(f"No se encuentra la columna '{cfg['col_nombre']}'")
-    
-    monitores = []
-    
-    for row_idx in range(cfg["data_start_row"], len(df_raw)):
-        row = df_raw.iloc[row_idx]
-        
-        nombre = row[col_nombre_idx]
-        if pd.isna(nombre) or str(nombre).strip() == "":
-            continue
-        
-        mon = {
-            "id": row_idx - cfg["data_start_row"],
-            "nombre": str(nombre).strip(),
-            "min": cfg["horas_min_default"],
-            "max": cfg["horas_max_default"],
-            "horas": 0,
-            "disp": {},
-            "asignaciones": []
-        }
-        
-        dias_unicos = set(k.split('_')[0] for k in col_mapping.keys())
-        
-        for dia in dias_unicos:
-            mon["disp"][dia] = []
-            
-            for jornada in ['mañana', 'manana', 'tarde', 'noche']:
-                key = f"{dia}_{jornada}"
-                if key in col_mapping:
-                    col_idx = col_mapping[key]
-                    ranges = parse_range_cell(row[col_idx])
-                    mon["disp"][dia].extend(ranges)
-        
-        monitores.append(mon)
-    
-    return monitores
+    def run(self):
+        import openpyxl  # noqa: F401  (lo usan read_excel y la exportación)
+        import motor_asignacion  # noqa: F401
+        self.listo.emit((time.perf_counter() - T_INICIO) * 1000)
 
 
-def cargar_espacios_desde_excel(ruta):
-    """Carga espacios desde Excel"""
-    cfg = CONFIG["espacios"]
-    
-    df = pd.read_excel(ruta, sheet_name=0)
-    
-    columnas_req = [cfg["col_sala"], cfg["col_dia"], cfg["col_hora_inicio"], 
-                    cfg["col_hora_fin"], cfg["col_curso"]]
-    
-    faltantes = [col for col in columnas_req if col not in df.columns]
-    if faltantes:
-        raise ValueError(f"Columnas no encontradas: {faltantes}")
-    
-    df['DIA_NORM'] = df[cfg["col_dia"]].apply(normalizar_dia)
-    df['DURACION'] = df[cfg["col_hora_fin"]] - df[cfg["col_hora_inicio"]]
-    
-    return df
+# ========================================================
+# MODELO PARA TABLA
+# ========================================================
+class PandasModel(QAbstractTableModel):
+    def __init__(self, df):
+        super().__init__()
+        self._df = df
 
+    def rowCount(self, parent=None):
+        return self._df.shape[0]
 
-def esta_disponible(monitor, dia, hora_inicio, hora_fin):
-    """Verifica disponibilidad del monitor"""
-    if dia not in monitor["disp"]:
-        return False
-    
-    for r_inicio, r_fin in monitor["disp"][dia]:
-        if hora_inicio >= r_inicio and hora_fin <= r_fin:
-            return True
-    
-    return False
+    def columnCount(self, parent=None):
+        return self._df.shape[1]
 
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole:
+            return str(self._df.iat[index.row(), index.column()])
 
-def verificar_restricciones(monitor, dia, hora_inicio, hora_fin):
-    """Verifica restricciones adicionales"""
-    cfg = CONFIG["asignacion"]
-    
-    if not cfg.get("max_horas_seguidas"):
-        return True
-    
-    for asig in monitor["asignaciones"]:
-        if asig["dia"] == dia:
-            if (hora_inicio <= asig["fin"] and hora_fin >= asig["inicio"]):
-                duracion_total = max(hora_fin, asig["fin"]) - min(hora_inicio, asig["inicio"])
-                if duracion_total > cfg["max_horas_seguidas"]:
-                    return False
-    
-    return True
+    def headerData(self, section, orientation, role):
+        if role == Qt.DisplayRole:
+            if orientation == Qt.Horizontal:
+                return self._df.columns[section]
+            return section
 
 
-def asignar_monitores(monitores, df_espacios):
-    """Algoritmo principal de asignación"""
-    cfg_asig = CONFIG["asignacion"]
-    cfg_esp = CONFIG["espacios"]
-    
-    asignaciones = []
-    sin_monitor = []
-    
-    espacios = df_espacios.to_dict('records')
-    
-    # Fase 1: Priorizar mínimo
-    if cfg_asig.get("priorizar_minimo"):
-        for espacio in espacios:
-            dia = espacio['DIA_NORM']
-            if pd.isna(dia):
-                continue
-                
-            inicio = espacio[cfg_esp["col_hora_inicio"]]
-            fin = espacio[cfg_esp["col_hora_fin"]]
-            duracion = espacio['DURACION']
-            
-            candidatos = [
-                m for m in monitores
-                if m["horas"] < m["min"]
-                and m["horas"] + duracion <= m["max"]
-                and esta_disponible(m, dia, inicio, fin)
-                and verificar_restricciones(m, dia, inicio, fin)
-            ]
-            
-            if candidatos:
-                candidatos.sort(key=lambda x: x["min"] - x["horas"], reverse=True)
-                elegido = candidatos[0]
-                
-                elegido["horas"] += duracion
-                elegido["asignaciones"].append({
-                    "dia": dia,
-                    "inicio": inicio,
-                    "fin": fin
-                })
-                
-                asignaciones.append({
-                    **espacio,
-                    "MONITOR": elegido["nombre"],
-                    "ESTADO": "✅"
-                })
-    
-    # Fase 2: Asignar restantes
-    for espacio in espacios:
-        dia = espacio['DIA_NORM']
-        if pd.isna(dia):
-            sin_monitor.append(espacio)
-            asignaciones.append({
-                **espacio,
-                "MONITOR": "DÍA INVÁLIDO",
-                "ESTADO": "❌"
-            })
-            continue
-            
-        ya_asignado = any(
-            a.get(cfg_esp["col_sala"]) == espacio[cfg_esp["col_sala"]] and
-            a.get('DIA_NORM') == espacio['DIA_NORM'] and
-            a.get(cfg_esp["col_hora_inicio"]) == espacio[cfg_esp["col_hora_inicio"]]
-            for a in asignaciones
-        )
-        
-        if ya_asignado:
-            continue
-        
-        inicio = espacio[cfg_esp["col_hora_inicio"]]
-        fin = espacio[cfg_esp["col_hora_fin"]]
-        duracion = espacio['DURACION']
-        
-        candidatos = [
-            m for m in monitores
-            if m["horas"] + duracion <= m["max"]
-            and esta_disponible(m, dia, inicio, fin)
-            and verificar_restricciones(m, dia, inicio, fin)
-        ]
-        
-        if not candidatos:
-            sin_monitor.append(espacio)
-            asignaciones.append({
-                **espacio,
-                "MONITOR": "SIN MONITOR",
-                "ESTADO": "❌"
-            })
-            continue
-        
-        if cfg_asig.get("balancear_carga"):
-            candidatos.sort(key=lambda x: x["horas"])
-        
-        elegido = candidatos[0]
-        elegido["horas"] += duracion
-        elegido["asignaciones"].append({
-            "dia": dia,
-            "inicio": inicio,
-            "fin": fin
-        })
-        
-        asignaciones.append({
-            **espacio,
-            "MONITOR": elegido["nombre"],
-            "ESTADO": "✅"
-        })
+class ResultadosModel(QAbstractTableModel):
+    """
+    Tabla de resultados con orden y filtros precalculados.
     
-    return asignaciones, sin_monitor, monitores
+    Cada columna filtrable se factoriza una vez en códigos enteros y el
+    orden por columna se calcula con argsort la primera vez que se pide.
+    Filtrar u ordenar solo rehace el arreglo de filas visibles con numpy;
+    data() lee de los textos de la columna, armados al mostrarla.
+    """
 
+    def __init__(self, df, columnas_filtro=()):
+        import numpy as np
+        import pandas as pd
 
-# ========================================================
-# MODELO PARA TABLA
-# ========================================================
-class PandasModel(QAbstractTableModel):
-    def __init__(self, df=pd.DataFrame()):
         super().__init__()
         self._df = df
+        self._texto = {}
+        self._ordenes = {}
+        self._codigos = {}
+        self._codigo_de = {}
+        self.opciones = {}
+        
+        for col in columnas_filtro:
+            codigos, valores = pd.factorize(df[col], sort=True)
+            self._codigos[col] = codigos
+            self.opciones[col] = [str(v) for v in valores]
+            self._codigo_de[col] = {texto: k for k, texto in enumerate(self.opciones[col])}
+        
+        self._orden = np.arange(len(df))
+        self._mascara = np.ones(len(df), dtype=bool)
+        self._filas = self._orden
+
+    def _recalcular(self):
+        self.beginResetModel()
+        self._filas = self._orden[self._mascara[self._orden]]
+        self.endResetModel()
+
+    def filtrar(self, filtros):
+        """filtros: columna -> valor mostrado (None = sin filtro)"""
+        import numpy as np
+
+        mascara = np.ones(len(self._df), dtype=bool)
+        for col, valor in filtros.items():
+            if valor is not None:
+                mascara &= self._codigos[col] == self._codigo_de[col].get(valor, -2)
+        self._mascara = mascara
+        self._recalcular()
+
+    def filas_visibles(self):
+        return len(self._filas)
+
+    def fila_df(self, row):
+        """Posición en el DataFrame de la fila visible 'row'"""
+        return int(self._filas[row])
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        import numpy as np
+        import pandas as pd
+
+        if column < 0:
+            self._orden = np.arange(len(self._df))
+        else:
+            if column not in self._ordenes:
+                serie = self._df.iloc[:, column]
+                if isinstance(serie.dtype, pd.CategoricalDtype):
+                    claves = serie.cat.codes.to_numpy()
+                elif pd.api.types.is_numeric_dtype(serie):
+                    claves = serie.to_numpy()
+                else:
+                    claves = pd.factorize(serie.astype(str), sort=True)[0]
+                self._ordenes[column] = np.argsort(claves, kind='stable')
+            
+            orden = self._ordenes[column]
+            self._orden = orden if order == Qt.AscendingOrder else orden[::-1]
+        self._recalcular()
 
     def rowCount(self, parent=None):
-        return self._df.shape[0]
+        return len(self._filas)
 
     def columnCount(self, parent=None):
         return self._df.shape[1]
 
     def data(self, index, role=Qt.DisplayRole):
         if role == Qt.DisplayRole:
-            return str(self._df.iat[index.row(), index.column()])
+            col = index.column()
+            if col not in self._texto:
+                self._texto[col] = self._df.iloc[:, col].astype(str).to_numpy()
+            return self._texto[col][self._filas[index.row()]]
 
     def headerData(self, section, orientation, role):
         if role == Qt.DisplayRole:
             if orientation == Qt.Horizontal:
                 return self._df.columns[section]
-            return section
+            return int(self._filas[section])
 
 
 # ========================================================
 # HILO PARA PROCESAMIENTO
 # ========================================================
 class AsignacionThread(QThread):
-    finished = Signal(pd.DataFrame, list, str)
+    finished = Signal(object, list, str, dict)
     error = Signal(str)
     progress = Signal(str)
+    mejora = Signal(dict)
     
-    def __init__(self, monitores, df_espacios):
+    def __init__(self, monitores, df_espacios, presupuesto=0, previo=None, trazar=False, cache=None):
         super().__init__()
         self.monitores = monitores
         self.df_espacios = df_espacios
+        self.presupuesto = presupuesto
+        self.previo = previo
+        self.trazar = trazar
+        self.cache = cache
+        self._detener = False
+    
+    def detener(self):
+        """Pide cortar la búsqueda; se conserva la mejor solución hasta ahora"""
+        self._detener = True
     
     def run(self):
         try:
+            from motor_asignacion import (
+                CONFIG, IndiceDisponibilidad, TrazaDecisiones, cota_superior_cobertura, asignar_monitores,
+                asignar_con_presupuesto, asignar_por_dia, diagnosticar_sin_monitor, generar_reporte,
+                ruta_checkpoint
+            )
+
             self.progress.emit("🔄 Iniciando asignación...")
             
-            asignaciones, sin_monitor, monitores = asignar_monitores(
-                self.monitores, 
-                self.df_espacios
-            )
+            # Una búsqueda con presupuesto depende del reloj (cuántas vueltas
+            # alcanza a dar), así que no se guarda ni se reutiliza
+            clave = None
+            if self.cache is not None and not self.presupuesto:
+                if self.previo is not None:
+                    modo = "previo"
+                else:
+                    modo = "por_dia" if CONFIG["asignacion"].get("particionar_por_dia") else "normal"
+                clave = self.cache.clave(self.monitores, self.df_espacios, modo,
+                                         previo=self.previo, traza=self.trazar)
+                guardada = self.cache.obtener(clave)
+                if guardada is not None:
+                    self.progress.emit("⚡ Mismas entradas que una corrida anterior")
+                    self.finished.emit(guardada["df_resultado"], guardada["monitores"], guardada["reporte"], {
+                        "diagnostico": guardada["diagnostico"],
+                        "cota_superior": guardada["cota_superior"],
+                        "traza": guardada["traza"],
+                        "desde_cache": True
+                    })
+                    return
+            
+            traza = TrazaDecisiones() if self.trazar else None
+            indice = IndiceDisponibilidad(self.monitores)
+            
+            if self.previo is not None:
+                df_result, sin_monitor, monitores = asignar_monitores(
+                    self.monitores,
+                    self.df_espacios,
+                    indice=indice,
+                    previo=self.previo,
+                    traza=traza
+                )
+            elif self.presupuesto:
+                # Punto de control en el temporal, uno por entradas: cerrar la
+                # ventana no pierde la búsqueda y otra ventana no la pisa
+                checkpoint = CONFIG["asignacion"].get("checkpoint") or ruta_checkpoint(
+                    self.monitores, self.df_espacios
+                )
+                df_result, sin_monitor, monitores = asignar_con_presupuesto(
+                    self.monitores,
+                    self.df_espacios,
+                    self.presupuesto,
+                    indice=indice,
+                    al_mejorar=self.mejora.emit,
+                    detener=lambda: self._detener,
+                    traza=traza,
+                    checkpoint=checkpoint
+                )
+            elif CONFIG["asignacion"].get("particionar_por_dia"):
+                df_result, sin_monitor, monitores = asignar_por_dia(
+                    self.monitores,
+                    self.df_espacios,
+                    indice=indice,
+                    traza=traza
+                )
+            else:
+                df_result, sin_monitor, monitores = asignar_monitores(
+                    self.monitores, 
+                    self.df_espacios,
+                    indice=indice,
+                    traza=traza
+                )
             
-            df_result = pd.DataFrame(asignaciones)
+            cota = cota_superior_cobertura(monitores, df_result, indice)
             
-            # Generar reporte
-            exitosos = len([a for a in asignaciones if a["ESTADO"] == "✅"])
-            total = len(asignaciones)
+            t0 = time.perf_counter()
+            df_diagnostico = diagnosticar_sin_monitor(sin_monitor, monitores, indice)
+            ms_diagnostico = (time.perf_counter() - t0) * 1000
             
-            reporte = f"""
-📊 REPORTE DE ASIGNACIÓN
-{'='*50}
-
-🎯 Resumen:
-   Total horarios: {total}
-   Asignados: {exitosos} ({exitosos*100/total:.1f}%)
-   Sin monitor: {len(sin_monitor)} ({len(sin_monitor)*100/total:.1f}%)
-
-👥 Monitores:
-"""
+            reporte = generar_reporte(df_result, monitores, sin_monitor, cota, df_diagnostico, ms_diagnostico)
             
-            for m in sorted(monitores, key=lambda x: x["horas"], reverse=True):
-                if m["horas"] > 0:
-                    status = "✅"
-                    if m["horas"] < m["min"]:
-                        status = f"⚠️ <{m['min']}h"
-                    elif m["horas"] > m["max"]:
-                        status = f"❌ >{m['max']}h"
-                    
-                    reporte += f"\n   {m['nombre'][:30]:30} | {m['horas']:2}h {status}"
+            if clave is not None:
+                self.cache.guardar(clave, {
+                    "df_resultado": df_result,
+                    "monitores": monitores,
+                    "reporte": reporte,
+                    "diagnostico": df_diagnostico,
+                    "cota_superior": cota,
+                    "traza": traza
+                })
             
             self.progress.emit("✅ Asignación completada")
-            self.finished.emit(df_result, monitores, reporte)
+            self.finished.emit(df_result, monitores, reporte, {
+                "diagnostico": df_diagnostico,
+                "cota_superior": cota,
+                "traza": traza
+            })
             
         except Exception as e:
             self.error.emit(str(e))
@@ -435,7 +289,7 @@ class AsignacionThread(QThread):
 # VENTANA PRINCIPAL
 # ========================================================
 class MainWindow(QWidget):
-    def __init__(self):
+    def __init__(self, ruta_historial=None, carpeta_cache=None):
         super().__init__()
 
         self.setWindowTitle("Gestor de Monitores – Sistema Completo")
@@ -499,16 +353,39 @@ class MainWindow(QWidget):
 
         self.btn_monitores = QPushButton("📁 Cargar Monitores")
         self.btn_espacios = QPushButton("📁 Cargar Espacios")
+        self.btn_previo = QPushButton("📎 Asignación Previa")
+        self.btn_previo.setToolTip("Resultado exportado de un semestre anterior: conserva los pares que sigan siendo factibles")
+        self.btn_traslados = QPushButton("🚶 Traslados")
+        self.btn_traslados.setToolTip("Matriz de minutos de traslado entre salas: evita clases seguidas en salas lejanas")
         self.btn_asignar = QPushButton("⚡ Asignar Automáticamente")
+        self.btn_detener = QPushButton("⏹ Detener")
         self.btn_exportar = QPushButton("💾 Exportar Resultados")
+        self.btn_historial = QPushButton("📚 Historial")
 
+        self.btn_historial.setEnabled(False)  # se habilita al cargar el motor si hay historial
         self.btn_asignar.setEnabled(False)
+        self.btn_detener.setEnabled(False)
         self.btn_exportar.setEnabled(False)
 
+        # Presupuesto de tiempo (0 = una sola pasada)
+        self.spin_presupuesto = QSpinBox()
+        self.spin_presupuesto.setRange(0, 3600)
+        self.spin_presupuesto.setSuffix(" s")
+        self.spin_presupuesto.setToolTip("Tiempo de búsqueda de mejores soluciones (0 = una pasada)")
+
+        self.chk_traza = QCheckBox("🧭 Traza")
+        self.chk_traza.setToolTip("Registra cada decisión: clic en una fila del resultado para ver por qué se eligió ese monitor")
+
         btn_layout.addWidget(self.btn_monitores)
         btn_layout.addWidget(self.btn_espacios)
+        btn_layout.addWidget(self.btn_previo)
+        btn_layout.addWidget(self.btn_traslados)
         btn_layout.addWidget(self.btn_asignar)
+        btn_layout.addWidget(self.spin_presupuesto)
+        btn_layout.addWidget(self.chk_traza)
+        btn_layout.addWidget(self.btn_detener)
         btn_layout.addWidget(self.btn_exportar)
+        btn_layout.addWidget(self.btn_historial)
 
         layout.addLayout(btn_layout)
 
@@ -534,6 +411,10 @@ class MainWindow(QWidget):
         self.lbl_estado.setStyleSheet("color: #666; padding: 5px;")
         layout.addWidget(self.lbl_estado)
 
+        # Filtros de resultados: se construyen al mostrar el primer resultado
+        self.widget_filtros = None
+        self.combos_filtro = {}
+
         # Tabla de resultados
         self.table = QTableView()
         layout.addWidget(self.table, stretch=3)
@@ -549,24 +430,114 @@ class MainWindow(QWidget):
         # Conectar funciones
         self.btn_monitores.clicked.connect(self.cargar_monitores)
         self.btn_espacios.clicked.connect(self.cargar_espacios)
+        self.btn_previo.clicked.connect(self.cargar_previo)
+        self.btn_traslados.clicked.connect(self.cargar_traslados)
         self.btn_asignar.clicked.connect(self.iniciar_asignacion)
+        self.btn_detener.clicked.connect(self.detener_asignacion)
         self.btn_exportar.clicked.connect(self.exportar)
+        self.btn_historial.clicked.connect(self.consultar_historial)
+        self.table.clicked.connect(self.explicar_fila)
 
         # Variables de datos
         self.monitores = []
-        self.df_espacios = pd.DataFrame()
-        self.df_resultado = pd.DataFrame()
+        self.df_espacios = None
+        self.df_resultado = None
+        self.df_diagnostico = None
         self.monitores_asignados = []
+        self.ruta_espacios = None
+        self.df_previo = None
+        self.modelo_resultados = None
+        self.traza = None
+        self.reporte = ""
+        self.cache_corridas = None
+        self.carpeta_cache = carpeta_cache
+        self.ruta_historial = ruta_historial
+
+        # pandas y el algoritmo se importan con la ventana ya visible
+        self.precarga = PrecargaThread()
+        self.precarga.listo.connect(self.motor_listo)
+        QTimer.singleShot(0, self.precarga.start)
+
+    def motor_listo(self, ms):
+        from motor_asignacion import CONFIG
+
+        if self.ruta_historial:
+            CONFIG["historial"]["ruta"] = self.ruta_historial
+        self.btn_historial.setEnabled(bool(CONFIG["historial"]["ruta"]))
+        self.spin_presupuesto.setValue(CONFIG["asignacion"].get("presupuesto_segundos", 0))
+
+    def _crear_filtros(self):
+        from motor_asignacion import CONFIG
+
+        self.widget_filtros = QWidget()
+        filtros_layout = QHBoxLayout()
+        filtros_layout.setContentsMargins(0, 0, 0, 0)
+        for col, etiqueta in (("MONITOR", "👤 Monitor"), (CONFIG["espacios"]["col_sala"], "🏢 Sala"),
+                              ("DIA_NORM", "📅 Día"), ("ESTADO", "Estado")):
+            combo = QComboBox()
+            combo.setMinimumWidth(120)
+            combo.currentIndexChanged.connect(self.aplicar_filtros)
+            filtros_layout.addWidget(QLabel(etiqueta))
+            filtros_layout.addWidget(combo, stretch=1 if col == "MONITOR" else 0)
+            self.combos_filtro[col] = combo
+        self.lbl_filas = QLabel()
+        filtros_layout.addWidget(self.lbl_filas)
+        self.widget_filtros.setLayout(filtros_layout)
+
+        layout = self.layout()
+        layout.insertWidget(layout.indexOf(self.table), self.widget_filtros)
+
+    def mostrar_tabla(self, df):
+        """Vista simple (vistas previas y consultas)"""
+        if self.widget_filtros is not None:
+            self.widget_filtros.setVisible(False)
+        self.table.setSortingEnabled(False)
+        self.table.setModel(PandasModel(df))
+
+    def mostrar_resultados(self, df_resultado):
+        """Vista de resultados ordenable y filtrable"""
+        if self.widget_filtros is None:
+            self._crear_filtros()
+        
+        self.modelo_resultados = ResultadosModel(df_resultado, list(self.combos_filtro))
+        
+        for col, combo in self.combos_filtro.items():
+            combo.blockSignals(True)
+            combo.clear()
+            combo.addItem("Todos")
+            combo.addItems(self.modelo_resultados.opciones[col])
+            combo.blockSignals(False)
+        
+        self.table.setModel(self.modelo_resultados)
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.table.setSortingEnabled(True)
+        self.widget_filtros.setVisible(True)
+        self.lbl_filas.setText(f"{len(df_resultado)} filas")
+
+    def aplicar_filtros(self):
+        if self.modelo_resultados is None or self.table.model() is not self.modelo_resultados:
+            return
+        
+        self.modelo_resultados.filtrar({
+            col: (combo.currentText() if combo.currentIndex() > 0 else None)
+            for col, combo in self.combos_filtro.items()
+        })
+        self.lbl_filas.setText(
+            f"{self.modelo_resultados.filas_visibles()} de {len(self.df_resultado)} filas"
+        )
 
     def cargar_monitores(self):
         ruta, _ = QFileDialog.getOpenFileName(
             self, "Seleccionar archivo de monitores", "", 
-            "Archivos Excel (*.xlsx *.xls)"
+            "Archivos de datos (*.xlsx *.xls *.parquet *.arrow *.feather)"
         )
         
         if ruta:
             try:
-                self.monitores = cargar_monitores_desde_excel(ruta)
+                import pandas as pd
+                from motor_asignacion import cargar_monitores_desde_archivo
+                
+                self.monitores = cargar_monitores_desde_archivo(ruta)
                 
                 df_preview = pd.DataFrame([{
                     'Nombre': m['nombre'],
@@ -574,7 +545,7 @@ class MainWindow(QWidget):
                     'Max': m['max']
                 } for m in self.monitores])
                 
-                self.table.setModel(PandasModel(df_preview))
+                self.mostrar_tabla(df_preview)
                 self.lbl_estado.setText(f"✅ {len(self.monitores)} monitores cargados")
                 self.text_reporte.setPlainText(f"📂 Monitores cargados: {len(self.monitores)}")
                 
@@ -586,19 +557,27 @@ class MainWindow(QWidget):
     def cargar_espacios(self):
         ruta, _ = QFileDialog.getOpenFileName(
             self, "Seleccionar archivo de espacios", "", 
-            "Archivos Excel (*.xlsx *.xls)"
+            "Archivos de datos (*.xlsx *.xls *.parquet *.arrow *.feather)"
         )
         
         if ruta:
             try:
-                self.df_espacios = cargar_espacios_desde_excel(ruta)
+                from motor_asignacion import cargar_espacios_desde_archivo
                 
-                self.table.setModel(PandasModel(self.df_espacios.head(50)))
+                self.df_espacios = cargar_espacios_desde_archivo(ruta)
+                self.ruta_espacios = ruta
+                
+                self.mostrar_tabla(self.df_espacios.head(50))
+                norm = self.df_espacios.attrs.get("normalizacion", {})
                 self.lbl_estado.setText(f"✅ {len(self.df_espacios)} horarios cargados")
                 self.text_reporte.setPlainText(
                     f"📂 Espacios cargados: {len(self.df_espacios)} horarios\n"
                     f"🏢 Salas: {self.df_espacios['SALA'].nunique()}\n"
-                    f"⏱️  Total horas: {self.df_espacios['DURACION'].sum()}"
+                    f"⏱️  Total horas: {self.df_espacios['DURACION'].sum()}\n"
+                    f"🧹 Filas leídas: {norm.get('filas', len(self.df_espacios))} · "
+                    f"duplicadas descartadas: {norm.get('duplicadas', 0)} · "
+                    f"franjas fusionadas: {norm.get('fusionadas', 0)}\n"
+                    f"📑 Hojas: {', '.join(map(str, self.df_espacios.attrs.get('hojas', []))) or '-'}"
                 )
                 
                 self.verificar_listo()
@@ -606,8 +585,46 @@ class MainWindow(QWidget):
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Error al cargar espacios:\n{str(e)}")
 
+    def cargar_previo(self):
+        ruta, _ = QFileDialog.getOpenFileName(
+            self, "Seleccionar resultado anterior", "", 
+            "Archivos Excel (*.xlsx *.xls)"
+        )
+        
+        if ruta:
+            try:
+                from motor_asignacion import cargar_asignacion_previa
+                
+                self.df_previo = cargar_asignacion_previa(ruta)
+                asignadas = int((self.df_previo["ESTADO"] == "✅").sum())
+                self.lbl_estado.setText(f"📎 Asignación previa: {asignadas} pares a conservar si siguen siendo factibles")
+                
+            except Exception as e:
+                self.df_previo = None
+                QMessageBox.critical(self, "Error", f"Error al cargar la asignación previa:\n{str(e)}")
+
+    def cargar_traslados(self):
+        ruta, _ = QFileDialog.getOpenFileName(
+            self, "Seleccionar matriz de traslados", "", 
+            "Archivos Excel (*.xlsx *.xls)"
+        )
+        
+        if ruta:
+            try:
+                from motor_asignacion import CONFIG, cargar_traslados
+                
+                traslados = cargar_traslados(ruta)
+                CONFIG["asignacion"]["traslados"] = traslados
+                self.lbl_estado.setText(
+                    f"🚶 Traslados: {len(traslados['minutos'])} salas, "
+                    f"se revisan huecos de menos de {traslados['horas_vecinas']}h"
+                )
+                
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Error al cargar los traslados:\n{str(e)}")
+
     def verificar_listo(self):
-        if len(self.monitores) > 0 and len(self.df_espacios) > 0:
+        if len(self.monitores) > 0 and self.df_espacios is not None and len(self.df_espacios) > 0:
             self.btn_asignar.setEnabled(True)
             self.lbl_estado.setText("✅ Listo para asignar")
 
@@ -620,28 +637,86 @@ class MainWindow(QWidget):
         import copy
         monitores_copy = copy.deepcopy(self.monitores)
         
-        self.thread = AsignacionThread(monitores_copy, self.df_espacios)
+        presupuesto = self.spin_presupuesto.value()
+        self.btn_detener.setEnabled(presupuesto > 0 and self.df_previo is None)
+        
+        if self.cache_corridas is None:
+            from motor_asignacion import CacheCorridas
+            self.cache_corridas = CacheCorridas(carpeta=self.carpeta_cache)
+        
+        self.thread = AsignacionThread(monitores_copy, self.df_espacios, presupuesto, self.df_previo,
+                                       trazar=self.chk_traza.isChecked(), cache=self.cache_corridas)
         self.thread.finished.connect(self.asignacion_completada)
         self.thread.error.connect(self.asignacion_error)
         self.thread.progress.connect(self.actualizar_progreso)
+        self.thread.mejora.connect(self.mostrar_mejora)
         self.thread.start()
 
+    def detener_asignacion(self):
+        self.btn_detener.setEnabled(False)
+        self.thread.detener()
+        self.lbl_estado.setText("⏹ Deteniendo, se conserva la mejor solución...")
+
+    def closeEvent(self, event):
+        """Al cerrar con una asignación en curso la corta y espera a los hilos"""
+        # self.thread tapa QObject.thread() solo después de la primera corrida
+        hilo = self.thread
+        if isinstance(hilo, AsignacionThread) and hilo.isRunning():
+            for senal in (hilo.finished, hilo.error, hilo.progress, hilo.mejora):
+                senal.disconnect()
+            hilo.detener()
+            hilo.wait()
+        self.precarga.wait()  # solo importa módulos, termina enseguida
+        event.accept()
+
     def actualizar_progreso(self, mensaje):
         self.lbl_estado.setText(mensaje)
 
-    def asignacion_completada(self, df_resultado, monitores, reporte):
+    def mostrar_mejora(self, resumen):
+        total = resumen["total"] or 1
+        self.lbl_estado.setText(
+            ("↻ Retomada del punto de control · " if resumen.get("retomado") else "")
+            + f"🔁 Mejor solución (vuelta {resumen['vuelta']}, {resumen['segundos']:.1f} s): "
+            f"{resumen['asignados']*100/total:.1f}% asignados · "
+            f"{resumen['sin_monitor']} sin monitor · dispersión {resumen['dispersion']}h"
+        )
+
+    def asignacion_completada(self, df_resultado, monitores, reporte, detalles):
         self.df_resultado = df_resultado
+        self.df_diagnostico = detalles["diagnostico"]
+        self.traza = detalles["traza"]
         self.monitores_asignados = monitores
+        self.reporte = reporte
         
-        self.table.setModel(PandasModel(df_resultado))
+        self.mostrar_resultados(df_resultado)
         self.text_reporte.setPlainText(reporte)
         
         self.progress.setVisible(False)
         self.btn_asignar.setEnabled(True)
+        self.btn_detener.setEnabled(False)
         self.btn_exportar.setEnabled(True)
         
         self.lbl_estado.setText("✅ Asignación completada exitosamente")
         
+        from motor_asignacion import CONFIG
+        
+        if detalles.get("desde_cache"):
+            # Ya se resolvió y guardó con estas mismas entradas
+            self.lbl_estado.setText("⚡ Resultado desde caché: mismas entradas y configuración que una corrida anterior")
+        elif CONFIG["historial"]["ruta"]:
+            try:
+                from historial_asignaciones import abrir_historial, guardar_corrida
+                
+                con = abrir_historial(CONFIG["historial"]["ruta"])
+                corrida = guardar_corrida(
+                    con, df_resultado, monitores, CONFIG["espacios"],
+                    etiqueta=os.path.basename(self.ruta_espacios or "")
+                )
+                con.close()
+                self.lbl_estado.setText(f"✅ Asignación completada (corrida #{corrida} guardada en historial)")
+            except Exception as e:
+                QMessageBox.warning(self, "Historial", f"No se pudo guardar en el historial:\n{str(e)}")
+        
         QMessageBox.information(
             self, 
             "Completado", 
@@ -651,12 +726,63 @@ class MainWindow(QWidget):
     def asignacion_error(self, error):
         self.progress.setVisible(False)
         self.btn_asignar.setEnabled(True)
+        self.btn_detener.setEnabled(False)
         
         QMessageBox.critical(self, "Error", f"Error en la asignación:\n{error}")
         self.lbl_estado.setText("❌ Error en la asignación")
 
+    def explicar_fila(self, index):
+        """Muestra sobre el reporte por qué la fila clicada quedó con su monitor"""
+        if self.traza is None or self.table.model() is not self.modelo_resultados:
+            return
+        
+        pos = self.modelo_resultados.fila_df(index.row())
+        puesto = int(self.df_resultado['PUESTO'].iat[pos]) if 'PUESTO' in self.df_resultado.columns else 1
+        explicacion = self.traza.explicar(self.df_resultado.index[pos], puesto, self.monitores_asignados)
+        self.text_reporte.setPlainText(f"{explicacion}\n\n{self.reporte}")
+
+    def consultar_historial(self):
+        tipo, ok = QInputDialog.getItem(
+            self, "Historial", "Consulta:",
+            ["Horas de un monitor", "Cobertura de una sala"], 0, False
+        )
+        if not ok:
+            return
+        
+        texto, ok = QInputDialog.getText(
+            self, "Historial",
+            "Nombre del monitor (opcional: '; año'):" if tipo.startswith("Horas")
+            else "Sala (opcional: '; día'):"
+        )
+        if not ok or not texto.strip():
+            return
+        
+        partes = [p.strip() for p in texto.split(";")]
+        
+        try:
+            from motor_asignacion import CONFIG, normalizar_dia
+            from historial_asignaciones import abrir_historial, horas_monitor, cobertura_sala
+            
+            t0 = time.perf_counter()
+            con = abrir_historial(CONFIG["historial"]["ruta"])
+            if tipo.startswith("Horas"):
+                df = horas_monitor(con, partes[0], anio=partes[1] if len(partes) > 1 else None)
+                resumen = f"👤 {partes[0]}: {int((df['Fin'] - df['Inicio']).sum()) if not df.empty else 0}h en {df['Corrida'].nunique()} corridas"
+            else:
+                dia = normalizar_dia(partes[1]) if len(partes) > 1 else None
+                df = cobertura_sala(con, partes[0], dia=dia)
+                resumen = f"🏢 {partes[0]}{' ' + dia if dia else ''}: {len(df)} corridas"
+            con.close()
+            ms = (time.perf_counter() - t0) * 1000
+            
+            self.mostrar_tabla(df)
+            self.text_reporte.setPlainText(f"{resumen}\n⏱️  Consulta: {ms:.1f} ms")
+            
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error al consultar el historial:\n{str(e)}")
+
     def exportar(self):
-        if self.df_resultado.empty:
+        if self.df_resultado is None or self.df_resultado.empty:
             QMessageBox.warning(self, "Advertencia", "No hay resultados para exportar")
             return
         
@@ -667,18 +793,10 @@ class MainWindow(QWidget):
         
         if ruta:
             try:
-                df_mon = pd.DataFrame([{
-                    'Monitor': m['nombre'],
-                    'Horas': m['horas'],
-                    'Min': m['min'],
-                    'Max': m['max'],
-                    'Horarios': len(m['asignaciones']),
-                    'Estado': '✅' if m['min'] <= m['horas'] <= m['max'] else '⚠️'
-                } for m in self.monitores_asignados]).sort_values('Horas', ascending=False)
+                from motor_asignacion import exportar_resultado
                 
-                with pd.ExcelWriter(ruta, engine='openpyxl') as writer:
-                    self.df_resultado.to_excel(writer, sheet_name='Asignaciones', index=False)
-                    df_mon.to_excel(writer, sheet_name='Resumen Monitores', index=False)
+                exportar_resultado(ruta, self.df_resultado, self.monitores_asignados, self.df_diagnostico,
+                                   traza=self.traza)
                 
                 QMessageBox.information(self, "Exportado", f"✅ Archivo guardado:\n{ruta}")
                 self.lbl_estado.setText(f"✅ Exportado: {ruta}")
@@ -691,7 +809,75 @@ class MainWindow(QWidget):
 # EJECUTAR APLICACIÓN
 # ========================================================
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = MainWindow()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Sistema de asignación de monitores")
+    parser.add_argument("--convertir-monitores", nargs=2, metavar=("ORIGEN", "DESTINO"),
+                        help="Convierte monitores a .parquet/.arrow")
+    parser.add_argument("--convertir-espacios", nargs=2, metavar=("ORIGEN", "DESTINO"),
+                        help="Convierte espacios (normalizados) a .parquet/.arrow")
+    parser.add_argument("--historial", metavar="BASE",
+                        help="Base SQLite del historial (activa el guardado en la GUI)")
+    parser.add_argument("--cache", metavar="CARPETA",
+                        help="Guarda también en disco las corridas que se reutilizan con entradas iguales")
+    parser.add_argument("--horas-monitor", metavar="NOMBRE",
+                        help="Consulta las horas de un monitor en el historial")
+    parser.add_argument("--anio", type=int, help="Filtra --horas-monitor por año")
+    parser.add_argument("--cobertura-sala", metavar="SALA",
+                        help="Consulta la cobertura de una sala en el historial")
+    parser.add_argument("--dia", help="Filtra --cobertura-sala por día")
+    parser.add_argument("--medir-arranque", action="store_true",
+                        help="Mide cuándo aparece la ventana y cuándo queda cargado el motor, y sale")
+    args, qt_args = parser.parse_known_args()
+    
+    if args.horas_monitor or args.cobertura_sala:
+        from motor_asignacion import normalizar_dia
+        from historial_asignaciones import abrir_historial, horas_monitor, cobertura_sala
+        
+        if not args.historial:
+            parser.error("las consultas necesitan --historial BASE")
+        con = abrir_historial(args.historial)
+        if args.horas_monitor:
+            df = horas_monitor(con, args.horas_monitor, anio=args.anio)
+            print(df.to_string(index=False))
+            print(f"\n👤 Total: {int((df['Fin'] - df['Inicio']).sum()) if not df.empty else 0}h")
+        if args.cobertura_sala:
+            df = cobertura_sala(con, args.cobertura_sala, dia=normalizar_dia(args.dia) if args.dia else None)
+            print(df.to_string(index=False))
+        con.close()
+        sys.exit(0)
+    
+    if args.convertir_monitores or args.convertir_espacios:
+        from motor_asignacion import (
+            cargar_monitores_desde_archivo, cargar_espacios_desde_archivo,
+            guardar_monitores_arrow, guardar_espacios_arrow
+        )
+        
+        if args.convertir_monitores:
+            origen, destino = args.convertir_monitores
+            monitores = cargar_monitores_desde_archivo(origen)
+            guardar_monitores_arrow(monitores, destino)
+            print(f"✅ {len(monitores)} monitores -> {destino}")
+        if args.convertir_espacios:
+            origen, destino = args.convertir_espacios
+            df_espacios = cargar_espacios_desde_archivo(origen)
+            guardar_espacios_arrow(df_espacios, destino)
+            print(f"✅ {len(df_espacios)} espacios -> {destino}")
+        sys.exit(0)
+    
+    app = QApplication(sys.argv[:1] + qt_args)
+    window = MainWindow(ruta_historial=args.historial, carpeta_cache=args.cache)
     window.show()
+    
+    if args.medir_arranque:
+        def ventana_visible():
+            print(f"⏱️  Ventana visible: {(time.perf_counter() - T_INICIO) * 1000:.0f} ms")
+        
+        def motor_cargado(ms):
+            print(f"⏱️  Motor cargado (pandas, openpyxl, algoritmo): {ms:.0f} ms")
+            app.quit()
+        
+        QTimer.singleShot(0, ventana_visible)
+        window.precarga.listo.connect(motor_cargado)
+    
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,494 @@
+import argparse
+import contextlib
+import copy
+import random
+import sys
+import time
+
+import pandas as pd
+
+from motor_asignacion import (
+    CONFIG, IndiceDisponibilidad, esta_disponible, verificar_restricciones, bloque_seguido, respeta_traslados, puntaje_preferencia,
+    preparar_espacios, expandir_puestos, asignar_monitores, asignar_por_dia, asignar_con_presupuesto,
+    cota_superior_cobertura, validar_resultado
+)
+
+
+# ========================================================
+# ALGORITMO DE REFERENCIA
+# ========================================================
+#
+# La versión original, fila por fila y sin índice: recorre todos los
+# monitores con esta_disponible y busca la franja en la lista de
+# asignaciones. Es lenta a propósito; todo motor que diga seguir la
+# misma estrategia tiene que devolver exactamente lo mismo.
+
+def asignar_referencia(monitores, df_espacios):
+    """Asignación voraz de referencia (fases 1 y 2 en orden de hoja)"""
+    cfg_asig = CONFIG["asignacion"]
+    cfg_esp = CONFIG["espacios"]
+    peso = cfg_asig.get("peso_preferencias", 0)
+    
+    asignaciones = []
+    sin_monitor = []
+    
+    # Un espacio que pide k monitores son k filas seguidas (PUESTO 1..k);
+    # cada puesto se llena por separado y sin repetir monitor en el espacio
+    grupos = []
+    for espacio in expandir_puestos(df_espacios).to_dict('records'):
+        if espacio.get('PUESTO', 1) == 1:
+            grupos.append([])
+        grupos[-1].append(espacio)
+    ocupados = [[] for _ in grupos]
+    
+    def factibles(espacio, ocupados_espacio, solo_bajo_minimo):
+        dia = espacio['DIA_NORM']
+        inicio = espacio[cfg_esp["col_hora_inicio"]]
+        fin = espacio[cfg_esp["col_hora_fin"]]
+        return [
+            m for m in monitores
+            if m["nombre"] not in ocupados_espacio
+            and (m["horas"] < m["min"] or not solo_bajo_minimo)
+            and m["horas"] + espacio['DURACION'] <= m["max"]
+            and esta_disponible(m, dia, inicio, fin)
+            and verificar_restricciones(m, dia, inicio, fin, espacio[cfg_esp["col_sala"]])
+        ]
+    
+    def preferencia(m, espacio):
+        return puntaje_preferencia(m, espacio['DIA_NORM'], espacio[cfg_esp["col_hora_inicio"]],
+                                   espacio[cfg_esp["col_sala"]])
+    
+    def registrar(elegido, espacio, g):
+        elegido["horas"] += espacio['DURACION']
+        elegido["asignaciones"].append({
+            "dia": espacio['DIA_NORM'], "inicio": espacio[cfg_esp["col_hora_inicio"]],
+            "fin": espacio[cfg_esp["col_hora_fin"]], "sala": espacio[cfg_esp["col_sala"]]
+        })
+        ocupados[g].append(elegido["nombre"])
+        asignaciones.append({**espacio, "MONITOR": elegido["nombre"], "ESTADO": "✅"})
+    
+    # Fase 1: Priorizar mínimo
+    if cfg_asig.get("priorizar_minimo"):
+        for g, grupo in enumerate(grupos):
+            if pd.isna(grupo[0]['DIA_NORM']):
+                continue
+            
+            for espacio in grupo:
+                candidatos = factibles(espacio, ocupados[g], solo_bajo_minimo=True)
+                if not candidatos:
+                    break
+                
+                candidatos.sort(key=lambda x: x["min"] - x["horas"] + peso * preferencia(x, espacio), reverse=True)
+                registrar(candidatos[0], espacio, g)
+    
+    # Fase 2: Asignar restantes
+    for g, grupo in enumerate(grupos):
+        if pd.isna(grupo[0]['DIA_NORM']):
+            for espacio in grupo:
+                sin_monitor.append(espacio)
+                asignaciones.append({**espacio, "MONITOR": "DÍA INVÁLIDO", "ESTADO": "❌"})
+            continue
+        
+        espacio = grupo[0]
+        ya_asignado = any(
+            a.get(cfg_esp["col_sala"]) == espacio[cfg_esp["col_sala"]] and
+            a.get('DIA_NORM') == espacio['DIA_NORM'] and
+            a.get(cfg_esp["col_hora_inicio"]) == espacio[cfg_esp["col_hora_inicio"]]
+            for a in asignaciones
+        )
+        # Con algún puesto cubierto en la fase 1 se completan los demás
+        if ya_asignado and not ocupados[g]:
+            continue
+        
+        for espacio in grupo[len(ocupados[g]):]:
+            candidatos = factibles(espacio, ocupados[g], solo_bajo_minimo=False)
+            
+            if not candidatos:
+                sin_monitor.append(espacio)
+                asignaciones.append({**espacio, "MONITOR": "SIN MONITOR", "ESTADO": "❌"})
+                continue
+            
+            if cfg_asig.get("balancear_carga"):
+                candidatos.sort(key=lambda x: x["horas"] - peso * preferencia(x, espacio))
+            elif peso:
+                candidatos.sort(key=lambda x: preferencia(x, espacio), reverse=True)
+            
+            registrar(candidatos[0], espacio, g)
+    
+    return pd.DataFrame(asignaciones), sin_monitor, monitores
+
+
+# ========================================================
+# MOTORES A COMPARAR
+# ========================================================
+#
+# nombre -> (función(monitores, df_espacios, df_referencia), misma_estrategia)
+# Con misma_estrategia=True se exige el mismo resultado que la referencia;
+# si no, solo que respete las restricciones y no supere la cota.
+
+def _con_orden(orden, funcion, *args):
+    with _config_asignacion(orden=orden):
+        return funcion(*args)
+
+
+@contextlib.contextmanager
+def _config_asignacion(**cambios):
+    """Cambia CONFIG["asignacion"] solo dentro del bloque"""
+    anterior = dict(CONFIG["asignacion"])
+    CONFIG["asignacion"].update(cambios)
+    try:
+        yield
+    finally:
+        CONFIG["asignacion"].clear()
+        CONFIG["asignacion"].update(anterior)
+
+
+PRESUPUESTO_SEGUNDOS = 0.05
+
+MOTORES = {
+    "indice": (lambda ms, df, ref: asignar_monitores(ms, df), True),
+    "arranque_previo": (lambda ms, df, ref: asignar_monitores(ms, df, previo=ref), True),
+    "mas_restringido": (lambda ms, df, ref: _con_orden("mas_restringido", asignar_monitores, ms, df), False),
+    "por_dia": (lambda ms, df, ref: asignar_por_dia(ms, df, paralelo=False), False),
+    "presupuesto": (lambda ms, df, ref: asignar_con_presupuesto(ms, df, PRESUPUESTO_SEGUNDOS), False),
+}
+
+# Lo que el algoritmo garantiza: todo lo que revisa validar_resultado
+RESTRICCIONES_GARANTIZADAS = ("monitor", "disponibilidad", "max", "cruce", "puesto", "traslado", "seguidas")
+
+
+# ========================================================
+# CASOS ALEATORIOS
+# ========================================================
+
+DIAS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado"]
+
+
+def _sin_tilde(dia):
+    return dia.lower().replace("é", "e").replace("á", "a")
+
+
+def generar_caso(semilla, num_monitores=(20, 100), num_espacios=(300, 2000), salas=20):
+    """
+    Monitores, espacios (ya preparados) y variante de CONFIG para una semilla.
+    
+    Cubre las dimensiones que el algoritmo trata aparte: espacios que piden
+    varios monitores, preferencias declaradas y una matriz de traslados.
+    """
+    rng = random.Random(semilla)
+    
+    monitores = []
+    for i in range(rng.randint(*num_monitores)):
+        disp = {}
+        for dia in DIAS:
+            rangos = []
+            for _ in range(rng.randint(0, 2)):
+                inicio = rng.randint(7, 20)
+                rangos.append((inicio, min(22, inicio + rng.randint(1, 8))))
+            disp[_sin_tilde(dia)] = rangos
+        minimo = rng.randint(0, 8)
+        monitor = {
+            "id": i, "nombre": f"Monitor {i}", "min": minimo, "max": minimo + rng.randint(0, 14),
+            "horas": 0, "disp": disp, "asignaciones": []
+        }
+        if rng.random() < 0.5:
+            monitor["pref"] = {
+                "jornada": {rng.choice(list(CONFIG["monitores"]["jornadas"])): rng.choice([-1, 1, 2])},
+                "dia": {_sin_tilde(rng.choice(DIAS)): rng.choice([-1, 1])},
+                "sala": {f"SALA {rng.randint(1, salas)}": rng.choice([-2, 1, 2])}
+            }
+        monitores.append(monitor)
+    
+    filas = []
+    for _ in range(rng.randint(*num_espacios)):
+        inicio = rng.randint(7, 20)
+        filas.append({
+            CONFIG["espacios"]["col_sala"]: f"Sala {rng.randint(1, salas)}",
+            CONFIG["espacios"]["col_dia"]: rng.choice(DIAS + ["??"]) if rng.random() < 0.05 else rng.choice(DIAS),
+            CONFIG["espacios"]["col_hora_inicio"]: inicio,
+            CONFIG["espacios"]["col_hora_fin"]: min(22, inicio + rng.randint(1, 3)),
+            CONFIG["espacios"]["col_curso"]: f"C{rng.randint(1, 25)}",
+            CONFIG["espacios"]["col_monitores"]: 1 if rng.random() < 0.8 else rng.randint(2, 3)
+        })
+    
+    traslados = None
+    if rng.random() < 0.5:
+        minutos = {}
+        for origen in range(1, salas + 1):
+            for destino in range(origen + 1, salas + 1):
+                valor = rng.choice([0, 0, 10, 30, 60, 90])
+                if valor:
+                    minutos.setdefault(f"SALA {origen}", {})[f"SALA {destino}"] = valor
+                    minutos.setdefault(f"SALA {destino}", {})[f"SALA {origen}"] = valor
+        traslados = {"minutos": minutos, "horas_vecinas": 2}
+    
+    variante = {
+        "priorizar_minimo": rng.random() < 0.7,
+        "balancear_carga": rng.random() < 0.7,
+        "max_horas_seguidas": rng.choice([0, 2, 3, 4, 6]),
+        "peso_preferencias": rng.choice([0, 0.5, 1.0, 3.0]),
+        "traslados": traslados
+    }
+    
+    return monitores, preparar_espacios(pd.DataFrame(filas)), variante
+
+
+def _clave_resultado(df_resultado):
+    """Multiconjunto ordenado de (sala, día, inicio, fin, curso, monitor, estado)"""
+    cfg_esp = CONFIG["espacios"]
+    columnas = [cfg_esp["col_sala"], 'DIA_NORM', cfg_esp["col_hora_inicio"], cfg_esp["col_hora_fin"],
+                cfg_esp["col_curso"], "MONITOR", "ESTADO"]
+    if df_resultado.empty:
+        return []
+    return sorted(tuple(str(v) for v in fila) for fila in df_resultado[columnas].astype(object).itertuples(index=False))
+
+
+# ========================================================
+# VERIFICACIONES PUNTUALES
+# ========================================================
+#
+# Casos fijos que los aleatorios no garantizan cubrir. Cada función
+# devuelve la lista de fallos (vacía si pasa).
+
+def verificar_traslados_superpuestos():
+    """Dos franjas superpuestas en salas distintas nunca respetan el traslado"""
+    cfg_esp = CONFIG["espacios"]
+    traslados = {"minutos": {"SALA 1": {"SALA 2": 30}, "SALA 2": {"SALA 1": 30}}, "horas_vecinas": 1}
+    monitor = {
+        "id": 0, "nombre": "Monitor 0", "min": 0, "max": 20, "horas": 2,
+        "disp": {"lunes": [(7, 20)]},
+        "asignaciones": [{"dia": "lunes", "inicio": 8, "fin": 10, "sala": "Sala 1"}]
+    }
+    fallos = []
+    
+    # Sala 3 no está en la matriz (0 minutos): la superposición sola tiene que bastar
+    for sala in ("Sala 2", "Sala 3"):
+        if respeta_traslados(monitor, "lunes", 9, 11, sala, traslados):
+            fallos.append(f"respeta_traslados acepta 9-11 en {sala} encima de 8-10 en Sala 1")
+    
+    df_resultado = preparar_espacios(pd.DataFrame({
+        cfg_esp["col_sala"]: ["Sala 1", "Sala 3"],
+        cfg_esp["col_dia"]: ["Lunes", "Lunes"],
+        cfg_esp["col_hora_inicio"]: [8, 9],
+        cfg_esp["col_hora_fin"]: [10, 11],
+        cfg_esp["col_curso"]: ["C1", "C2"]
+    })).assign(MONITOR="Monitor 0", ESTADO="✅")
+    with _config_asignacion(traslados=traslados):
+        violaciones = validar_resultado(df_resultado, [monitor])
+    if not (violaciones['Tipo'] == "traslado").any():
+        fallos.append("validar_resultado no marca el traslado de dos franjas superpuestas en salas distintas")
+    
+    return fallos
+
+
+def verificar_bloques_encadenados():
+    """bloque_seguido y validar_resultado encadenan igual las franjas que se tocan"""
+    cfg_esp = CONFIG["espacios"]
+    monitor = {
+        "id": 0, "nombre": "Monitor 0", "min": 0, "max": 20, "horas": 4,
+        "disp": {"lunes": [(7, 20)]},
+        "asignaciones": [{"dia": "lunes", "inicio": 8, "fin": 10, "sala": "Sala 1"},
+                         {"dia": "lunes", "inicio": 10, "fin": 12, "sala": "Sala 1"}]
+    }
+    fallos = []
+    
+    bloque = bloque_seguido(monitor, "lunes", 12, 14)
+    if bloque != 6:
+        fallos.append(f"bloque_seguido da {bloque}h para 12-14 tras 8-10 y 10-12 (son 6h)")
+    
+    df_resultado = preparar_espacios(pd.DataFrame({
+        cfg_esp["col_sala"]: ["Sala 1"] * 4,
+        cfg_esp["col_dia"]: ["Lunes"] * 4,
+        cfg_esp["col_hora_inicio"]: [8, 10, 12, 16],
+        cfg_esp["col_hora_fin"]: [10, 12, 14, 21],
+        cfg_esp["col_curso"]: ["C1", "C2", "C3", "C4"]
+    })).assign(MONITOR="Monitor 0", ESTADO="✅")
+    seguidas = validar_resultado(df_resultado, [monitor], max_horas_seguidas=4)
+    seguidas = seguidas[seguidas['Tipo'] == "seguidas"]
+    # 8-14 encadena tres franjas; 16-21 está sola y no es un bloque seguido
+    if seguidas[['Inicio', 'Fin']].values.tolist() != [[8, 14]]:
+        fallos.append(f"validar_resultado marca {seguidas[['Inicio', 'Fin']].values.tolist()} (se esperaba [[8, 14]])")
+    
+    return fallos
+
+
+def verificar_puestos_misma_franja():
+    """
+    Espacios de varios puestos en una franja ya cubierta salen completos o no salen.
+    
+    Uno de 1 puesto y dos de 2 en la misma sala, día e inicio: antes de
+    deduplicar por espacio, los de 2 perdían el PUESTO 1 y conservaban el 2.
+    """
+    cfg_esp = CONFIG["espacios"]
+    monitores = [
+        {"id": i, "nombre": f"Monitor {i}", "min": 0, "max": 20, "horas": 0,
+         "disp": {"lunes": [(7, 20)]}, "asignaciones": []}
+        for i in range(4)
+    ]
+    df_espacios = preparar_espacios(pd.DataFrame({
+        cfg_esp["col_sala"]: ["Sala 1"] * 3,
+        cfg_esp["col_dia"]: ["Lunes"] * 3,
+        cfg_esp["col_hora_inicio"]: [8] * 3,
+        cfg_esp["col_hora_fin"]: [10] * 3,
+        cfg_esp["col_curso"]: ["C1", "C2", "C3"],
+        cfg_esp["col_monitores"]: [1, 2, 2]
+    }))
+    fallos = []
+    
+    for orden in ("hoja", "mas_restringido"):
+        df_resultado = _con_orden(orden, asignar_monitores, copy.deepcopy(monitores), df_espacios)[0]
+        puestos = df_resultado.groupby(level=0)['PUESTO'].agg(sorted).to_dict()
+        if puestos != {0: [1]}:
+            fallos.append(f"orden {orden}: puestos por espacio {puestos} (se esperaba solo el primero, {{0: [1]}})")
+    
+    return fallos
+
+
+VERIFICACIONES = [verificar_traslados_superpuestos, verificar_bloques_encadenados, verificar_puestos_misma_franja]
+
+
+# ========================================================
+# COMPARACIÓN
+# ========================================================
+
+def comparar_disponibilidad(monitores, df_espacios):
+    """IndiceDisponibilidad.candidatos contra esta_disponible, franja por franja"""
+    indice = IndiceDisponibilidad(monitores)
+    cfg_esp = CONFIG["espacios"]
+    franjas = [
+        (dia, inicio, fin) for dia, inicio, fin in zip(
+            df_espacios['DIA_NORM'].tolist(),
+            df_espacios[cfg_esp["col_hora_inicio"]].tolist(),
+            df_espacios[cfg_esp["col_hora_fin"]].tolist()
+        ) if not pd.isna(dia)
+    ]
+    
+    t0 = time.perf_counter()
+    esperado = [[pos for pos, m in enumerate(monitores) if esta_disponible(m, *franja)] for franja in franjas]
+    ms_referencia = (time.perf_counter() - t0) * 1000
+    
+    t0 = time.perf_counter()
+    obtenido = [list(indice.candidatos(*franja)) for franja in franjas]
+    ms_motor = (time.perf_counter() - t0) * 1000
+    
+    fallos = [franja for franja, a, b in zip(franjas, esperado, obtenido) if a != b]
+    return fallos, ms_referencia, ms_motor
+
+
+def comparar_caso(semilla, motores=None, **tamanos):
+    """
+    Corre la referencia y cada motor sobre un caso aleatorio.
+    
+    Devuelve una fila por motor con ms, ms de la referencia y la lista de
+    fallos (vacía si el motor pasa).
+    """
+    monitores, df_espacios, variante = generar_caso(semilla, **tamanos)
+    filas = []
+    
+    with _config_asignacion(**variante):
+        t0 = time.perf_counter()
+        df_ref = asignar_referencia(copy.deepcopy(monitores), df_espacios)[0]
+        ms_referencia = (time.perf_counter() - t0) * 1000
+        clave_ref = _clave_resultado(df_ref)
+        
+        fallos, ms_ref_disp, ms_disp = comparar_disponibilidad(monitores, df_espacios)
+        filas.append({
+            "semilla": semilla, "motor": "disponibilidad", "ms": ms_disp, "ms_referencia": ms_ref_disp,
+            "fallos": [f"candidatos distintos en {dia} {inicio}-{fin}" for dia, inicio, fin in fallos[:3]]
+        })
+        
+        for nombre in motores or MOTORES:
+            funcion, misma_estrategia = MOTORES[nombre]
+            
+            t0 = time.perf_counter()
+            df_resultado, _, monitores_resultado = funcion(copy.deepcopy(monitores), df_espacios, df_ref)
+            ms = (time.perf_counter() - t0) * 1000
+            
+            fallos = []
+            if misma_estrategia:
+                if _clave_resultado(df_resultado) != clave_ref:
+                    fallos.append("resultado distinto al de la referencia")
+            else:
+                asignados = int((df_resultado["ESTADO"] == "✅").sum())
+                cota = cota_superior_cobertura(
+                    monitores_resultado, df_resultado, IndiceDisponibilidad(monitores_resultado)
+                )
+                if asignados > cota:
+                    fallos.append(f"{asignados} asignados supera la cota {cota}")
+            
+            violaciones = validar_resultado(df_resultado, monitores)
+            graves = violaciones[violaciones['Tipo'].isin(RESTRICCIONES_GARANTIZADAS)]
+            fallos.extend(f"{v['Tipo']}: {v['Monitor']} {v['Detalle']}" for _, v in graves.head(3).iterrows())
+            
+            filas.append({
+                "semilla": semilla, "motor": nombre, "ms": ms, "ms_referencia": ms_referencia,
+                "fallos": fallos
+            })
+    
+    return filas
+
+
+def comparar(casos=20, semilla=0, motores=None, **tamanos):
+    """Corre `casos` semillas seguidas; devuelve (detalle, resumen por motor)"""
+    detalle = pd.DataFrame([
+        fila for s in range(semilla, semilla + casos) for fila in comparar_caso(s, motores, **tamanos)
+    ])
+    
+    resumen = detalle.groupby("motor", sort=False).agg(
+        casos=("semilla", "size"),
+        fallidos=("fallos", lambda f: sum(1 for x in f if x)),
+        ms=("ms", "sum"),
+        ms_referencia=("ms_referencia", "sum")
+    )
+    resumen["aceleracion"] = resumen["ms_referencia"] / resumen["ms"]
+    
+    return detalle, resumen
+
+
+# ========================================================
+# MAIN
+# ========================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compara los motores de asignación contra el algoritmo de referencia en casos aleatorios"
+    )
+    parser.add_argument("--casos", type=int, default=20, help="Cantidad de casos aleatorios")
+    parser.add_argument("--semilla", type=int, default=0, help="Primera semilla")
+    parser.add_argument("--motores", nargs="+", choices=list(MOTORES), help="Motores a comparar (por defecto todos)")
+    parser.add_argument("--monitores", type=int, nargs=2, default=(20, 100), metavar=("MIN", "MAX"),
+                        help="Rango de cantidad de monitores por caso")
+    parser.add_argument("--espacios", type=int, nargs=2, default=(300, 2000), metavar=("MIN", "MAX"),
+                        help="Rango de cantidad de espacios por caso")
+    args = parser.parse_args()
+    
+    detalle, resumen = comparar(
+        args.casos, args.semilla, args.motores,
+        num_monitores=tuple(args.monitores), num_espacios=tuple(args.espacios)
+    )
+    
+    print(f"\n⚖️  {args.casos} casos (semillas {args.semilla}-{args.semilla + args.casos - 1})\n")
+    for motor, r in resumen.iterrows():
+        estado = "✅" if r["fallidos"] == 0 else f"❌ {int(r['fallidos'])} fallidos"
+        if motor == "presupuesto":
+            velocidad = f"(busca {PRESUPUESTO_SEGUNDOS:g} s por caso)"
+        else:
+            velocidad = f"(x{r['aceleracion']:.1f})"
+        print(f"   {motor:16} | {r['ms']:9.1f} ms vs {r['ms_referencia']:9.1f} ms {velocidad} {estado}")
+    
+    print("\n   xN = tiempo de la referencia / tiempo del motor. Solo indice y arranque_previo")
+    print("   siguen la misma estrategia; mas_restringido y por_dia hacen más trabajo por espacio")
+    print("   (reordenar, conciliar días) y presupuesto usa todo su tiempo buscando mejoras.")
+    
+    con_fallos = detalle[detalle["fallos"].map(bool)]
+    for _, fila in con_fallos.head(10).iterrows():
+        print(f"\n   semilla {fila['semilla']} · {fila['motor']}:")
+        for fallo in fila["fallos"]:
+            print(f"      ↳ {fallo}")
+    
+    puntuales = [(v.__name__, fallo) for v in VERIFICACIONES for fallo in v()]
+    print(f"\n   {len(VERIFICACIONES)} verificaciones puntuales " + ("✅" if not puntuales else f"❌ {len(puntuales)} fallos"))
+    for nombre, fallo in puntuales:
+        print(f"      ↳ {nombre}: {fallo}")
+    
+    sys.exit(1 if len(con_fallos) or puntuales else 0)
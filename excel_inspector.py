@@ -1,6 +1,14 @@
 import pandas as pd
 import re
 import os
+import io
+import sys
+import copy
+import json
+import time
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # ========================================================
 # CONFIGURACIÓN
@@ -90,6 +98,43 @@ def parse_range_cell(cell_value):
     return ranges
 
 
+# ========================================================
+# FORMATO INTERMEDIO (PARQUET / ARROW)
+# ========================================================
+#
+# El formato y sus lectores son los de motor_asignacion (misma verificación
+# de tipo y mismos metadatos); se importan dentro de cada función porque
+# motor_asignacion a su vez importa este módulo.
+
+def es_arrow(ruta):
+    """La ruta es un .parquet/.arrow/.feather del formato intermedio"""
+    from motor_asignacion import EXTENSIONES_ARROW
+    return ruta.lower().endswith(EXTENSIONES_ARROW)
+
+
+def monitores_desde_arrow(ruta):
+    """Monitores guardados con motor_asignacion.guardar_monitores_arrow"""
+    from motor_asignacion import cargar_monitores_arrow
+    return cargar_monitores_arrow(ruta)
+
+
+def cursos_desde_arrow(ruta):
+    """Espacios normalizados -> lista de cursos con el formato de cargar_cursos"""
+    from motor_asignacion import CONFIG as CONFIG_MOTOR, cargar_espacios_arrow
+    
+    cfg = CONFIG_MOTOR["espacios"]
+    df = cargar_espacios_arrow(ruta)
+    
+    return [
+        {"curso": str(curso), "sala": str(sala), "dia": dia, "inicio": int(inicio), "fin": int(fin)}
+        for curso, sala, dia, inicio, fin in zip(
+            df[cfg["col_curso"]], df[cfg["col_sala"]], df["DIA_NORM"],
+            df[cfg["col_hora_inicio"]], df[cfg["col_hora_fin"]]
+        )
+        if pd.notna(dia)
+    ]
+
+
 # ========================================================
 # CARGA DE MONITORES
 # ========================================================
@@ -100,6 +145,11 @@ def cargar_monitores():
     
     print(f"\n📂 Cargando monitores desde: {cfg['archivo']}")
     
+    if es_arrow(cfg["archivo"]):
+        monitores = monitores_desde_arrow(cfg["archivo"])
+        print(f"✅ Cargados {len(monitores)} monitores")
+        return monitores
+    
     # Leer archivo completo sin header
     df_raw = pd.read_excel(cfg["archivo"], sheet_name=cfg["hoja"], header=None)
     
@@ -189,12 +239,14 @@ def cargar_monitores():
 def detectar_bloques_salas(df_raw, fila_titulos=1):
     """
     Detecta los bloques de columnas donde está cada sala.
-    Cada sala tiene un título en la fila 1 (ej: "SALA 1 (40)")
+    Cada sala tiene un título en la fila 1 (ej: "SALA 1 (40)"); el número
+    entre paréntesis, si está, queda como 'capacidad' del bloque.
     """
     fila_salas = df_raw.iloc[fila_titulos]
     
     bloques = []
     sala_actual = None
+    capacidad = None
     inicio_col = None
     
     for col_idx, val in enumerate(fila_salas):
@@ -208,18 +260,22 @@ def detectar_bloques_salas(df_raw, fila_titulos=1):
                 if sala_actual and inicio_col is not None:
                     bloques.append({
                         'nombre': sala_actual,
+                        'capacidad': capacidad,
                         'col_inicio': inicio_col,
                         'col_fin': col_idx - 1
                     })
                 
                 # Nueva sala detectada
                 sala_actual = match.group(0)
+                match_cap = re.search(r'\((\d+)\)', texto[match.end():])
+                capacidad = int(match_cap.group(1)) if match_cap else None
                 inicio_col = col_idx
     
     # Agregar la última sala
     if sala_actual and inicio_col is not None:
         bloques.append({
             'nombre': sala_actual,
+            'capacidad': capacidad,
             'col_inicio': inicio_col,
             'col_fin': len(fila_salas) - 1
         })
@@ -233,7 +289,7 @@ def cargar_cursos_de_bloque(df_raw, sala_info, fila_dias=2):
     
     Args:
         df_raw: DataFrame completo
-        sala_info: dict con 'nombre', 'col_inicio', 'col_fin'
+        sala_info: dict con 'nombre', 'col_inicio', 'col_fin' (y 'capacidad' opcional)
         fila_dias: fila donde están los nombres de días
     """
     cfg = CONFIG["cursos"]
@@ -296,22 +352,61 @@ def cargar_cursos_de_bloque(df_raw, sala_info, fila_dias=2):
                 
                 # Filtrar valores no deseados
                 if len(curso_texto) > 3 and curso_texto.lower() not in ['nan', 'none']:
-                    cursos.append({
+                    curso = {
                         "curso": curso_texto,
                         "sala": sala_nombre,
                         "dia": dia,
                         "inicio": inicio,
                         "fin": fin
-                    })
+                    }
+                    if sala_info.get('capacidad'):
+                        curso["capacidad"] = sala_info['capacidad']
+                    cursos.append(curso)
     
     return cursos
 
 
+def normalizar_cursos(cursos):
+    """
+    Descarta bloques repetidos y fusiona horas contiguas del mismo curso.
+    
+    Usa motor_asignacion.normalizar_espacios (mismo criterio y mismo tope
+    max_horas_seguidas); devuelve los cursos y los conteos de la limpieza.
+    """
+    from motor_asignacion import CONFIG as CONFIG_MOTOR, normalizar_espacios
+    
+    if not cursos:
+        return [], {"filas": 0, "duplicadas": 0, "fusionadas": 0}
+    
+    cfg = CONFIG_MOTOR["espacios"]
+    columnas = {
+        "curso": cfg["col_curso"], "sala": cfg["col_sala"], "dia": cfg["col_dia"],
+        "inicio": cfg["col_hora_inicio"], "fin": cfg["col_hora_fin"]
+    }
+    df = pd.DataFrame(cursos).rename(columns=columnas)
+    if "capacidad" in df.columns:
+        df["capacidad"] = df["capacidad"].astype("Int64")  # sin NaN flotantes en las salas sin dato
+    df = normalizar_espacios(df)
+    
+    normalizados = df.drop(columns="DURACION").rename(columns={v: k for k, v in columnas.items()})
+    normalizados = [
+        {k: v for k, v in c.items() if not (k == "capacidad" and pd.isna(v))}
+        for c in normalizados.to_dict("records")
+    ]
+    return normalizados, df.attrs["normalizacion"]
+
+
 def cargar_cursos():
     """Lee TODAS las salas del Excel (organizadas horizontalmente)"""
     cfg = CONFIG["cursos"]
     
     print(f"\n📂 Cargando cursos desde: {cfg['archivo']}")
+    
+    if es_arrow(cfg["archivo"]):
+        todos_cursos = cursos_desde_arrow(cfg["archivo"])
+        print(f"✅ Total: {len(todos_cursos)} horarios cargados")
+        return todos_cursos
+    
     print(f"   Hoja: {cfg['hoja']}")
     print(f"   Filas de datos: {cfg['data_start_row']} a {cfg['data_end_row']}")
     
@@ -338,6 +433,10 @@ def cargar_cursos():
     
     print(f"\n✅ Total: {len(todos_cursos)} horarios cargados")
     
+    todos_cursos, conteos = normalizar_cursos(todos_cursos)
+    print(f"🧹 Normalización: {conteos['duplicadas']} duplicados descartados, "
+          f"{conteos['fusionadas']} franjas fusionadas en bloques")
+    
     if todos_cursos:
         print(f"\n📋 Ejemplo:")
         print(f"   {todos_cursos[0]['curso'][:50]}")
@@ -474,7 +573,7 @@ def generar_reporte(monitores, asignaciones, sin_monitor):
                 print(f"    ... y {len(cursos)-5} más")
 
 
-def exportar_resultados(asignaciones, monitores):
+def exportar_resultados(asignaciones, monitores, archivo="asignacion_monitores_resultado.xlsx"):
     """Exporta resultados a Excel"""
     df_asignaciones = pd.DataFrame(asignaciones)
     
@@ -509,7 +608,6 @@ def exportar_resultados(asignaciones, monitores):
         })
     df_salas = pd.DataFrame(salas_stats)
     
-    archivo = "asignacion_monitores_resultado.xlsx"
     with pd.ExcelWriter(archivo, engine='openpyxl') as writer:
         df_asignaciones.to_excel(writer, sheet_name='Asignaciones', index=False)
         df_resumen.to_excel(writer, sheet_name='Resumen Monitores', index=False)
@@ -521,11 +619,213 @@ def exportar_resultados(asignaciones, monitores):
     print(f"   📄 Hoja 3: Resumen por sala")
 
 
+# ========================================================
+# PROCESAMIENTO POR LOTES
+# ========================================================
+#
+# Manifiesto JSON: lista de trabajos, uno por sede/semestre.
+#   [
+#     {"nombre": "sede_norte_2025-II",
+#      "monitores": "norte/DISPONIBILIDAD.xlsx",
+#      "cursos": "norte/2025-II-Espacios.xlsx",
+#      "config": {"cursos": {"data_start_row": 38, "data_end_row": 60}}},
+#     ...
+#   ]
+# Las rutas relativas se toman desde la carpeta del manifiesto y "config"
+# se mezcla sobre CONFIG solo para ese trabajo.
+
+_CONFIG_BASE = copy.deepcopy(CONFIG)
+
+
+def _combinar(base, cambios):
+    """Mezcla recursiva de diccionarios (cambios pisa a base)"""
+    for clave, valor in cambios.items():
+        if isinstance(valor, dict) and isinstance(base.get(clave), dict):
+            _combinar(base[clave], valor)
+        else:
+            base[clave] = valor
+
+
+_cache_lote = None  # CacheCorridas de este proceso del pool
+
+
+def _cache_corridas(carpeta):
+    """CacheCorridas del proceso para la carpeta (se crea la primera vez)"""
+    global _cache_lote
+    if _cache_lote is None or _cache_lote.carpeta != carpeta:
+        from motor_asignacion import CacheCorridas
+        _cache_lote = CacheCorridas(carpeta=carpeta)
+    return _cache_lote
+
+
+def procesar_trabajo(trabajo, carpeta_salida, carpeta_cache=None):
+    """
+    Carga -> asignación -> reporte -> exportación de un trabajo del manifiesto.
+    
+    Corre en un proceso del pool: CONFIG se restaura antes de aplicar los
+    cambios del trabajo y lo que imprime el pipeline va a NOMBRE.txt.
+    Con carpeta_cache, un trabajo con las mismas entradas que una corrida
+    guardada reutiliza su asignación en lugar de resolverla otra vez.
+    Devuelve (fila de resumen, filas por sala).
+    """
+    nombre = trabajo["nombre"]
+    
+    CONFIG.clear()
+    CONFIG.update(copy.deepcopy(_CONFIG_BASE))
+    _combinar(CONFIG, trabajo.get("config", {}))
+    CONFIG["monitores"]["archivo"] = trabajo["monitores"]
+    CONFIG["cursos"]["archivo"] = trabajo["cursos"]
+    
+    archivo = os.path.join(carpeta_salida, f"{nombre}.xlsx")
+    fila = {"Trabajo": nombre, "Monitores": 0, "Horarios": 0, "Asignados": 0,
+            "% Cobertura": 0.0, "Sin Monitor": 0, "Bajo Mínimo": 0,
+            "Segundos": 0.0, "Desde Caché": False, "Archivo": "", "Error": ""}
+    filas_salas = []
+    
+    t0 = time.perf_counter()
+    log = io.StringIO()
+    
+    try:
+        with contextlib.redirect_stdout(log):
+            monitores = cargar_monitores()
+            cursos = cargar_cursos()
+            if not monitores or not cursos:
+                raise ValueError("No se cargaron monitores o cursos")
+            
+            corrida = None
+            if carpeta_cache:
+                # La clave va antes de asignar: el algoritmo modifica los monitores
+                cache = _cache_corridas(carpeta_cache)
+                clave = cache.clave(monitores, pd.DataFrame(cursos), "lote")
+                corrida = cache.obtener(clave)
+            
+            if corrida is not None:
+                print("⚡ Mismas entradas que una corrida anterior")
+                asignaciones, sin_monitor, monitores = (
+                    corrida["asignaciones"], corrida["sin_monitor"], corrida["monitores"]
+                )
+                fila["Desde Caché"] = True
+            else:
+                asignaciones, sin_monitor = asignar_monitores(monitores, cursos)
+                if carpeta_cache:
+                    cache.guardar(clave, {
+                        "asignaciones": asignaciones, "sin_monitor": sin_monitor, "monitores": monitores
+                    })
+            
+            generar_reporte(monitores, asignaciones, sin_monitor)
+            exportar_resultados(asignaciones, monitores, archivo)
+        
+        exitosos = sum(1 for a in asignaciones if a["estado"] == "✅")
+        fila.update({
+            "Monitores": len(monitores),
+            "Horarios": len(asignaciones),
+            "Asignados": exitosos,
+            "% Cobertura": round(exitosos * 100 / len(asignaciones), 1),
+            "Sin Monitor": len(sin_monitor),
+            "Bajo Mínimo": sum(1 for m in monitores if m["horas"] < m["min"]),
+            "Archivo": archivo
+        })
+        
+        por_sala = {}
+        for a in asignaciones:
+            stats = por_sala.setdefault(a["sala"], [0, 0])
+            stats[0] += 1
+            stats[1] += a["estado"] == "✅"
+        filas_salas = [
+            {"Trabajo": nombre, "Sala": sala, "Total Horarios": total,
+             "Con Monitor": asignados, "% Cobertura": round(asignados * 100 / total, 1)}
+            for sala, (total, asignados) in sorted(por_sala.items())
+        ]
+        
+    except Exception as e:
+        fila["Error"] = f"{type(e).__name__}: {e}"
+    
+    fila["Segundos"] = round(time.perf_counter() - t0, 2)
+    
+    with open(os.path.join(carpeta_salida, f"{nombre}.txt"), "w", encoding="utf-8") as f:
+        f.write(log.getvalue())
+    
+    return fila, filas_salas
+
+
+def leer_manifiesto(ruta):
+    """Trabajos del manifiesto con rutas absolutas y nombres únicos"""
+    with open(ruta, encoding="utf-8") as f:
+        trabajos = json.load(f)
+    
+    base = os.path.dirname(os.path.abspath(ruta))
+    nombres = set()
+    
+    for k, trabajo in enumerate(trabajos, start=1):
+        for campo in ("monitores", "cursos"):
+            if campo not in trabajo:
+                raise ValueError(f"Trabajo {k}: falta '{campo}'")
+            trabajo[campo] = os.path.join(base, trabajo[campo])
+        
+        nombre = trabajo.get("nombre") or os.path.splitext(os.path.basename(trabajo["cursos"]))[0]
+        nombre = re.sub(r'[\\/:*?"<>|]+', "_", str(nombre))
+        if nombre in nombres:
+            nombre = f"{nombre}_{k}"
+        nombres.add(nombre)
+        trabajo["nombre"] = nombre
+    
+    return trabajos
+
+
+def procesar_lote(ruta_manifiesto, carpeta_salida="resultados_lote", max_procesos=None, carpeta_cache=None):
+    """Procesa todos los trabajos en paralelo y escribe Resumen_Lote.xlsx (con caché de corridas si hay carpeta)"""
+    trabajos = leer_manifiesto(ruta_manifiesto)
+    os.makedirs(carpeta_salida, exist_ok=True)
+    
+    print(f"📋 {len(trabajos)} trabajos en {ruta_manifiesto}")
+    
+    t0 = time.perf_counter()
+    resultados = [None] * len(trabajos)
+    
+    with ProcessPoolExecutor(max_workers=max_procesos) as pool:
+        futuros = {
+            pool.submit(procesar_trabajo, trabajo, carpeta_salida, carpeta_cache): k
+            for k, trabajo in enumerate(trabajos)
+        }
+        for futuro in as_completed(futuros):
+            k = futuros[futuro]
+            resultados[k] = futuro.result()
+            fila = resultados[k][0]
+            if fila["Error"]:
+                print(f"   ❌ {fila['Trabajo']:30} | {fila['Error']}")
+            else:
+                cache = " ⚡" if fila["Desde Caché"] else ""
+                print(f"   ✅ {fila['Trabajo']:30} | {fila['Asignados']:4}/{fila['Horarios']:4} ({fila['% Cobertura']:5.1f}%) {fila['Segundos']:6.2f}s{cache}")
+    
+    df_trabajos = pd.DataFrame([fila for fila, _ in resultados])
+    df_salas = pd.DataFrame([s for _, filas in resultados for s in filas])
+    
+    archivo = os.path.join(carpeta_salida, "Resumen_Lote.xlsx")
+    with pd.ExcelWriter(archivo, engine='openpyxl') as writer:
+        df_trabajos.to_excel(writer, sheet_name='Trabajos', index=False)
+        if not df_salas.empty:
+            df_salas.to_excel(writer, sheet_name='Salas', index=False)
+    
+    print(f"\n✅ Resumen consolidado: {archivo} ({time.perf_counter() - t0:.1f}s)")
+    return df_trabajos
+
+
 # ========================================================
 # MAIN
 # ========================================================
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Asignación de monitores por consola")
+    parser.add_argument("--lote", metavar="MANIFIESTO", help="Manifiesto JSON de trabajos (sedes/semestres)")
+    parser.add_argument("--salida", default="resultados_lote", help="Carpeta de resultados del lote")
+    parser.add_argument("--procesos", type=int, help="Procesos en paralelo (por defecto, uno por CPU)")
+    parser.add_argument("--cache", metavar="CARPETA", help="Reutiliza las corridas de trabajos con las mismas entradas")
+    args = parser.parse_args()
+    
+    if args.lote:
+        procesar_lote(args.lote, args.salida, args.procesos, args.cache)
+        sys.exit(0)
+    
     print("🚀 Sistema de Asignación de Monitores")
     print("="*70)
     
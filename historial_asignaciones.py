@@ -0,0 +1,157 @@
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+
+# ========================================================
+# ESQUEMA
+# ========================================================
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS corridas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fecha TEXT NOT NULL,
+    etiqueta TEXT,
+    total INTEGER NOT NULL,
+    asignados INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS monitores (
+    corrida_id INTEGER NOT NULL REFERENCES corridas(id) ON DELETE CASCADE,
+    nombre TEXT NOT NULL,
+    min INTEGER,
+    max INTEGER,
+    horas INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS asignaciones (
+    corrida_id INTEGER NOT NULL REFERENCES corridas(id) ON DELETE CASCADE,
+    sala TEXT,
+    dia TEXT,
+    inicio INTEGER,
+    fin INTEGER,
+    curso TEXT,
+    monitor TEXT,
+    asignado INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_corridas_fecha ON corridas(fecha);
+CREATE INDEX IF NOT EXISTS idx_monitores_nombre ON monitores(nombre COLLATE NOCASE, corrida_id);
+CREATE INDEX IF NOT EXISTS idx_asig_monitor ON asignaciones(monitor COLLATE NOCASE, corrida_id);
+CREATE INDEX IF NOT EXISTS idx_asig_sala_dia ON asignaciones(sala COLLATE NOCASE, dia, corrida_id);
+CREATE INDEX IF NOT EXISTS idx_asig_corrida ON asignaciones(corrida_id);
+"""
+
+
+def abrir_historial(ruta):
+    """Abre (o crea) la base SQLite del historial"""
+    con = sqlite3.connect(ruta)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA foreign_keys=ON")
+    con.executescript(ESQUEMA)
+    return con
+
+
+def _texto(valor):
+    """Celda -> texto limpio (None si está vacía)"""
+    if pd.isna(valor):
+        return None
+    return " ".join(str(valor).split())
+
+
+# ========================================================
+# ESCRITURA
+# ========================================================
+
+def guardar_corrida(con, df_resultado, monitores, cfg_espacios, etiqueta=None):
+    """
+    Guarda una corrida completa en una sola transacción.
+
+    df_resultado es la tabla de asignación (con MONITOR y ESTADO) y
+    cfg_espacios el bloque CONFIG["espacios"] con los nombres de columnas.
+    Devuelve el id de la corrida.
+    """
+    asignado = (df_resultado["ESTADO"] == "✅").tolist()
+
+    filas = [
+        (_texto(sala), _texto(dia), int(inicio), int(fin), _texto(curso),
+         _texto(monitor) if ok else None, int(ok))
+        for sala, dia, inicio, fin, curso, monitor, ok in zip(
+            df_resultado[cfg_espacios["col_sala"]].tolist(),
+            df_resultado["DIA_NORM"].tolist(),
+            df_resultado[cfg_espacios["col_hora_inicio"]].tolist(),
+            df_resultado[cfg_espacios["col_hora_fin"]].tolist(),
+            df_resultado[cfg_espacios["col_curso"]].tolist(),
+            df_resultado["MONITOR"].tolist(),
+            asignado
+        )
+    ]
+
+    with con:
+        cur = con.execute(
+            "INSERT INTO corridas (fecha, etiqueta, total, asignados) VALUES (?, ?, ?, ?)",
+            (datetime.now().isoformat(timespec="seconds"), etiqueta, len(filas), sum(asignado))
+        )
+        corrida_id = cur.lastrowid
+
+        con.executemany(
+            "INSERT INTO monitores (corrida_id, nombre, min, max, horas) VALUES (?, ?, ?, ?, ?)",
+            [(corrida_id, m["nombre"], m["min"], m["max"], m["horas"]) for m in monitores]
+        )
+        con.executemany(
+            "INSERT INTO asignaciones (corrida_id, sala, dia, inicio, fin, curso, monitor, asignado) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(corrida_id, *fila) for fila in filas]
+        )
+
+    return corrida_id
+
+
+# ========================================================
+# CONSULTAS
+# ========================================================
+
+def listar_corridas(con):
+    """Todas las corridas guardadas, la más reciente primero"""
+    return pd.read_sql_query(
+        "SELECT id AS Corrida, fecha AS Fecha, etiqueta AS Etiqueta, total AS Total, "
+        "asignados AS Asignados FROM corridas ORDER BY id DESC",
+        con
+    )
+
+
+def horas_monitor(con, nombre, anio=None):
+    """Horas y franjas de un monitor en cada corrida (opcionalmente de un año)"""
+    consulta = (
+        "SELECT c.id AS Corrida, c.fecha AS Fecha, c.etiqueta AS Etiqueta, "
+        "a.sala AS Sala, a.dia AS Día, a.inicio AS Inicio, a.fin AS Fin, a.curso AS Curso "
+        "FROM asignaciones a JOIN corridas c ON c.id = a.corrida_id "
+        "WHERE a.monitor = ? COLLATE NOCASE"
+    )
+    parametros = [_texto(nombre)]
+
+    if anio:
+        consulta += " AND c.fecha >= ? AND c.fecha < ?"
+        parametros += [f"{anio}-01-01", f"{int(anio) + 1}-01-01"]
+
+    consulta += " ORDER BY c.id, a.dia, a.inicio"
+    return pd.read_sql_query(consulta, con, params=parametros)
+
+
+def cobertura_sala(con, sala, dia=None):
+    """Cobertura de una sala (y opcionalmente un día) en cada corrida"""
+    consulta = (
+        "SELECT c.id AS Corrida, c.fecha AS Fecha, c.etiqueta AS Etiqueta, "
+        "COUNT(*) AS Horarios, SUM(a.asignado) AS Asignados, "
+        "ROUND(100.0 * SUM(a.asignado) / COUNT(*), 1) AS \"% Cobertura\" "
+        "FROM asignaciones a JOIN corridas c ON c.id = a.corrida_id "
+        "WHERE a.sala = ? COLLATE NOCASE"
+    )
+    parametros = [_texto(sala)]
+
+    if dia:
+        consulta += " AND a.dia = ?"
+        parametros.append(dia)
+
+    consulta += " GROUP BY c.id ORDER BY c.id"
+    return pd.read_sql_query(consulta, con, params=parametros)
@@ -0,0 +1,2622 @@
+import os
+import time
+import copy
+import hashlib
+import json
+import pickle
+import tempfile
+import numpy as np
+import pandas as pd
+import re
+import heapq
+import random
+from collections import deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from excel_inspector import (
+    CONFIG as CONFIG_MATRIZ, detectar_bloques_salas, cargar_cursos_de_bloque
+)
+
+
+# ========================================================
+# CONFIGURACIÓN
+# ========================================================
+CONFIG = {
+    "monitores": {
+        "header_row": 4,
+        "data_start_row": 5,
+        "col_nombre": "Nombre completo",
+        "col_min": None,
+        "col_max": None,
+        "horas_min_default": 8,
+        "horas_max_default": 20,
+        "col_preferencias": "Preferencias",  # columna opcional: "tarde, lunes, Sala 3, no noche"
+        "jornadas": {"mañana": 0, "tarde": 13, "noche": 18}  # hora desde la que empieza cada jornada
+    },
+    "espacios": {
+        "col_sala": "SALA",
+        "col_dia": "DIA",
+        "col_hora_inicio": "HORA_INICIO",
+        "col_hora_fin": "HORA_FIN",
+        "col_curso": "CURSO",
+        "hojas": None,  # None = todas las hojas con columnas o matriz de salas reconocibles
+        "col_monitores": "MONITORES",  # columna opcional con cuántos monitores necesita cada espacio
+        "personas_por_monitor": None  # p. ej. 40: SALA 1 (80) pide 2 monitores (None = uno por espacio)
+    },
+    "asignacion": {
+        "balancear_carga": True,
+        "priorizar_minimo": True,
+        "max_horas_seguidas": 4,
+        "descanso_minimo": 1,
+        "permitir_sobrepasar_max": False,
+        "orden": "hoja",  # "hoja" (orden del Excel) o "mas_restringido"
+        "presupuesto_segundos": 0,  # > 0 activa la búsqueda "anytime"
+        "particionar_por_dia": False,  # resolver cada día en un proceso aparte
+        "traslados": None,  # resultado de cargar_traslados(); None = sin restricción de traslado
+        "peso_preferencias": 1.0,  # horas de carga que vale un punto de preferencia (0 = ignorarlas)
+        "capacidad_traza": 100_000,  # decisiones que guarda una TrazaDecisiones (las más viejas se pisan)
+        "checkpoint": None,  # ruta .npz para retomar búsquedas con presupuesto (None = sin puntos de control)
+        "checkpoint_segundos": 10  # cada cuánto se escribe el punto de control como mucho
+    },
+    "historial": {
+        "ruta": None  # p. ej. "historial_asignaciones.db" para guardar cada corrida
+    },
+    "cache": {
+        "capacidad": 8,  # corridas completas que se recuerdan en memoria
+        "carpeta": None,  # p. ej. "cache_corridas" para guardarlas también en disco
+        "capacidad_disco": 64
+    }
+}
+
+
+# ========================================================
+# FUNCIONES DE LÓGICA DE ASIGNACIÓN
+# ========================================================
+
+def parse_time_str(time_str):
+    """Convierte '7:00am' -> 7, '2:00pm' -> 14"""
+    if pd.isna(time_str):
+        return None
+    
+    s = str(time_str).strip().lower()
+    match = re.search(r'(\d{1,2})(?::(\d{2}))?\s*(am|pm)', s)
+    if match:
+        hour = int(match.group(1))
+        meridiem = match.group(3)
+        
+        if meridiem == 'pm' and hour != 12:
+            hour += 12
+        elif meridiem == 'am' and hour == 12:
+            hour = 0
+        
+        return hour
+    
+    match = re.search(r'\d+', s)
+    if match:
+        return int(match.group(0))
+    
+    return None
+
+
+def parse_range_cell(cell_value):
+    """Convierte '7:00am-1:00pm' -> [(7, 13)]"""
+    if pd.isna(cell_value):
+        return []
+    
+    s = str(cell_value).strip().lower()
+    
+    if s in ["libre", "disponible", "todo el día", "todo el dia"]:
+        return [(7, 22)]
+    
+    if s in ["no disponible", "no", "n/a", "", "nan"]:
+        return []
+    
+    ranges = []
+    pattern = r'(\d{1,2}(?::\d{2})?\s*(?:am|pm)?)\s*-\s*(\d{1,2}(?::\d{2})?\s*(?:am|pm)?)'
+    
+    matches = re.findall(pattern, s)
+    for match in matches:
+        start = parse_time_str(match[0])
+        end = parse_time_str(match[1])
+        
+        if start is not None and end is not None:
+            ranges.append((start, end))
+    
+    return ranges
+
+
+def normalizar_dia(dia):
+    """Normaliza nombres de días"""
+    if pd.isna(dia):
+        return None
+    
+    d = str(dia).strip().lower()
+    d = d.replace('á', 'a').replace('é', 'e').replace('í', 'i').replace('ó', 'o').replace('ú', 'u')
+    d = re.sub(r'[^a-z]', '', d)
+    
+    mapeo = {
+        'lun': 'lunes',
+        'mar': 'martes',
+        'mie': 'miercoles',
+        'jue': 'jueves',
+        'vie': 'viernes',
+        'sab': 'sabado',
+        'dom': 'domingo'
+    }
+    
+    for abrev, completo in mapeo.items():
+        if d.startswith(abrev):
+            return completo
+    
+    if d in mapeo.values():
+        return d
+    
+    return d if len(d) >= 3 else None
+
+
+DIAS_SEMANA = ('lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo')
+
+
+def jornada_de_hora(hora):
+    """Jornada ('mañana', 'tarde', 'noche') en la que empieza una franja"""
+    jornada = None
+    for nombre, desde in sorted(CONFIG["monitores"]["jornadas"].items(), key=lambda x: x[1]):
+        if hora >= desde:
+            jornada = nombre
+    return jornada
+
+
+def parse_preferencias(cell_value):
+    """
+    Convierte 'prefiero tarde, lunes, Sala 3:2, no noche' en pesos por tipo.
+    
+    -> {"jornada": {"tarde": 1, "noche": -1}, "dia": {"lunes": 1}, "sala": {"SALA 3": 2}}
+    Un "no"/"evitar"/"-" delante vuelve negativo el peso; ":n" lo cambia.
+    """
+    preferencias = {}
+    if pd.isna(cell_value):
+        return preferencias
+    
+    for parte in re.split(r'[,;/\n]+', str(cell_value)):
+        s = parte.strip().lower()
+        
+        peso = 1.0
+        match = re.search(r'[:=]\s*(-?\d+(?:\.\d+)?)$', s)
+        if match:
+            peso = float(match.group(1))
+            s = s[:match.start()].strip()
+        
+        match = re.match(r'(?:no|evitar|sin)\b\s*|-\s*', s)
+        if match:
+            peso = -abs(peso)
+            s = s[match.end():]
+        s = re.sub(r'^(?:prefiero|preferiblemente|preferencia)\b\s*', '', s)
+        s = re.sub(r'^(?:en\s+)?(?:la|el|las|los)\s+', '', s).strip()
+        if not s or peso == 0:
+            continue
+        
+        jornada = s.replace('manana', 'mañana').rstrip('s')
+        # Solo el nombre exacto del día: normalizar_dia compara prefijos ("Marketing" -> martes)
+        dia = s.translate(str.maketrans('áéíóú', 'aeiou'))
+        if jornada in CONFIG["monitores"]["jornadas"]:
+            preferencias.setdefault("jornada", {})[jornada] = peso
+        elif dia in DIAS_SEMANA:
+            preferencias.setdefault("dia", {})[dia] = peso
+        else:
+            preferencias.setdefault("sala", {})[_canonico(s)] = peso
+    
+    return preferencias
+
+
+def puntaje_preferencia(monitor, dia, hora_inicio, sala):
+    """Suma de los pesos que el monitor le dio a la jornada, el día y la sala de la franja"""
+    preferencias = monitor.get("pref")
+    if not preferencias:
+        return 0
+    return (preferencias.get("jornada", {}).get(jornada_de_hora(hora_inicio), 0)
+            + preferencias.get("dia", {}).get(dia, 0)
+            + preferencias.get("sala", {}).get(_canonico(sala), 0))
+
+
+def cargar_monitores_desde_excel(ruta):
+    """Carga monitores desde Excel"""
+    cfg = CONFIG["monitores"]
+    
+    df_raw = pd.read_excel(ruta, sheet_name=0, header=None)
+    
+    dias_row = df_raw.iloc[3]
+    jornadas_row = df_raw.iloc[cfg["header_row"]]
+    
+    col_mapping = {}
+    current_dia = None
+    col_nombre_idx = None
+    col_pref_idx = None
+    
+    for idx, val in enumerate(jornadas_row):
+        val_str = str(val).strip()
+        
+        if val_str == cfg["col_nombre"]:
+            col_nombre_idx = idx
+        elif cfg.get("col_preferencias") and val_str.lower() == cfg["col_preferencias"].lower():
+            col_pref_idx = idx
+        
+        dia_val = dias_row[idx] if idx < len(dias_row) else None
+        if pd.notna(dia_val) and str(dia_val).strip():
+            current_dia = normalizar_dia(dia_val)
+        
+        val_lower = val_str.lower()
+        if val_lower in ['mañana', 'manana', 'tarde', 'noche']:
+            if current_dia:
+                key = f"{current_dia}_{val_lower}"
+                col_mapping[key] = idx
+    
+    if col_nombre_idx is None:
+        raise ValueError(f"No se encuentra la columna '{cfg['col_nombre']}'")
+    
+    monitores = []
+    
+    for row_idx in range(cfg["data_start_row"], len(df_raw)):
+        row = df_raw.iloc[row_idx]
+        
+        nombre = row[col_nombre_idx]
+        if pd.isna(nombre) or str(nombre).strip() == "":
+            continue
+        
+        mon = {
+            "id": row_idx - cfg["data_start_row"],
+            "nombre": str(nombre).strip(),
+            "min": cfg["horas_min_default"],
+            "max": cfg["horas_max_default"],
+            "horas": 0,
+            "disp": {},
+            "asignaciones": []
+        }
+        
+        dias_unicos = set(k.split('_')[0] for k in col_mapping.keys())
+        
+        for dia in dias_unicos:
+            mon["disp"][dia] = []
+            
+            for jornada in ['mañana', 'manana', 'tarde', 'noche']:
+                key = f"{dia}_{jornada}"
+                if key in col_mapping:
+                    col_idx = col_mapping[key]
+                    ranges = parse_range_cell(row[col_idx])
+                    mon["disp"][dia].extend(ranges)
+        
+        if col_pref_idx is not None:
+            mon["pref"] = parse_preferencias(row[col_pref_idx])
+        
+        monitores.append(mon)
+    
+    return monitores
+
+
+def _leer_hoja_espacios(ruta, hoja, cfg_espacios, cfg_asignacion, cfg_matriz):
+    """
+    Lee y prepara una hoja de espacios (corre en el pool cuando hay varias).
+    
+    Acepta la tabla plana (encabezados en la primera fila) o la matriz por
+    salas que entiende detectar_bloques_salas. Devuelve None si la hoja no
+    tiene ninguna de las dos formas. La configuración llega como argumento:
+    un proceso nuevo (spawn en Windows y macOS) arranca con los CONFIG por
+    defecto y no vería los cambios hechos en tiempo de ejecución.
+    """
+    CONFIG["espacios"].update(cfg_espacios)
+    CONFIG["asignacion"].update(cfg_asignacion)
+    CONFIG_MATRIZ["cursos"].update(cfg_matriz)
+    cfg = CONFIG["espacios"]
+    columnas_req = [cfg["col_sala"], cfg["col_dia"], cfg["col_hora_inicio"], 
+                    cfg["col_hora_fin"], cfg["col_curso"]]
+    
+    df_raw = pd.read_excel(ruta, sheet_name=hoja, header=None)
+    if df_raw.empty:
+        return None
+    
+    encabezado = [str(v).strip() if pd.notna(v) else "" for v in df_raw.iloc[0]]
+    
+    if all(col in encabezado for col in columnas_req):
+        df = df_raw.iloc[1:].reset_index(drop=True)
+        df.columns = encabezado
+        df = df.loc[:, [c for c in df.columns if c]]
+    else:
+        bloques = detectar_bloques_salas(df_raw, fila_titulos=1) if len(df_raw) > 1 else []
+        if not bloques:
+            return None
+        
+        cursos = []
+        for bloque in bloques:
+            cursos.extend(cargar_cursos_de_bloque(df_raw, bloque, fila_dias=CONFIG_MATRIZ["cursos"]["header_row"]))
+        if not cursos:
+            return None
+        
+        df = pd.DataFrame(cursos).rename(columns={
+            "sala": cfg["col_sala"], "dia": cfg["col_dia"], "inicio": cfg["col_hora_inicio"],
+            "fin": cfg["col_hora_fin"], "curso": cfg["col_curso"], "capacidad": "CAPACIDAD"
+        })
+    
+    df["HOJA"] = hoja
+    
+    try:
+        return preparar_espacios(df)
+    except ValueError as e:
+        raise ValueError(f"Hoja '{hoja}': {e}")
+
+
+def cargar_espacios_desde_excel(ruta, paralelo=True, max_procesos=None):
+    """
+    Carga espacios desde Excel, de todas las hojas reconocibles.
+    
+    Cada hoja se parsea y normaliza por separado (en procesos aparte si hay
+    más de una) y el resultado es una sola tabla con la columna HOJA.
+    CONFIG["espacios"]["hojas"] limita qué hojas se leen.
+    """
+    hojas = CONFIG["espacios"].get("hojas")
+    if not hojas:
+        with pd.ExcelFile(ruta) as libro:
+            hojas = libro.sheet_names
+    
+    configuracion = (dict(CONFIG["espacios"]), dict(CONFIG["asignacion"]), dict(CONFIG_MATRIZ["cursos"]))
+    
+    if paralelo and len(hojas) > 1:
+        procesos = min(len(hojas), max_procesos or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            partes = list(pool.map(
+                _leer_hoja_espacios, [ruta] * len(hojas), hojas, *([c] * len(hojas) for c in configuracion)
+            ))
+    else:
+        partes = [_leer_hoja_espacios(ruta, hoja, *configuracion) for hoja in hojas]
+    
+    partes = [(hoja, df) for hoja, df in zip(hojas, partes) if df is not None]
+    if not partes:
+        raise ValueError("Ninguna hoja tiene las columnas esperadas ni la matriz de salas")
+    
+    df = pd.concat([df for _, df in partes], ignore_index=True)
+    
+    cfg = CONFIG["espacios"]
+    for col in (cfg["col_sala"], cfg["col_dia"], cfg["col_curso"], 'DIA_NORM', 'HOJA'):
+        df[col] = df[col].astype('category')
+    
+    df.attrs["normalizacion"] = {
+        clave: sum(parte.attrs["normalizacion"][clave] for _, parte in partes)
+        for clave in ("filas", "duplicadas", "fusionadas")
+    }
+    df.attrs["hojas"] = [hoja for hoja, _ in partes]
+    
+    return df
+
+
+def preparar_espacios(df):
+    """
+    Valida el esquema y deja los espacios en forma compacta.
+    
+    SALA, DIA, CURSO y DIA_NORM quedan como categóricas y las horas como
+    int8, así que toda fila debe tener horas enteras entre 0 y 24 con
+    fin > inicio.
+    """
+    cfg = CONFIG["espacios"]
+    
+    columnas_req = [cfg["col_sala"], cfg["col_dia"], cfg["col_hora_inicio"], 
+                    cfg["col_hora_fin"], cfg["col_curso"]]
+    
+    faltantes = [col for col in columnas_req if col not in df.columns]
+    if faltantes:
+        raise ValueError(f"Columnas no encontradas: {faltantes}")
+    
+    df = df.dropna(how='all').reset_index(drop=True)
+    
+    for col in (cfg["col_hora_inicio"], cfg["col_hora_fin"]):
+        horas = pd.to_numeric(df[col], errors='coerce')
+        invalidas = horas.isna() | (horas < 0) | (horas > 24) | (horas % 1 != 0)
+        if invalidas.any():
+            filas = (df.index[invalidas] + 2).tolist()[:10]  # fila en Excel (encabezado = 1)
+            raise ValueError(f"Horas inválidas en '{col}', filas: {filas}")
+        df[col] = horas.astype('int8')
+    
+    invertidas = df[cfg["col_hora_fin"]] <= df[cfg["col_hora_inicio"]]
+    if invertidas.any():
+        filas = (df.index[invertidas] + 2).tolist()[:10]
+        raise ValueError(f"La hora de fin no es posterior a la de inicio, filas: {filas}")
+    
+    df['DIA_NORM'] = df[cfg["col_dia"]].apply(normalizar_dia)
+    df['DURACION'] = df[cfg["col_hora_fin"]] - df[cfg["col_hora_inicio"]]
+    
+    df = normalizar_espacios(df)
+    
+    for col in (cfg["col_sala"], cfg["col_dia"], cfg["col_curso"], 'DIA_NORM'):
+        df[col] = df[col].astype('category')
+    
+    return df
+
+
+def _canonico(valor):
+    """Texto canónico de una celda: sin espacios sobrantes y en mayúsculas"""
+    if pd.isna(valor):
+        return ""
+    return " ".join(str(valor).split()).upper()
+
+
+def normalizar_espacios(df_espacios):
+    """
+    Deja una fila por franja real antes de resolver.
+    
+    Cada fila se resume en un hash de sus columnas canónicas sin contar las
+    horas. Las filas idénticas se descartan y las franjas contiguas con la
+    misma clave (mismo curso, sala, día, grupo...) se fusionan en bloques de
+    hasta max_horas_seguidas. Los conteos quedan en df.attrs["normalizacion"].
+    """
+    cfg_esp = CONFIG["espacios"]
+    col_inicio = cfg_esp["col_hora_inicio"]
+    col_fin = cfg_esp["col_hora_fin"]
+    max_bloque = CONFIG["asignacion"].get("max_horas_seguidas")
+    
+    total = len(df_espacios)
+    otras = [c for c in df_espacios.columns if c not in (col_inicio, col_fin, 'DURACION')]
+    canon = df_espacios[otras].apply(lambda col: col.map(_canonico))
+    claves = pd.DataFrame({
+        "clave": pd.util.hash_pandas_object(canon, index=False).to_numpy(),
+        "inicio": df_espacios[col_inicio].to_numpy(),
+        "fin": df_espacios[col_fin].to_numpy()
+    })
+    
+    # Duplicados exactos
+    unica = ~claves.duplicated().to_numpy()
+    df = df_espacios[unica].reset_index(drop=True)
+    claves = claves[unica].reset_index(drop=True)
+    duplicadas = total - len(df)
+    
+    # Fusión de franjas contiguas
+    clave = claves["clave"].to_numpy()
+    inicios = claves["inicio"].to_numpy()
+    fines = df[col_fin].to_numpy().copy()
+    conservar = np.ones(len(df), dtype=bool)
+    
+    cabeza = None
+    for p in np.lexsort((inicios, clave)):
+        if (cabeza is not None
+                and clave[p] == clave[cabeza]
+                and inicios[p] == fines[cabeza]
+                and (not max_bloque or fines[p] - inicios[cabeza] <= max_bloque)):
+            fines[cabeza] = fines[p]
+            conservar[p] = False
+        else:
+            cabeza = p
+    
+    df[col_fin] = fines
+    df['DURACION'] = df[col_fin] - df[col_inicio]
+    df = df[conservar].reset_index(drop=True)
+    
+    df.attrs["normalizacion"] = {
+        "filas": total,
+        "duplicadas": duplicadas,
+        "fusionadas": int((~conservar).sum())
+    }
+    
+    return df
+
+
+# ========================================================
+# FORMATO INTERMEDIO (PARQUET / ARROW)
+# ========================================================
+EXTENSIONES_ARROW = (".parquet", ".arrow", ".feather")
+
+
+def _pyarrow():
+    """pyarrow es opcional: solo se importa al usar el formato intermedio"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Para leer o escribir .parquet/.arrow hay que instalar 'pyarrow'")
+    return pa, pq
+
+
+def _escribir_tabla(tabla, ruta, tipo, **extra):
+    """
+    Escribe una tabla Arrow marcada con su tipo (monitores/espacios).
+    
+    Cada valor de `extra` va como JSON en la metadata del archivo, bajo
+    asignacion_<clave> (ver _metadata).
+    """
+    pa, pq = _pyarrow()
+    
+    metadata = dict(tabla.schema.metadata or {})
+    metadata[b"asignacion_tipo"] = tipo.encode()
+    for clave, valor in extra.items():
+        texto = json.dumps(valor, ensure_ascii=False, default=_nativo)
+        metadata[f"asignacion_{clave}".encode()] = texto.encode("utf-8")
+    tabla = tabla.replace_schema_metadata(metadata)
+    
+    if ruta.lower().endswith(".parquet"):
+        pq.write_table(tabla, ruta)
+    else:
+        with pa.OSFile(ruta, "wb") as archivo:
+            with pa.ipc.new_file(archivo, tabla.schema) as escritor:
+                escritor.write_table(tabla)
+
+
+def _leer_tabla(ruta, tipo):
+    """Abre el archivo con memory-map; nada se convierte a objetos Python aquí"""
+    pa, pq = _pyarrow()
+    
+    if ruta.lower().endswith(".parquet"):
+        tabla = pq.read_table(ruta, memory_map=True)
+    else:
+        tabla = pa.ipc.open_file(pa.memory_map(ruta, "r")).read_all()
+    
+    guardado = (tabla.schema.metadata or {}).get(b"asignacion_tipo", b"").decode()
+    if guardado != tipo:
+        raise ValueError(f"El archivo no contiene {tipo} (contiene: {guardado or 'desconocido'})")
+    
+    return tabla
+
+
+def _metadata(tabla, clave):
+    """Valor guardado con _escribir_tabla(..., clave=valor), o None en archivos que no lo traen"""
+    valor = (tabla.schema.metadata or {}).get(f"asignacion_{clave}".encode())
+    return None if valor is None else json.loads(valor.decode("utf-8"))
+
+
+def _nativo(valor):
+    """default= de json.dumps: escalares de numpy como su valor Python y lo demás como texto"""
+    return valor.item() if isinstance(valor, np.generic) else str(valor)
+
+
+def _celda_json(valor):
+    """Celda de una columna object como JSON (None si está vacía): 5 vuelve como 5 y '5' como '5'"""
+    if pd.api.types.is_scalar(valor) and pd.isna(valor):
+        return None
+    return json.dumps(valor, ensure_ascii=False, default=_nativo)
+
+
+def guardar_monitores_arrow(monitores, ruta):
+    """
+    Guarda monitores con la disponibilidad empaquetada en listas paralelas.
+    
+    'dias' conserva también los días sin rangos; las preferencias van en la
+    metadata (None para quien no trae la clave 'pref').
+    """
+    pa, _ = _pyarrow()
+    
+    disp_dia, disp_inicio, disp_fin = [], [], []
+    for m in monitores:
+        dias, inicios, fines = [], [], []
+        for dia, rangos in m["disp"].items():
+            for r_inicio, r_fin in rangos:
+                dias.append(dia)
+                inicios.append(r_inicio)
+                fines.append(r_fin)
+        disp_dia.append(dias)
+        disp_inicio.append(inicios)
+        disp_fin.append(fines)
+    
+    tabla = pa.table({
+        "id": [m["id"] for m in monitores],
+        "nombre": [m["nombre"] for m in monitores],
+        "min": [m["min"] for m in monitores],
+        "max": [m["max"] for m in monitores],
+        "dias": pa.array([list(m["disp"]) for m in monitores], pa.list_(pa.string())),
+        "disp_dia": pa.array(disp_dia, pa.list_(pa.string())),
+        "disp_inicio": pa.array(disp_inicio, pa.list_(pa.int16())),
+        "disp_fin": pa.array(disp_fin, pa.list_(pa.int16()))
+    })
+    _escribir_tabla(tabla, ruta, "monitores", preferencias=[m.get("pref") for m in monitores])
+
+
+def cargar_monitores_arrow(ruta):
+    """Carga monitores guardados con guardar_monitores_arrow"""
+    tabla = _leer_tabla(ruta, "monitores")
+    col = tabla.to_pydict()
+    preferencias = _metadata(tabla, "preferencias")
+    
+    monitores = []
+    for k in range(len(col["id"])):
+        disp = {dia: [] for dia in col["dias"][k]} if "dias" in col else {}
+        for dia, r_inicio, r_fin in zip(col["disp_dia"][k], col["disp_inicio"][k], col["disp_fin"][k]):
+            disp.setdefault(dia, []).append((r_inicio, r_fin))
+        
+        monitor = {
+            "id": col["id"][k],
+            "nombre": col["nombre"][k],
+            "min": col["min"][k],
+            "max": col["max"][k],
+            "horas": 0,
+            "disp": disp,
+            "asignaciones": []
+        }
+        if preferencias is not None and preferencias[k] is not None:
+            monitor["pref"] = preferencias[k]
+        monitores.append(monitor)
+    
+    return monitores
+
+
+def guardar_espacios_arrow(df_espacios, ruta):
+    """
+    Guarda los espacios ya normalizados con sus tipos.
+    
+    Categorías e int8 pasan tal cual; las columnas object (GRUPO, por
+    ejemplo, con números y celdas vacías) van celda a celda como JSON para
+    no volverse float64. El esquema y los conteos de normalización quedan
+    en la metadata.
+    """
+    pa, _ = _pyarrow()
+    
+    objetos = [col for col in df_espacios.columns if df_espacios[col].dtype == object]
+    df = df_espacios.copy()
+    for col in objetos:
+        df[col] = df[col].map(_celda_json)
+    
+    _escribir_tabla(
+        pa.Table.from_pandas(df, preserve_index=False), ruta, "espacios",
+        esquema={col: str(tipo) for col, tipo in df_espacios.dtypes.items()},
+        objetos=objetos,
+        attrs={clave: df_espacios.attrs[clave] for clave in ("normalizacion", "hojas") if clave in df_espacios.attrs}
+    )
+
+
+def cargar_espacios_arrow(ruta):
+    """Carga espacios guardados con guardar_espacios_arrow, sin volver a normalizar"""
+    tabla = _leer_tabla(ruta, "espacios")
+    df = tabla.to_pandas(split_blocks=True)
+    
+    for col in _metadata(tabla, "objetos") or ():
+        df[col] = pd.Series(
+            [json.loads(v) if isinstance(v, str) else np.nan for v in df[col].tolist()], index=df.index, dtype=object
+        )
+    for col, tipo in (_metadata(tabla, "esquema") or {}).items():
+        if col in df.columns and str(df[col].dtype) != tipo:
+            df[col] = df[col].astype(tipo)
+    
+    df.attrs.update(_metadata(tabla, "attrs") or {})
+    df.attrs.setdefault("normalizacion", {"filas": len(df), "duplicadas": 0, "fusionadas": 0})
+    return df
+
+
+def cargar_monitores_desde_archivo(ruta):
+    """Monitores desde Excel o desde el formato intermedio, según la extensión"""
+    if ruta.lower().endswith(EXTENSIONES_ARROW):
+        return cargar_monitores_arrow(ruta)
+    return cargar_monitores_desde_excel(ruta)
+
+
+def cargar_espacios_desde_archivo(ruta):
+    """Espacios desde Excel o desde el formato intermedio, según la extensión"""
+    if ruta.lower().endswith(EXTENSIONES_ARROW):
+        return cargar_espacios_arrow(ruta)
+    return cargar_espacios_desde_excel(ruta)
+
+
+def cargar_asignacion_previa(ruta):
+    """Hoja 'Asignaciones' de un resultado exportado (p. ej. el del semestre anterior)"""
+    df = pd.read_excel(ruta, sheet_name='Asignaciones')
+    
+    faltantes = {CONFIG["espacios"]["col_sala"], "MONITOR", "ESTADO"} - set(df.columns)
+    if faltantes:
+        raise ValueError(f"El archivo no parece un resultado exportado; faltan columnas: {sorted(faltantes)}")
+    return df
+
+
+def cargar_traslados(ruta, hoja=0):
+    """
+    Matriz de minutos de traslado entre salas.
+    
+    La hoja tiene las salas en la primera columna y en la primera fila; una
+    celda vacía es 0 y si falta B -> A se usa A -> B. Devuelve lo que va en
+    CONFIG["asignacion"]["traslados"]: los minutos por par de salas
+    canónicas y cuántas horas de hueco hay que mirar hacia cada lado.
+    """
+    df = pd.read_excel(ruta, sheet_name=hoja, index_col=0)
+    
+    minutos = {}
+    for origen, fila in df.iterrows():
+        if pd.isna(origen):
+            continue
+        for destino, valor in fila.items():
+            valor = pd.to_numeric(valor, errors='coerce')
+            if pd.notna(valor) and valor > 0 and not str(destino).startswith("Unnamed"):
+                minutos.setdefault(_canonico(origen), {})[_canonico(destino)] = float(valor)
+    
+    for origen, fila in list(minutos.items()):
+        for destino, valor in fila.items():
+            minutos.setdefault(destino, {}).setdefault(origen, valor)
+    
+    if not minutos:
+        raise ValueError("La hoja de traslados no tiene minutos entre salas")
+    
+    maximo = max(valor for fila in minutos.values() for valor in fila.values())
+    return {"minutos": minutos, "horas_vecinas": int(np.ceil(maximo / 60))}
+
+
+# ========================================================
+# TRAZA DE DECISIONES
+# ========================================================
+#
+# Registro opcional de cada decisión: cuántos candidatos factibles tenía el
+# espacio, a quién se eligió y quién quedó segundo, con sus horas antes de
+# asignar y su puntaje de preferencia. Es un arreglo estructurado
+# preasignado que se usa como anillo; los algoritmos solo lo tocan si
+# reciben una traza.
+
+FASE_MINIMO = 1
+FASE_CARGA = 2
+FASE_RESTRINGIDO = 3
+FASE_CONCILIACION = 4
+
+CRITERIOS_FASE = {
+    FASE_MINIMO: "fase 1 · más horas faltantes para el mínimo (+ peso × preferencia)",
+    FASE_CARGA: "fase 2 · menos horas asignadas (− peso × preferencia)",
+    FASE_RESTRINGIDO: "más restringido primero · déficit de mínimo y luego menor carga",
+    FASE_CONCILIACION: "conciliación por día · déficit de mínimo y luego menor carga"
+}
+
+
+class TrazaDecisiones:
+    """Anillo preasignado con la decisión tomada en cada espacio"""
+    
+    CAMPOS = np.dtype([
+        ("espacio", np.int64), ("puesto", np.int16), ("fase", np.int8), ("candidatos", np.int32),
+        ("elegido", np.int32), ("horas_elegido", np.float32), ("pref_elegido", np.float32),
+        ("segundo", np.int32), ("horas_segundo", np.float32), ("pref_segundo", np.float32)
+    ])
+    
+    def __init__(self, capacidad=None):
+        if capacidad is None:
+            capacidad = CONFIG["asignacion"]["capacidad_traza"]
+        self.datos = np.zeros(capacidad, dtype=self.CAMPOS)
+        self.n = 0
+    
+    def reiniciar(self):
+        self.n = 0
+    
+    @staticmethod
+    def columnas(df_espacios):
+        """Etiqueta de índice y puesto de cada fila (lo que identifica a un espacio en la traza)"""
+        etiquetas = df_espacios.index.to_numpy(dtype=np.int64)
+        if 'PUESTO' in df_espacios.columns:
+            return etiquetas, df_espacios['PUESTO'].to_numpy()
+        return etiquetas, np.ones(len(df_espacios), dtype=np.int16)
+    
+    def anotar(self, espacio, puesto, fase, candidatos, elegido, segundo, monitores, puntajes):
+        """Anota una decisión; va antes de _registrar para guardar las horas previas"""
+        self.datos[self.n % len(self.datos)] = (
+            espacio, puesto, fase, candidatos,
+            elegido, monitores[elegido]["horas"] if elegido >= 0 else np.nan, puntajes.get(elegido, 0),
+            segundo, monitores[segundo]["horas"] if segundo >= 0 else np.nan, puntajes.get(segundo, 0)
+        )
+        self.n += 1
+    
+    def registros(self):
+        """Registros vigentes, del más viejo al más nuevo"""
+        capacidad = len(self.datos)
+        if self.n <= capacidad:
+            return self.datos[:self.n]
+        k = self.n % capacidad
+        return np.concatenate((self.datos[k:], self.datos[:k]))
+    
+    def agregar(self, registros):
+        """Agrega registros de otra traza (p. ej. los de cada proceso en asignar_por_dia)"""
+        for registro in registros[-len(self.datos):]:
+            self.datos[self.n % len(self.datos)] = registro
+            self.n += 1
+    
+    def copiar_de(self, otra):
+        self.datos[:] = otra.datos
+        self.n = otra.n
+    
+    def consultar(self, espacio, puesto=1):
+        """Última decisión registrada para un espacio y puesto (None si no está)"""
+        registros = self.registros()
+        coincide = np.flatnonzero((registros["espacio"] == espacio) & (registros["puesto"] == puesto))
+        return registros[coincide[-1]] if len(coincide) else None
+    
+    def explicar(self, espacio, puesto, monitores):
+        """Texto con el porqué de la decisión de un espacio"""
+        registro = self.consultar(espacio, puesto)
+        if registro is None:
+            return (f"🧭 Espacio {espacio} (puesto {puesto}): sin registro en la traza "
+                    "(conservado de una corrida previa o ya pisado por decisiones más nuevas)")
+        
+        texto = (f"🧭 Espacio {espacio} (puesto {puesto}) · {registro['candidatos']} candidatos factibles\n"
+                 f"   Criterio: {CRITERIOS_FASE[int(registro['fase'])]}")
+        if registro["elegido"] < 0:
+            return texto + "\n   ❌ Ningún candidato pudo tomarlo"
+        
+        for icono, etiqueta, campo in (("✅", "Elegido", "elegido"), ("🥈", "Segundo", "segundo")):
+            pos = int(registro[campo])
+            if pos < 0:
+                texto += f"\n   {icono} {etiqueta}: no hubo otro candidato"
+            else:
+                texto += (f"\n   {icono} {etiqueta}: {monitores[pos]['nombre']}"
+                          f" ({registro['horas_' + campo]:g}h antes de asignar,"
+                          f" preferencia {registro['pref_' + campo]:+g})")
+        return texto
+    
+    def tabla(self, monitores):
+        """Hoja 'Traza' del archivo exportado"""
+        registros = self.registros()
+        nombres = np.array([m["nombre"] for m in monitores] + ["SIN MONITOR", ""], dtype=object)
+        elegidos = np.where(registros["elegido"] >= 0, registros["elegido"], len(monitores))
+        segundos = np.where(registros["segundo"] >= 0, registros["segundo"], len(monitores) + 1)
+        
+        return pd.DataFrame({
+            'Espacio': registros["espacio"],
+            'Puesto': registros["puesto"],
+            'Fase': [CRITERIOS_FASE[f].split(" · ")[0] for f in registros["fase"].tolist()],
+            'Candidatos': registros["candidatos"],
+            'Elegido': nombres[elegidos],
+            'Horas Elegido': registros["horas_elegido"],
+            'Pref. Elegido': registros["pref_elegido"],
+            'Segundo': nombres[segundos],
+            'Horas Segundo': registros["horas_segundo"],
+            'Pref. Segundo': registros["pref_segundo"]
+        })
+
+
+# ========================================================
+# DISPONIBILIDAD Y ASIGNACIÓN
+# ========================================================
+
+def esta_disponible(monitor, dia, hora_inicio, hora_fin):
+    """Verifica disponibilidad del monitor"""
+    if dia not in monitor["disp"]:
+        return False
+    
+    for r_inicio, r_fin in monitor["disp"][dia]:
+        if hora_inicio >= r_inicio and hora_fin <= r_fin:
+            return True
+    
+    return False
+
+
+class IndiceDisponibilidad:
+    """
+    Índice de disponibilidad por franja.
+    
+    Agrupa los rangos de todos los monitores por día y resuelve cada
+    (dia, inicio, fin) una sola vez; las consultas repetidas salen de caché.
+    Devuelve posiciones en la lista de monitores, en orden ascendente,
+    con la misma semántica que esta_disponible. También guarda, por
+    franja y sala, el puntaje de preferencia de cada candidato.
+    """
+    
+    def __init__(self, monitores):
+        self.monitores = monitores
+        self._rangos_por_dia = {}
+        self._cache = {}
+        self._puntajes = {}
+        self._con_preferencias = {pos for pos, m in enumerate(monitores) if m.get("pref")}
+        
+        for pos, m in enumerate(monitores):
+            for dia, rangos in m["disp"].items():
+                lista = self._rangos_por_dia.setdefault(dia, [])
+                for r_inicio, r_fin in rangos:
+                    lista.append((r_inicio, r_fin, pos))
+    
+    def candidatos(self, dia, hora_inicio, hora_fin):
+        """Posiciones de los monitores disponibles en la franja"""
+        clave = (dia, hora_inicio, hora_fin)
+        posiciones = self._cache.get(clave)
+        
+        if posiciones is None:
+            encontrados = {
+                pos for r_inicio, r_fin, pos in self._rangos_por_dia.get(dia, ())
+                if hora_inicio >= r_inicio and hora_fin <= r_fin
+            }
+            posiciones = tuple(sorted(encontrados))
+            self._cache[clave] = posiciones
+        
+        return posiciones
+    
+    def preferencias(self, dia, hora_inicio, hora_fin, sala):
+        """
+        Puntaje de preferencia por posición para los candidatos de la franja.
+        
+        Solo trae a los que tienen puntaje distinto de 0 (el resto vale 0);
+        vacío si nadie declaró preferencias.
+        """
+        if not self._con_preferencias:
+            return {}
+        
+        clave = (dia, hora_inicio, hora_fin, sala)
+        puntajes = self._puntajes.get(clave)
+        
+        if puntajes is None:
+            puntajes = {}
+            for pos in self.candidatos(dia, hora_inicio, hora_fin):
+                if pos in self._con_preferencias:
+                    puntaje = puntaje_preferencia(self.monitores[pos], dia, hora_inicio, sala)
+                    if puntaje:
+                        puntajes[pos] = puntaje
+            self._puntajes[clave] = puntajes
+        
+        return puntajes
+    
+    def cobertura_parcial(self, dia, hora_inicio, hora_fin):
+        """Horas de la franja cubiertas por el mejor rango de cada monitor (solo si > 0)"""
+        cobertura = {}
+        for r_inicio, r_fin, pos in self._rangos_por_dia.get(dia, ()):
+            horas = min(hora_fin, r_fin) - max(hora_inicio, r_inicio)
+            if horas > cobertura.get(pos, 0):
+                cobertura[pos] = horas
+        return cobertura
+    
+    def actualizar_monitor(self, pos):
+        """Rehace las entradas de un monitor tras cambiar su 'disp' o 'pref' (solo invalida sus días)"""
+        afectados = {dia for dia, lista in self._rangos_por_dia.items() if any(r[2] == pos for r in lista)}
+        afectados.update(self.monitores[pos]["disp"])
+        
+        for dia in afectados:
+            lista = [r for r in self._rangos_por_dia.get(dia, ()) if r[2] != pos]
+            lista.extend((r_inicio, r_fin, pos) for r_inicio, r_fin in self.monitores[pos]["disp"].get(dia, ()))
+            self._rangos_por_dia[dia] = lista
+        
+        self._cache = {clave: v for clave, v in self._cache.items() if clave[0] not in afectados}
+        self._con_preferencias.discard(pos)
+        if self.monitores[pos].get("pref"):
+            self._con_preferencias.add(pos)
+        self._puntajes = {}
+    
+    def agregar_monitor(self, monitor):
+        """Agrega un monitor al final de la lista e indexa su disponibilidad"""
+        self.monitores.append(monitor)
+        self.actualizar_monitor(len(self.monitores) - 1)
+
+
+def bloque_seguido(monitor, dia, hora_inicio, hora_fin):
+    """
+    Largo del bloque continuo que forma la franja con las asignaciones del día (0 si no toca ninguna).
+    
+    Las franjas que se tocan o se cruzan se encadenan, igual que en
+    validar_resultado: con 8-10 y 10-12 asignadas, 12-14 forma un bloque de 6h.
+    """
+    inicio, fin, toca = _extremos_bloque(monitor, dia, hora_inicio, hora_fin)
+    return fin - inicio if toca else 0
+
+
+def _extremos_bloque(monitor, dia, hora_inicio, hora_fin):
+    """(inicio, fin, toca) del bloque encadenado que forma la franja con las asignaciones del día"""
+    bloques = []
+    for inicio, fin, _ in sorted(_agenda(monitor)["dia"].get(dia, ()), key=lambda franja: franja[0]):
+        if bloques and inicio <= bloques[-1][1]:
+            bloques[-1][1] = max(bloques[-1][1], fin)
+        else:
+            bloques.append([inicio, fin])
+    
+    # Los bloques existentes no se tocan entre sí: solo crecen los que toca la franja
+    inicio, fin, toca = hora_inicio, hora_fin, False
+    for b_inicio, b_fin in bloques:
+        if b_inicio <= hora_fin and b_fin >= hora_inicio:
+            inicio, fin, toca = min(inicio, b_inicio), max(fin, b_fin), True
+    return inicio, fin, toca
+
+
+def se_cruza(monitor, dia, hora_inicio, hora_fin, sala=None):
+    """
+    La franja se superpone con otra asignación del mismo día.
+    
+    La misma sala con la misma franja no cuenta: es el mismo espacio con
+    varios cursos, igual que en validar_resultado.
+    """
+    for asig in monitor["asignaciones"]:
+        if (asig["dia"] == dia and hora_inicio < asig["fin"] and hora_fin > asig["inicio"]
+                and not (asig["inicio"] == hora_inicio and asig["fin"] == hora_fin and asig.get("sala") == sala)):
+            return True
+    return False
+
+
+def _agenda(monitor):
+    """
+    Salas por (día, hora de fin) y (día, hora de inicio) de las asignaciones,
+    y las franjas (inicio, fin, sala) de cada día (sala None si no se anotó).
+    
+    Vive en monitor["_agenda"] y se pone al día solo con las asignaciones
+    nuevas; si la lista de asignaciones se reemplazó o se acortó (copias,
+    reinicios) se rearma una vez.
+    """
+    agenda = monitor.get("_agenda")
+    asignaciones = monitor["asignaciones"]
+    
+    if agenda is None or agenda["lista"] is not asignaciones or agenda["n"] > len(asignaciones):
+        agenda = {"lista": asignaciones, "n": 0, "fin": {}, "inicio": {}, "dia": {}}
+        monitor["_agenda"] = agenda
+    
+    for asig in asignaciones[agenda["n"]:]:
+        sala = None
+        if asig.get("sala") is not None:
+            sala = _canonico(asig["sala"])
+            agenda["fin"].setdefault((asig["dia"], asig["fin"]), []).append(sala)
+            agenda["inicio"].setdefault((asig["dia"], asig["inicio"]), []).append(sala)
+        agenda["dia"].setdefault(asig["dia"], []).append((asig["inicio"], asig["fin"], sala))
+    agenda["n"] = len(asignaciones)
+    
+    return agenda
+
+
+def respeta_traslados(monitor, dia, hora_inicio, hora_fin, sala, traslados):
+    """
+    La franja deja tiempo de llegar desde la asignación anterior y hasta la siguiente.
+    
+    Una franja que se superpone con otra en una sala distinta nunca lo deja
+    (el hueco sería negativo). Fuera de eso solo mira las horas vecinas
+    (hasta horas_vecinas de hueco a cada lado) en la agenda del monitor.
+    """
+    agenda = _agenda(monitor)
+    minutos = traslados["minutos"]
+    sala = _canonico(sala)
+    desde_sala = minutos.get(sala, {})
+    
+    for otro_inicio, otro_fin, otra_sala in agenda["dia"].get(dia, ()):
+        if hora_inicio < otro_fin and hora_fin > otro_inicio and otra_sala is not None and otra_sala != sala:
+            return False
+    
+    for hueco in range(traslados["horas_vecinas"]):
+        for anterior in agenda["fin"].get((dia, hora_inicio - hueco), ()):
+            if minutos.get(anterior, {}).get(sala, 0) > hueco * 60:
+                return False
+        for siguiente in agenda["inicio"].get((dia, hora_fin + hueco), ()):
+            if desde_sala.get(siguiente, 0) > hueco * 60:
+                return False
+    
+    return True
+
+
+def verificar_restricciones(monitor, dia, hora_inicio, hora_fin, sala=None):
+    """Verifica restricciones adicionales (cruces, horas seguidas y, con sala, traslados)"""
+    cfg = CONFIG["asignacion"]
+    
+    if se_cruza(monitor, dia, hora_inicio, hora_fin, sala):
+        return False
+    
+    if (cfg.get("max_horas_seguidas")
+            and bloque_seguido(monitor, dia, hora_inicio, hora_fin) > cfg["max_horas_seguidas"]):
+        return False
+    
+    traslados = cfg.get("traslados")
+    if traslados and sala is not None:
+        return respeta_traslados(monitor, dia, hora_inicio, hora_fin, sala, traslados)
+    
+    return True
+
+
+# Códigos de resultado por fila (los valores >= 0 son posiciones de monitor)
+NO_TRATADO = -1
+SIN_MONITOR = -2
+DIA_INVALIDO = -3
+
+
+def _columnas_solver(df_espacios):
+    """Columnas que necesita el algoritmo, como listas nativas"""
+    cfg_esp = CONFIG["espacios"]
+    return (
+        df_espacios[cfg_esp["col_sala"]].tolist(),
+        df_espacios['DIA_NORM'].tolist(),
+        df_espacios[cfg_esp["col_hora_inicio"]].tolist(),
+        df_espacios[cfg_esp["col_hora_fin"]].tolist(),
+        df_espacios['DURACION'].tolist()
+    )
+
+
+def _registrar(monitor, dia, inicio, fin, duracion, sala=None):
+    """Anota una franja en el monitor"""
+    monitor["horas"] += duracion
+    monitor["asignaciones"].append({
+        "dia": dia,
+        "inicio": inicio,
+        "fin": fin,
+        "sala": sala
+    })
+
+
+def monitores_requeridos(df_espacios):
+    """
+    Cuántos monitores necesita cada espacio (al menos 1).
+    
+    Manda la columna col_monitores si existe. Si no (o está vacía) y hay
+    personas_por_monitor, se deriva de la capacidad: la columna CAPACIDAD
+    de la matriz de salas o el número entre paréntesis del nombre de la sala.
+    """
+    cfg = CONFIG["espacios"]
+    requeridos = pd.Series(np.nan, index=df_espacios.index)
+    
+    col = cfg.get("col_monitores")
+    if col and col in df_espacios.columns:
+        requeridos = pd.to_numeric(df_espacios[col], errors='coerce')
+    
+    por_monitor = cfg.get("personas_por_monitor")
+    if por_monitor and requeridos.isna().any():
+        capacidad = pd.Series(np.nan, index=df_espacios.index)
+        if 'CAPACIDAD' in df_espacios.columns:
+            capacidad = pd.to_numeric(df_espacios['CAPACIDAD'], errors='coerce')
+        
+        salas = df_espacios[cfg["col_sala"]].astype('category')
+        en_titulo = salas.cat.categories.astype(str).str.extract(r'\((\d+)\)', expand=False).astype(float)
+        capacidad = capacidad.fillna(pd.Series(
+            np.asarray(en_titulo)[salas.cat.codes.to_numpy()], index=df_espacios.index
+        ).where(salas.cat.codes.to_numpy() >= 0))
+        
+        requeridos = requeridos.fillna(np.ceil(capacidad / por_monitor))
+    
+    return requeridos.fillna(1).clip(lower=1).to_numpy(dtype=np.int64)
+
+
+def expandir_puestos(df_espacios):
+    """
+    Una fila por monitor requerido: el espacio se repite con PUESTO 1..k.
+    
+    Los puestos de un espacio quedan contiguos y conservan su etiqueta de
+    índice, con REQUERIDOS = k. Si todos piden un monitor (o ya está
+    expandido) devuelve el mismo DataFrame.
+    """
+    if 'PUESTO' in df_espacios.columns:
+        return df_espacios
+    
+    requeridos = monitores_requeridos(df_espacios)
+    if (requeridos == 1).all():
+        return df_espacios
+    
+    df = df_espacios.iloc[np.repeat(np.arange(len(df_espacios)), requeridos)].copy()
+    primera = np.repeat(np.cumsum(requeridos) - requeridos, requeridos)
+    df['PUESTO'] = (np.arange(len(df)) - primera + 1).astype(np.int16)
+    df['REQUERIDOS'] = np.repeat(requeridos, requeridos).astype(np.int16)
+    
+    return df
+
+
+def _grupos_puestos(df_espacios):
+    """(primera fila, cantidad de puestos) de cada espacio, en orden"""
+    if 'PUESTO' not in df_espacios.columns:
+        return [(i, 1) for i in range(len(df_espacios))]
+    
+    primeras = np.flatnonzero(df_espacios['PUESTO'].to_numpy() == 1)
+    return list(zip(primeras.tolist(), np.diff(np.append(primeras, len(df_espacios))).tolist()))
+
+
+def construir_resultado(df_espacios, elegido, monitores):
+    """
+    Arma el resultado a partir del arreglo de elecciones.
+    
+    Toma las filas tratadas del DataFrame de espacios (sin copiar fila por
+    fila) y le agrega las columnas MONITOR y ESTADO. Devuelve también la
+    lista de espacios sin monitor, que es corta (ver espacios_sin_monitor).
+    """
+    tratado = elegido != NO_TRATADO
+    
+    nombres = np.array(
+        [m["nombre"] for m in monitores] + ["DÍA INVÁLIDO", "SIN MONITOR"],
+        dtype=object
+    )
+    codigos = np.where(
+        elegido >= 0, elegido,
+        np.where(elegido == DIA_INVALIDO, len(monitores), len(monitores) + 1)
+    )
+    
+    df_resultado = df_espacios[tratado].copy()
+    df_resultado["MONITOR"] = nombres[codigos[tratado]]
+    df_resultado["ESTADO"] = np.where(elegido[tratado] >= 0, "✅", "❌")
+    
+    if 'PUESTO' in df_resultado.columns:
+        # Cobertura del espacio completo en cada uno de sus puestos
+        cubiertos = (df_resultado["ESTADO"] == "✅").groupby(level=0).transform('sum')
+        df_resultado["COBERTURA"] = cubiertos.astype(str) + "/" + df_resultado['REQUERIDOS'].astype(str)
+    
+    return df_resultado, espacios_sin_monitor(df_resultado)
+
+
+def espacios_sin_monitor(df_resultado):
+    """
+    Filas no cubiertas del resultado, como registros de espacio.
+    
+    Con puestos, cada registro lleva en OCUPADOS a los monitores que ya
+    cubren otro puesto del mismo espacio (no pueden tomar este).
+    """
+    fallidas = df_resultado[df_resultado["ESTADO"] != "✅"]
+    registros = fallidas.drop(columns=["MONITOR", "ESTADO", "COBERTURA"], errors="ignore").to_dict('records')
+    
+    if 'PUESTO' in df_resultado.columns and registros:
+        # Un recorrido por las filas asignadas (un groupby por espacio es lento)
+        ocupados = {etiqueta: [] for etiqueta in fallidas.index}
+        asignadas = df_resultado["ESTADO"].to_numpy() == "✅"
+        for etiqueta, monitor in zip(df_resultado.index[asignadas], df_resultado["MONITOR"].to_numpy()[asignadas]):
+            if etiqueta in ocupados:
+                ocupados[etiqueta].append(monitor)
+        for registro, etiqueta in zip(registros, fallidas.index):
+            registro["OCUPADOS"] = list(ocupados[etiqueta])
+    
+    return registros
+
+
+def sembrar_asignacion_previa(monitores, df_espacios, df_previo):
+    """
+    Conserva los pares (monitor, espacio) de una corrida anterior que sigan siendo factibles.
+    
+    Una sola pasada por los espacios actuales con búsqueda O(1) en un
+    diccionario (sala, día, inicio, fin, curso, puesto) -> monitores armado con las
+    filas asignadas del resultado previo; filas repetidas toman sus monitores
+    en orden. Registra los pares conservados en los monitores y devuelve
+    (elegido, previas), con NO_TRATADO en el resto.
+    """
+    cfg_esp = CONFIG["espacios"]
+    
+    asignadas = df_previo[df_previo["ESTADO"] == "✅"].dropna(
+        subset=[cfg_esp["col_hora_inicio"], cfg_esp["col_hora_fin"]]
+    )
+    if "DIA_NORM" in asignadas.columns:
+        dias_previos = asignadas["DIA_NORM"].tolist()
+    else:
+        dias_previos = [normalizar_dia(d) for d in asignadas[cfg_esp["col_dia"]].tolist()]
+    
+    puestos_previos = asignadas['PUESTO'].tolist() if 'PUESTO' in asignadas.columns else [1] * len(asignadas)
+    
+    previo = {}
+    for sala, dia, inicio, fin, curso, puesto, monitor in zip(
+        asignadas[cfg_esp["col_sala"]].tolist(),
+        dias_previos,
+        asignadas[cfg_esp["col_hora_inicio"]].tolist(),
+        asignadas[cfg_esp["col_hora_fin"]].tolist(),
+        asignadas[cfg_esp["col_curso"]].tolist(),
+        puestos_previos,
+        asignadas["MONITOR"].tolist()
+    ):
+        clave = (_canonico(sala), dia, int(inicio), int(fin), _canonico(curso), int(puesto))
+        previo.setdefault(clave, []).append(_canonico(monitor))
+    for lista in previo.values():
+        lista.reverse()  # se consumen con pop() en el orden original
+    por_nombre = {_canonico(m["nombre"]): pos for pos, m in enumerate(monitores)}
+    
+    salas, dias, inicios, fines, duraciones = _columnas_solver(df_espacios)
+    cursos = df_espacios[cfg_esp["col_curso"]].tolist()
+    puestos = df_espacios['PUESTO'].tolist() if 'PUESTO' in df_espacios.columns else [1] * len(df_espacios)
+    elegido = np.full(len(df_espacios), NO_TRATADO, dtype=np.int32)
+    
+    for i, dia in enumerate(dias):
+        if pd.isna(dia):
+            continue
+        
+        inicio = inicios[i]
+        fin = fines[i]
+        lista = previo.get((_canonico(salas[i]), dia, inicio, fin, _canonico(cursos[i]), puestos[i]))
+        if not lista:
+            continue
+        pos = por_nombre.get(lista.pop())
+        if pos is None:
+            continue
+        
+        monitor = monitores[pos]
+        if (esta_disponible(monitor, dia, inicio, fin)
+                and monitor["horas"] + duraciones[i] <= monitor["max"]
+                and verificar_restricciones(monitor, dia, inicio, fin, salas[i])):
+            _registrar(monitor, dia, inicio, fin, duraciones[i], salas[i])
+            elegido[i] = pos
+    
+    return elegido, len(asignadas)
+
+
+def _resolver(monitores, df_espacios, indice, elegido=None, traza=None):
+    """
+    Fases 1 y 2 en orden de hoja; devuelve el arreglo de elecciones.
+    
+    Un espacio con k puestos se resuelve de una vez: se filtran sus
+    candidatos una sola vez y se toman los k mejores distintos (el que se
+    elige no cambia la factibilidad de los demás). Con traza se pide uno
+    más para saber quién quedó segundo.
+    """
+    cfg_asig = CONFIG["asignacion"]
+    peso = cfg_asig.get("peso_preferencias", 0)
+    
+    salas, dias, inicios, fines, duraciones = _columnas_solver(df_espacios)
+    if elegido is None:
+        elegido = np.full(len(df_espacios), NO_TRATADO, dtype=np.int32)
+    fijos = elegido >= 0  # sembrados desde una corrida previa
+    cubiertas = set()  # (SALA, DIA_NORM, HORA_INICIO) ya presentes en el resultado
+    grupos = _grupos_puestos(df_espacios)
+    extra = 1 if traza is not None else 0
+    if traza is not None:
+        etiquetas, puestos = traza.columnas(df_espacios)
+    
+    def clave_franja(i):
+        clave = (salas[i], dias[i], inicios[i])
+        return None if any(pd.isna(v) for v in clave) else clave
+    
+    for i in np.flatnonzero(fijos).tolist():
+        cubiertas.add(clave_franja(i))
+    
+    # Fase 1: Priorizar mínimo
+    if cfg_asig.get("priorizar_minimo"):
+        for i, k in grupos:
+            dia = dias[i]
+            if pd.isna(dia):
+                continue
+            
+            libres = [j for j in range(i, i + k) if elegido[j] < 0]
+            if not libres:
+                continue
+            ocupados = {int(elegido[j]) for j in range(i, i + k) if elegido[j] >= 0}
+            
+            inicio = inicios[i]
+            fin = fines[i]
+            duracion = duraciones[i]
+            
+            candidatos = [
+                pos for pos in indice.candidatos(dia, inicio, fin)
+                if pos not in ocupados
+                and monitores[pos]["horas"] < monitores[pos]["min"]
+                and monitores[pos]["horas"] + duracion <= monitores[pos]["max"]
+                and verificar_restricciones(monitores[pos], dia, inicio, fin, salas[i])
+            ]
+            
+            if candidatos:
+                puntajes = indice.preferencias(dia, inicio, fin, salas[i]) if peso else {}
+                mejores = heapq.nlargest(
+                    len(libres) + extra, candidatos,
+                    key=lambda p: monitores[p]["min"] - monitores[p]["horas"] + peso * puntajes.get(p, 0)
+                )
+                segundo = mejores.pop() if len(mejores) > len(libres) else -1
+                for j, pos in zip(libres, mejores):
+                    if traza is not None:
+                        traza.anotar(etiquetas[j], puestos[j], FASE_MINIMO, len(candidatos),
+                                     pos, segundo, monitores, puntajes)
+                    _registrar(monitores[pos], dia, inicio, fin, duracion, salas[i])
+                    elegido[j] = pos
+                cubiertas.add(clave_franja(i))
+    
+    # Fase 2: Asignar restantes
+    for i, k in grupos:
+        dia = dias[i]
+        if pd.isna(dia):
+            elegido[i:i + k] = DIA_INVALIDO
+            continue
+        
+        libres = [j for j in range(i, i + k) if elegido[j] < 0]
+        if not libres:
+            continue
+        
+        clave = clave_franja(i)
+        if len(libres) == k and clave is not None and clave in cubiertas:
+            continue
+        cubiertas.add(clave)
+        ocupados = {int(elegido[j]) for j in range(i, i + k) if elegido[j] >= 0}
+        
+        inicio = inicios[i]
+        fin = fines[i]
+        duracion = duraciones[i]
+        
+        candidatos = [
+            pos for pos in indice.candidatos(dia, inicio, fin)
+            if pos not in ocupados
+            and monitores[pos]["horas"] + duracion <= monitores[pos]["max"]
+            and verificar_restricciones(monitores[pos], dia, inicio, fin, salas[i])
+        ]
+        
+        puntajes = indice.preferencias(dia, inicio, fin, salas[i]) if peso else {}
+        if cfg_asig.get("balancear_carga"):
+            mejores = heapq.nsmallest(
+                len(libres) + extra, candidatos, key=lambda p: monitores[p]["horas"] - peso * puntajes.get(p, 0)
+            )
+        elif puntajes:
+            mejores = heapq.nlargest(len(libres) + extra, candidatos, key=lambda p: puntajes.get(p, 0))
+        else:
+            mejores = candidatos[:len(libres) + extra]
+        segundo = mejores.pop() if len(mejores) > len(libres) else -1
+        
+        for j, pos in zip(libres, mejores):
+            if traza is not None:
+                traza.anotar(etiquetas[j], puestos[j], FASE_CARGA, len(candidatos),
+                             pos, segundo, monitores, puntajes)
+            _registrar(monitores[pos], dia, inicio, fin, duracion, salas[i])
+            elegido[j] = pos
+        for j in libres[len(mejores):]:
+            if traza is not None:
+                traza.anotar(etiquetas[j], puestos[j], FASE_CARGA, len(candidatos),
+                             SIN_MONITOR, -1, monitores, puntajes)
+            elegido[j] = SIN_MONITOR
+    
+    return elegido
+
+
+def asignar_monitores(monitores, df_espacios, indice=None, previo=None, traza=None):
+    """
+    Algoritmo principal de asignación.
+    
+    Con `previo` (hoja 'Asignaciones' de un resultado anterior) primero se
+    conservan los pares que siguen siendo factibles y solo se resuelve el
+    resto; cuántos se conservaron queda en df_resultado.attrs["arranque"].
+    Los espacios que piden varios monitores salen con una fila por puesto
+    (ver expandir_puestos). Con `traza` (TrazaDecisiones) se anota cada
+    decisión.
+    """
+    df_espacios = expandir_puestos(df_espacios)
+    
+    if indice is None:
+        indice = IndiceDisponibilidad(monitores)
+    
+    elegido = None
+    if previo is not None:
+        elegido, previas = sembrar_asignacion_previa(monitores, df_espacios, previo)
+        conservadas = int((elegido >= 0).sum())
+    
+    elegido = _resolver_segun_orden(monitores, df_espacios, indice, elegido, traza)
+    df_resultado, sin_monitor = construir_resultado(df_espacios, elegido, monitores)
+    
+    if previo is not None:
+        df_resultado.attrs["arranque"] = {"previas": previas, "conservadas": conservadas}
+    
+    return df_resultado, sin_monitor, monitores
+
+
+def _resolver_segun_orden(monitores, df_espacios, indice, elegido=None, traza=None):
+    """Resuelve los espacios (ya expandidos) con el orden de CONFIG["asignacion"]["orden"]"""
+    if CONFIG["asignacion"].get("orden") == "mas_restringido":
+        return _resolver_mas_restringido(monitores, df_espacios, indice, elegido, traza)
+    return _resolver(monitores, df_espacios, indice, elegido, traza)
+
+
+def _elegir_monitor(monitores, posiciones, puntajes=None):
+    """Misma preferencia que las fases 1 y 2: déficit de mínimo y luego menor carga (con preferencias)"""
+    cfg_asig = CONFIG["asignacion"]
+    peso = cfg_asig.get("peso_preferencias", 0)
+    puntajes = puntajes or {}
+    
+    if cfg_asig.get("priorizar_minimo"):
+        bajo_minimo = [pos for pos in posiciones if monitores[pos]["horas"] < monitores[pos]["min"]]
+        if bajo_minimo:
+            return max(bajo_minimo, key=lambda pos: (
+                monitores[pos]["min"] - monitores[pos]["horas"] + peso * puntajes.get(pos, 0)
+            ))
+    
+    if cfg_asig.get("balancear_carga"):
+        return min(posiciones, key=lambda pos: monitores[pos]["horas"] - peso * puntajes.get(pos, 0))
+    
+    if puntajes and peso:
+        return max(posiciones, key=lambda pos: puntajes.get(pos, 0))
+    
+    return posiciones[0]
+
+
+def _resolver_mas_restringido(monitores, df_espacios, indice, elegido=None, traza=None):
+    """
+    Asignación "más restringido primero" (estilo DSATUR).
+    
+    Cada espacio arranca con sus candidatos del índice y se atiende siempre
+    el que tenga menos candidatos vivos. Al asignar, solo se revisan los
+    espacios pendientes del monitor elegido: un candidato que deja de ser
+    factible no vuelve a serlo, así que los conteos solo bajan. Cada puesto
+    es un pendiente aparte; al asignar uno, el monitor sale de sus hermanos.
+    
+    Los pendientes van por (monitor, día). verificar_restricciones solo se
+    repite para los del mismo día que tocan el bloque encadenado de la
+    franja nueva (más horas_vecinas con traslados); en el resto solo puede
+    cambiar el tope 'max', y se revisa únicamente si el espacio libre bajó
+    de la mayor duración pendiente del monitor.
+    """
+    salas, dias, inicios, fines, duraciones = _columnas_solver(df_espacios)
+    if elegido is None:
+        elegido = np.full(len(df_espacios), NO_TRATADO, dtype=np.int32)
+    
+    hermanos = [range(i, i) for i in range(len(df_espacios))]
+    for i, k in _grupos_puestos(df_espacios):
+        if k > 1:
+            for j in range(i, i + k):
+                hermanos[j] = range(i, i + k)
+    puestos = df_espacios['PUESTO'].tolist() if 'PUESTO' in df_espacios.columns else [1] * len(df_espacios)
+    if traza is not None:
+        etiquetas = traza.columnas(df_espacios)[0]
+    
+    traslados = CONFIG["asignacion"].get("traslados")
+    alcance = traslados["horas_vecinas"] if traslados else 0
+    
+    vivos = {}
+    pendientes = [{} for _ in monitores]  # pos -> día -> espacios pendientes
+    mayor_duracion = [0] * len(monitores)  # cota de la duración pendiente más larga de cada monitor
+    # Mismo criterio que _resolver: un espacio sin puestos sembrados cuya
+    # franja (sala, día, inicio) ya está cubierta se salta completo
+    vistos = {(salas[i], dias[i], inicios[i]) for i in np.flatnonzero(elegido >= 0).tolist()}
+    
+    for i, k in _grupos_puestos(df_espacios):
+        dia = dias[i]
+        if pd.isna(dia):
+            elegido[i:i + k] = DIA_INVALIDO
+            continue
+        
+        libres = [j for j in range(i, i + k) if elegido[j] < 0]
+        if not libres:
+            continue
+        
+        clave = (salas[i], dia, inicios[i])
+        if any(pd.isna(v) for v in clave):
+            clave = None
+        if len(libres) == k and clave is not None and clave in vistos:
+            continue
+        vistos.add(clave)
+        
+        inicio = inicios[i]
+        fin = fines[i]
+        duracion = duraciones[i]
+        ocupados = {int(elegido[j]) for j in range(i, i + k) if elegido[j] >= 0}
+        
+        # Sin asignaciones previas (lo habitual al arrancar) no hay restricción que revisar
+        candidatos = {
+            pos for pos in indice.candidatos(dia, inicio, fin)
+            if pos not in ocupados
+            and monitores[pos]["horas"] + duracion <= monitores[pos]["max"]
+            and (not monitores[pos]["asignaciones"]
+                 or verificar_restricciones(monitores[pos], dia, inicio, fin, salas[i]))
+        }
+        for j in libres:
+            vivos[j] = set(candidatos)
+            for pos in candidatos:
+                pendientes[pos].setdefault(dia, []).append(j)
+                mayor_duracion[pos] = max(mayor_duracion[pos], duracion)
+    
+    heap = [(len(cands), i) for i, cands in vivos.items()]
+    heapq.heapify(heap)
+    
+    while heap:
+        conteo, i = heapq.heappop(heap)
+        if i not in vivos or conteo != len(vivos[i]):
+            continue
+        
+        candidatos_pos = vivos.pop(i)
+        
+        if not candidatos_pos:
+            if traza is not None:
+                traza.anotar(etiquetas[i], puestos[i], FASE_RESTRINGIDO, 0, SIN_MONITOR, -1, monitores, {})
+            elegido[i] = SIN_MONITOR
+            continue
+        
+        puntajes = indice.preferencias(dias[i], inicios[i], fines[i], salas[i])
+        pos_elegido = _elegir_monitor(monitores, sorted(candidatos_pos), puntajes)
+        if traza is not None:
+            resto = sorted(candidatos_pos - {pos_elegido})
+            segundo = _elegir_monitor(monitores, resto, puntajes) if resto else -1
+            traza.anotar(etiquetas[i], puestos[i], FASE_RESTRINGIDO, len(candidatos_pos),
+                         pos_elegido, segundo, monitores, puntajes)
+        monitor = monitores[pos_elegido]
+        _registrar(monitor, dias[i], inicios[i], fines[i], duraciones[i], salas[i])
+        elegido[i] = pos_elegido
+        
+        for j in hermanos[i]:
+            if j in vivos and pos_elegido in vivos[j]:
+                vivos[j].discard(pos_elegido)
+                heapq.heappush(heap, (len(vivos[j]), j))
+        
+        # Solo cambian los candidatos que dependían del monitor elegido
+        libre = monitor["max"] - monitor["horas"]
+        desde, hasta, _ = _extremos_bloque(monitor, dias[i], inicios[i], fines[i])
+        desde -= alcance
+        hasta += alcance
+        revisar_tope = libre < mayor_duracion[pos_elegido]
+        if revisar_tope:
+            mayor_duracion[pos_elegido] = 0
+        
+        for dia, lista in pendientes[pos_elegido].items():
+            mismo_dia = dia == dias[i]
+            if not (mismo_dia or revisar_tope):
+                continue
+            
+            siguen = []
+            for j in lista:
+                if j not in vivos:
+                    continue
+                if duraciones[j] <= libre and not (
+                        mismo_dia and inicios[j] <= hasta and fines[j] >= desde
+                        and not verificar_restricciones(monitor, dia, inicios[j], fines[j], salas[j])):
+                    siguen.append(j)
+                    if revisar_tope:
+                        mayor_duracion[pos_elegido] = max(mayor_duracion[pos_elegido], duraciones[j])
+                else:
+                    vivos[j].discard(pos_elegido)
+                    heapq.heappush(heap, (len(vivos[j]), j))
+            pendientes[pos_elegido][dia] = siguen
+    
+    return elegido
+
+
+def resumen_preferencias(monitores):
+    """
+    Qué tanto respeta la solución las preferencias declaradas.
+    
+    Por tipo (jornada, día, sala) da el porcentaje de franjas que caen en
+    algo preferido, contando solo a los monitores que pidieron algo de ese
+    tipo; 'evitadas' son las franjas en algo que se pidió evitar.
+    """
+    conteo = {tipo: [0, 0] for tipo in ("jornada", "dia", "sala")}
+    evitadas = 0
+    con_preferencias = 0
+    
+    for m in monitores:
+        preferencias = m.get("pref")
+        if not preferencias:
+            continue
+        con_preferencias += 1
+        
+        for asig in m["asignaciones"]:
+            valores = {
+                "jornada": jornada_de_hora(asig["inicio"]),
+                "dia": asig["dia"],
+                "sala": _canonico(asig.get("sala"))
+            }
+            evita = False
+            for tipo, valor in valores.items():
+                pesos = preferencias.get(tipo, {})
+                peso = pesos.get(valor, 0)
+                if any(p > 0 for p in pesos.values()):
+                    conteo[tipo][0] += peso > 0
+                    conteo[tipo][1] += 1
+                evita = evita or peso < 0
+            evitadas += evita
+    
+    return {
+        "monitores": con_preferencias,
+        "porcentajes": {tipo: cumplidas * 100 / total for tipo, (cumplidas, total) in conteo.items() if total},
+        "evitadas": evitadas
+    }
+
+
+def resumen_asignacion(df_resultado, monitores):
+    """Estadísticas compactas de una solución (lo único que viaja en cada mejora)"""
+    exitosos = int((df_resultado["ESTADO"] == "✅").sum())
+    horas = [m["horas"] for m in monitores]
+    
+    return {
+        "total": len(df_resultado),
+        "asignados": exitosos,
+        "sin_monitor": len(df_resultado) - exitosos,
+        "bajo_minimo": sum(1 for m in monitores if m["horas"] < m["min"]),
+        "dispersion": (max(horas) - min(horas)) if horas else 0
+    }
+
+
+def asignar_con_presupuesto(monitores, df_espacios, segundos, indice=None,
+                            al_mejorar=None, detener=None, semilla=0, traza=None, checkpoint=None):
+    """
+    Asignación "anytime" con presupuesto de tiempo.
+    
+    La primera vuelta es la asignación normal; las siguientes repiten el
+    algoritmo con los espacios barajados y se guarda la mejor (más asignados,
+    menos monitores bajo el mínimo, menor dispersión de carga). al_mejorar
+    recibe el resumen de cada mejora y detener() corta entre vueltas.
+    El estado ganador queda escrito en 'monitores' (y su traza en `traza`).
+    
+    Con `checkpoint` (o CONFIG["asignacion"]["checkpoint"]) se guarda cada
+    checkpoint_segundos un punto de control; si al empezar hay uno de las
+    mismas entradas, se retoma desde ahí con el tiempo ya usado. Si
+    detener() corta la búsqueda, el punto de control se actualiza y se
+    conserva; solo se borra cuando se agota el presupuesto. La traza de
+    un ganador anterior al corte no se recupera.
+    """
+    cfg_asig = CONFIG["asignacion"]
+    if indice is None:
+        indice = IndiceDisponibilidad(monitores)
+    borrador = TrazaDecisiones(len(traza.datos)) if traza is not None else None
+    
+    rng = random.Random(semilla)
+    t0 = time.perf_counter()
+    
+    mejor = None
+    mejor_clave = None
+    vuelta = 0
+    
+    if checkpoint is None:
+        checkpoint = cfg_asig.get("checkpoint")
+    if checkpoint:
+        huella = _huella(monitores, df_espacios, semilla)
+        ultimo_guardado = t0
+        previo = cargar_checkpoint(checkpoint, huella)
+        if previo is not None:
+            copia = [{**m, "asignaciones": list(m["asignaciones"])} for m in monitores]
+            df = expandir_puestos(df_espacios)
+            elegido = _elegido_desde_libro(df, previo)
+            df_resultado, sin_monitor = _reconstruir(df, elegido, copia)
+            mejor = (df, elegido, df_resultado, sin_monitor, copia)
+            resumen = resumen_asignacion(df_resultado, copia)
+            mejor_clave = (resumen["asignados"], -resumen["bajo_minimo"], -resumen["dispersion"])
+            rng.setstate(previo["rng"])
+            vuelta = previo["vuelta"]
+            t0 -= previo["segundos"]
+            if al_mejorar:
+                al_mejorar({**resumen, "vuelta": vuelta - 1, "segundos": previo["segundos"], "retomado": True})
+    
+    while True:
+        # Copia ligera: 'disp' se comparte, solo cambian horas y asignaciones
+        copia = [{**m, "asignaciones": list(m["asignaciones"])} for m in monitores]
+        
+        df = expandir_puestos(df_espacios if vuelta == 0 else df_espacios.sample(
+            frac=1, random_state=rng.randrange(2**32)
+        ))
+        
+        if borrador is not None:
+            borrador.reiniciar()
+        elegido = _resolver_segun_orden(copia, df, indice, traza=borrador)
+        df_resultado, sin_monitor = construir_resultado(df, elegido, copia)
+        resumen = resumen_asignacion(df_resultado, copia)
+        clave = (resumen["asignados"], -resumen["bajo_minimo"], -resumen["dispersion"])
+        
+        if mejor is None or clave > mejor_clave:
+            mejor = (df, elegido, df_resultado, sin_monitor, copia)
+            mejor_clave = clave
+            if traza is not None:
+                traza.copiar_de(borrador)
+            if al_mejorar:
+                al_mejorar({**resumen, "vuelta": vuelta, "segundos": time.perf_counter() - t0})
+        
+        vuelta += 1
+        interrumpido = bool(detener and detener())
+        if time.perf_counter() - t0 >= segundos or interrumpido:
+            break
+        
+        if checkpoint and time.perf_counter() - ultimo_guardado >= cfg_asig.get("checkpoint_segundos", 0):
+            guardar_checkpoint(checkpoint, huella, mejor[0], mejor[1], rng, vuelta, time.perf_counter() - t0)
+            ultimo_guardado = time.perf_counter()
+    
+    if checkpoint:
+        if interrumpido:
+            # Detenido a mano: el punto de control queda al día para retomar
+            guardar_checkpoint(checkpoint, huella, mejor[0], mejor[1], rng, vuelta, time.perf_counter() - t0)
+        elif os.path.exists(checkpoint):
+            os.remove(checkpoint)
+    
+    _, _, df_resultado, sin_monitor, copia = mejor
+    for m, ganador in zip(monitores, copia):
+        m["horas"] = ganador["horas"]
+        m["asignaciones"] = ganador["asignaciones"]
+    
+    return df_resultado.sort_index(kind='stable'), sin_monitor, monitores
+
+
+def _repartir(total, pesos):
+    """Reparte un entero según pesos (mayor residuo); la suma nunca pasa de total"""
+    suma = sum(pesos)
+    if total <= 0 or suma <= 0:
+        return [0] * len(pesos)
+    
+    cuotas = [total * p / suma for p in pesos]
+    partes = [int(c) for c in cuotas]
+    sobrante = int(total) - sum(partes)
+    
+    por_residuo = sorted(range(len(pesos)), key=lambda k: cuotas[k] - partes[k], reverse=True)
+    for k in por_residuo[:sobrante]:
+        if pesos[k] > 0:
+            partes[k] += 1
+    
+    return partes
+
+
+def _resolver_dia(monitores_dia, df_dia, cfg_asignacion, capacidad_traza=0):
+    """Trabajo de un proceso: resuelve un día con los topes diarios ya repartidos"""
+    CONFIG["asignacion"].update(cfg_asignacion)
+    
+    previas = [len(m["asignaciones"]) for m in monitores_dia]
+    indice = IndiceDisponibilidad(monitores_dia)
+    traza = TrazaDecisiones(capacidad_traza) if capacidad_traza else None
+    elegido = _resolver_segun_orden(monitores_dia, df_dia, indice, traza=traza)
+    
+    # Solo viaja de vuelta lo que cambió en cada monitor
+    cambios = [
+        (m["horas"], m["asignaciones"][n:])
+        for m, n in zip(monitores_dia, previas)
+    ]
+    return elegido, cambios, (traza.registros() if traza is not None else None)
+
+
+def asignar_por_dia(monitores, df_espacios, indice=None, paralelo=True, max_procesos=None, traza=None):
+    """
+    Asignación particionada por DIA_NORM.
+    
+    Los días solo se relacionan por los topes semanales 'min'/'max', así que
+    cada monitor recibe un tope diario proporcional a las horas de espacios
+    que puede cubrir ese día (según el índice). Cada día se resuelve en un
+    proceso aparte y al final una pasada de conciliación reintenta los
+    espacios SIN MONITOR con los topes semanales reales.
+    """
+    df_espacios = expandir_puestos(df_espacios)
+    if indice is None:
+        indice = IndiceDisponibilidad(monitores)
+    
+    salas, dias_fila, inicios, fines, duraciones = _columnas_solver(df_espacios)
+    elegido = np.full(len(df_espacios), NO_TRATADO, dtype=np.int32)
+    
+    filas_por_dia = {}
+    for i, dia in enumerate(dias_fila):
+        if pd.isna(dia):
+            elegido[i] = DIA_INVALIDO
+        else:
+            filas_por_dia.setdefault(dia, []).append(i)
+    dias = list(filas_por_dia)
+    
+    # Demanda por monitor y día, en horas
+    demanda = [[0] * len(dias) for _ in monitores]
+    for d, dia in enumerate(dias):
+        for i in filas_por_dia[dia]:
+            for pos in indice.candidatos(dia, inicios[i], fines[i]):
+                demanda[pos][d] += duraciones[i]
+    
+    topes_max = [_repartir(m["max"] - m["horas"], demanda[pos]) for pos, m in enumerate(monitores)]
+    topes_min = [_repartir(max(m["min"] - m["horas"], 0), demanda[pos]) for pos, m in enumerate(monitores)]
+    
+    # A los procesos solo viajan las columnas que usa el algoritmo
+    cfg_esp = CONFIG["espacios"]
+    df_dia = df_espacios[[cfg_esp["col_sala"], 'DIA_NORM', cfg_esp["col_hora_inicio"],
+                          cfg_esp["col_hora_fin"], 'DURACION']
+                         + (['PUESTO'] if 'PUESTO' in df_espacios.columns else [])]
+    
+    trabajos = []
+    for d, dia in enumerate(dias):
+        monitores_dia = [{
+            "id": m["id"],
+            "nombre": m["nombre"],
+            "min": topes_min[pos][d],
+            "max": topes_max[pos][d],
+            "horas": 0,
+            "disp": {dia: m["disp"].get(dia, [])},
+            "pref": m.get("pref", {}),
+            "asignaciones": [a for a in m["asignaciones"] if a["dia"] == dia]
+        } for pos, m in enumerate(monitores)]
+        trabajos.append((monitores_dia, df_dia.iloc[filas_por_dia[dia]], dict(CONFIG["asignacion"]),
+                         len(traza.datos) if traza is not None else 0))
+    
+    if paralelo and len(trabajos) > 1:
+        with ProcessPoolExecutor(max_workers=max_procesos) as pool:
+            resultados = list(pool.map(_resolver_dia, *zip(*trabajos)))
+    else:
+        resultados = [_resolver_dia(*t) for t in trabajos]
+    
+    for dia, (elegido_dia, cambios, registros) in zip(dias, resultados):
+        elegido[filas_por_dia[dia]] = elegido_dia
+        for m, (horas, nuevas) in zip(monitores, cambios):
+            m["horas"] += horas
+            m["asignaciones"].extend(nuevas)
+        if traza is not None:
+            traza.agregar(registros)
+    
+    # Conciliación: lo que sobró de los topes diarios se usa con el tope semanal
+    puestos = df_espacios['PUESTO'].to_numpy() if 'PUESTO' in df_espacios.columns else None
+    requeridos = df_espacios['REQUERIDOS'].to_numpy() if puestos is not None else None
+    if traza is not None:
+        etiquetas, puestos_traza = traza.columnas(df_espacios)
+    for i in np.flatnonzero(elegido == SIN_MONITOR):
+        dia = dias_fila[i]
+        ocupados = set()
+        if puestos is not None:
+            primera = i - puestos[i] + 1
+            ocupados = {int(p) for p in elegido[primera:primera + requeridos[i]] if p >= 0}
+        posiciones = [
+            pos for pos in indice.candidatos(dia, inicios[i], fines[i])
+            if pos not in ocupados
+            and monitores[pos]["horas"] + duraciones[i] <= monitores[pos]["max"]
+            and verificar_restricciones(monitores[pos], dia, inicios[i], fines[i], salas[i])
+        ]
+        if not posiciones:
+            continue
+        
+        puntajes = indice.preferencias(dia, inicios[i], fines[i], salas[i])
+        pos = _elegir_monitor(monitores, posiciones, puntajes)
+        if traza is not None:
+            resto = [p for p in posiciones if p != pos]
+            traza.anotar(etiquetas[i], puestos_traza[i], FASE_CONCILIACION, len(posiciones),
+                         pos, _elegir_monitor(monitores, resto, puntajes) if resto else -1, monitores, puntajes)
+        _registrar(monitores[pos], dia, inicios[i], fines[i], duraciones[i], salas[i])
+        elegido[i] = pos
+    
+    df_resultado, sin_monitor = construir_resultado(df_espacios, elegido, monitores)
+    
+    return df_resultado, sin_monitor, monitores
+
+
+# ========================================================
+# PUNTOS DE CONTROL
+# ========================================================
+#
+# Un punto de control guarda lo mínimo para retomar una búsqueda larga: el
+# libro de la mejor solución (etiqueta de espacio, puesto y código elegido
+# por fila), el estado del generador aleatorio, la vuelta y el tiempo
+# usado; las horas de los monitores se rehacen desde el libro. Se escribe
+# a un temporal y se cambia de nombre con os.replace, así que un corte a
+# mitad de escritura deja intacto el punto de control anterior. La huella
+# de las entradas evita retomar con otros datos u otra configuración.
+
+# Claves de CONFIG["asignacion"] que no cambian el resultado de una vuelta
+_CLAVES_SIN_EFECTO = ("presupuesto_segundos", "capacidad_traza", "checkpoint", "checkpoint_segundos")
+
+
+def _huella_df(df):
+    """SHA-256 del contenido de un DataFrame (índice y columnas incluidos)"""
+    h = hashlib.sha256(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    h.update(repr(list(df.columns)).encode())
+    return h.hexdigest()
+
+
+def _huella(monitores, df_espacios, *extra):
+    """SHA-256 de monitores, espacios, la configuración que afecta al resultado y lo que se agregue"""
+    h = hashlib.sha256()
+    for m in monitores:
+        h.update(repr((
+            m["nombre"], m["min"], m["max"], m["horas"], sorted(m["disp"].items()),
+            sorted((tipo, sorted(pesos.items())) for tipo, pesos in m.get("pref", {}).items()),
+            [tuple(a.values()) for a in m["asignaciones"]]
+        )).encode())
+    h.update(_huella_df(df_espacios).encode())
+    h.update(repr(sorted(
+        (clave, repr(valor)) for clave, valor in CONFIG["asignacion"].items() if clave not in _CLAVES_SIN_EFECTO
+    )).encode())
+    h.update(repr(sorted(CONFIG["espacios"].items())).encode())
+    h.update(repr(CONFIG["monitores"]["jornadas"]).encode())
+    h.update(repr(extra).encode())
+    return h.hexdigest()
+
+
+def ruta_checkpoint(monitores, df_espacios, semilla=0, carpeta=None):
+    """
+    Punto de control propio de estas entradas (en el temporal del sistema si no hay carpeta).
+    
+    Va antes de resolver, como la huella que se guarda dentro: dos
+    búsquedas con entradas distintas no se pisan el archivo.
+    """
+    huella = _huella(monitores, df_espacios, semilla)
+    return os.path.join(carpeta or tempfile.gettempdir(), f"asignacion_checkpoint_{huella[:16]}.npz")
+
+
+def guardar_checkpoint(ruta, huella, df_espacios, elegido, rng, vuelta, segundos):
+    """Escribe el punto de control de forma atómica"""
+    tratado = elegido != NO_TRATADO
+    etiquetas, puestos = TrazaDecisiones.columnas(df_espacios)
+    version, estado, gauss = rng.getstate()
+    
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "wb") as f:
+        np.savez(
+            f,
+            huella=np.array(huella),
+            espacio=etiquetas[tratado],
+            puesto=puestos[tratado],
+            codigo=elegido[tratado],
+            rng=np.array(estado, dtype=np.int64),
+            rng_version=version,
+            vuelta=vuelta,
+            segundos=segundos
+        )
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, ruta)
+
+
+def cargar_checkpoint(ruta, huella):
+    """Punto de control de estas mismas entradas, o None (si no hay, es de otras o está dañado)"""
+    try:
+        with np.load(ruta) as datos:
+            if str(datos["huella"]) != huella:
+                return None
+            return {
+                "espacio": datos["espacio"],
+                "puesto": datos["puesto"],
+                "codigo": datos["codigo"],
+                "rng": (int(datos["rng_version"]), tuple(datos["rng"].tolist()), None),
+                "vuelta": int(datos["vuelta"]),
+                "segundos": float(datos["segundos"])
+            }
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _elegido_desde_libro(df_espacios, libro):
+    """Arreglo de elecciones alineado con df_espacios a partir del libro guardado"""
+    etiquetas, puestos = TrazaDecisiones.columnas(df_espacios)
+    filas = pd.MultiIndex.from_arrays([etiquetas, puestos]).get_indexer(
+        pd.MultiIndex.from_arrays([libro["espacio"], libro["puesto"]])
+    )
+    elegido = np.full(len(df_espacios), NO_TRATADO, dtype=np.int32)
+    elegido[filas[filas >= 0]] = libro["codigo"][filas >= 0]
+    return elegido
+
+
+def _reconstruir(df_espacios, elegido, monitores):
+    """Vuelve a anotar en los monitores las franjas del arreglo de elecciones y arma el resultado"""
+    salas, dias, inicios, fines, duraciones = _columnas_solver(df_espacios)
+    for i in np.flatnonzero(elegido >= 0).tolist():
+        _registrar(monitores[elegido[i]], dias[i], inicios[i], fines[i], duraciones[i], salas[i])
+    return construir_resultado(df_espacios, elegido, monitores)
+
+
+# ========================================================
+# CACHÉ DE CORRIDAS
+# ========================================================
+#
+# Volver a asignar con las mismas entradas devuelve la corrida guardada
+# (resultado, reporte, diagnóstico...) en vez de resolver de nuevo. La
+# clave es la huella de monitores, espacios y configuración más el modo y
+# la semilla. En memoria quedan las últimas `capacidad` corridas (LRU);
+# con carpeta también se guardan en disco, un pickle por clave escrito con
+# os.replace, y se descartan las de uso más viejo.
+
+class CacheCorridas:
+    """Corridas completas por huella de sus entradas"""
+    
+    def __init__(self, capacidad=None, carpeta=None):
+        cfg = CONFIG["cache"]
+        self.capacidad = cfg["capacidad"] if capacidad is None else capacidad
+        self.carpeta = cfg["carpeta"] if carpeta is None else carpeta
+        self._memoria = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        
+        if self.carpeta:
+            os.makedirs(self.carpeta, exist_ok=True)
+    
+    @staticmethod
+    def clave(monitores, df_espacios, modo="normal", semilla=0, previo=None, **extra):
+        """Huella de una corrida; va antes de resolver (el algoritmo modifica los monitores)"""
+        return _huella(
+            monitores, df_espacios, modo, semilla,
+            _huella_df(previo) if previo is not None else None, sorted(extra.items())
+        )
+    
+    def _ruta(self, clave):
+        return os.path.join(self.carpeta, f"{clave}.pkl")
+    
+    def _recordar(self, clave, corrida):
+        self._memoria[clave] = corrida
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.capacidad:
+            self._memoria.popitem(last=False)
+    
+    def obtener(self, clave):
+        """Copia de la corrida guardada, o None"""
+        corrida = self._memoria.get(clave)
+        if corrida is not None:
+            self._memoria.move_to_end(clave)
+        elif self.carpeta:
+            ruta = self._ruta(clave)
+            try:
+                with open(ruta, "rb") as f:
+                    corrida = pickle.load(f)
+                os.utime(ruta)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                corrida = None
+            if corrida is not None:
+                self._recordar(clave, corrida)
+        
+        if corrida is None:
+            self.fallos += 1
+            return None
+        self.aciertos += 1
+        return copy.deepcopy(corrida)
+    
+    def guardar(self, clave, corrida):
+        """Guarda una copia de la corrida (un dict con lo que haga falta para mostrarla)"""
+        corrida = copy.deepcopy(corrida)
+        self._recordar(clave, corrida)
+        
+        if self.carpeta:
+            ruta = self._ruta(clave)
+            temporal = f"{ruta}.{os.getpid()}.tmp"  # varios procesos pueden compartir la carpeta
+            with open(temporal, "wb") as f:
+                pickle.dump(corrida, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporal, ruta)
+            
+            try:
+                guardadas = sorted(
+                    (os.path.join(self.carpeta, nombre) for nombre in os.listdir(self.carpeta) if nombre.endswith(".pkl")),
+                    key=os.path.getmtime
+                )
+                for vieja in guardadas[:-CONFIG["cache"]["capacidad_disco"]]:
+                    os.remove(vieja)
+            except FileNotFoundError:
+                pass  # otro proceso ya la quitó
+
+
+# ========================================================
+# COTA SUPERIOR DE COBERTURA (FLUJO MÁXIMO)
+# ========================================================
+
+def _flujo_maximo(num_nodos, aristas, fuente, sumidero):
+    """Dinic sobre una lista de aristas (u, v, capacidad)"""
+    ady = [[] for _ in range(num_nodos)]
+    destino = []
+    cap = []
+    
+    for u, v, c in aristas:
+        ady[u].append(len(destino))
+        destino.append(v)
+        cap.append(c)
+        ady[v].append(len(destino))
+        destino.append(u)
+        cap.append(0)
+    
+    flujo = 0
+    
+    while True:
+        nivel = [-1] * num_nodos
+        nivel[fuente] = 0
+        cola = deque([fuente])
+        while cola:
+            u = cola.popleft()
+            for e in ady[u]:
+                if cap[e] > 0 and nivel[destino[e]] < 0:
+                    nivel[destino[e]] = nivel[u] + 1
+                    cola.append(destino[e])
+        
+        if nivel[sumidero] < 0:
+            return flujo
+        
+        siguiente = [0] * num_nodos
+        
+        def empujar(u, limite):
+            if u == sumidero:
+                return limite
+            while siguiente[u] < len(ady[u]):
+                e = ady[u][siguiente[u]]
+                v = destino[e]
+                if cap[e] > 0 and nivel[v] == nivel[u] + 1:
+                    f = empujar(v, min(limite, cap[e]))
+                    if f > 0:
+                        cap[e] -= f
+                        cap[e ^ 1] += f
+                        return f
+                siguiente[u] += 1
+            return 0
+        
+        while True:
+            f = empujar(fuente, float('inf'))
+            if f == 0:
+                break
+            flujo += f
+
+
+def cota_superior_cobertura(monitores, df_resultado, indice):
+    """
+    Cota superior del número de filas del resultado que se pueden cubrir.
+    
+    Se calcula sobre las mismas filas que trae el resultado (un puesto por
+    fila, ya sin las franjas repetidas que el algoritmo descarta), así que
+    se compara directamente con los asignados. Las horas que esas filas
+    sumaron a cada monitor se descuentan para partir de su estado antes de
+    resolver.
+    
+    Flujo máximo fuente -> franja (dia, inicio, fin) -> monitor -> sumidero.
+    Cada monitor recibe como capacidad cuántas filas caben en sus horas
+    libres tomando las más cortas primero. Relaja max_horas_seguidas, así
+    que ningún algoritmo que respete 'max' puede superar este valor.
+    """
+    cfg_esp = CONFIG["espacios"]
+    
+    asignadas = df_resultado[df_resultado["ESTADO"] == "✅"]
+    horas_resultado = asignadas.groupby(asignadas["MONITOR"].astype(object))['DURACION'].sum().to_dict()
+    
+    franjas = {}
+    for dia, inicio, fin, duracion in zip(
+        df_resultado['DIA_NORM'].tolist(),
+        df_resultado[cfg_esp["col_hora_inicio"]].tolist(),
+        df_resultado[cfg_esp["col_hora_fin"]].tolist(),
+        df_resultado['DURACION'].tolist()
+    ):
+        if pd.isna(dia):
+            continue
+        clave = (dia, inicio, fin, duracion)
+        franjas[clave] = franjas.get(clave, 0) + 1
+    
+    # Duraciones de los espacios a los que puede acceder cada monitor
+    duraciones = [[] for _ in monitores]
+    candidatos_franja = []
+    for (dia, inicio, fin, duracion), cantidad in franjas.items():
+        posiciones = indice.candidatos(dia, inicio, fin)
+        candidatos_franja.append(posiciones)
+        for pos in posiciones:
+            duraciones[pos].append((duracion, cantidad))
+    
+    capacidades = []
+    for m, lista in zip(monitores, duraciones):
+        libres = m["max"] - (m["horas"] - horas_resultado.get(m["nombre"], 0))
+        capacidad = 0
+        for duracion, cantidad in sorted(lista):
+            if duracion <= 0:
+                capacidad += cantidad
+                continue
+            cabe = min(cantidad, int(libres // duracion))
+            capacidad += cabe
+            libres -= cabe * duracion
+            if cabe < cantidad:
+                break
+        capacidades.append(capacidad)
+    
+    fuente = 0
+    sumidero = 1
+    base_monitor = 2 + len(franjas)
+    aristas = []
+    
+    for k, cantidad in enumerate(franjas.values()):
+        aristas.append((fuente, 2 + k, cantidad))
+        for pos in candidatos_franja[k]:
+            aristas.append((2 + k, base_monitor + pos, cantidad))
+    
+    for pos, capacidad in enumerate(capacidades):
+        if capacidad > 0:
+            aristas.append((base_monitor + pos, sumidero, capacidad))
+    
+    return _flujo_maximo(base_monitor + len(monitores), aristas, fuente, sumidero)
+
+
+# ========================================================
+# DIAGNÓSTICO DE ESPACIOS SIN MONITOR
+# ========================================================
+
+def diagnosticar_sin_monitor(sin_monitor, monitores, indice, max_cercanos=3):
+    """
+    Explica por qué cada espacio quedó SIN MONITOR.
+    
+    Se evalúa contra el estado final de los monitores: cuenta los excluidos
+    por disponibilidad, por el tope 'max' y por max_horas_seguidas/cruce
+    (o traslado entre salas), y nombra a los que estuvieron más cerca de
+    poder cubrirlo. Quien ya cubre otro puesto del mismo espacio (OCUPADOS)
+    no cuenta como candidato.
+    """
+    cfg_asig = CONFIG["asignacion"]
+    cfg_esp = CONFIG["espacios"]
+    max_seguidas = cfg_asig.get("max_horas_seguidas")
+    
+    filas = []
+    
+    for espacio in sin_monitor:
+        dia = espacio['DIA_NORM']
+        if pd.isna(dia):
+            continue
+        
+        inicio = espacio[cfg_esp["col_hora_inicio"]]
+        fin = espacio[cfg_esp["col_hora_fin"]]
+        duracion = espacio['DURACION']
+        
+        ocupados = set(espacio.get("OCUPADOS", ()))
+        disponibles = [pos for pos in indice.candidatos(dia, inicio, fin) if monitores[pos]["nombre"] not in ocupados]
+        excl_tope = 0
+        excl_seguidas = 0
+        cercanos = []  # (horas que faltan o sobran, nombre, motivo)
+        
+        for pos in disponibles:
+            m = monitores[pos]
+            exceso = m["horas"] + duracion - m["max"]
+            if exceso > 0:
+                excl_tope += 1
+                cercanos.append((exceso, m["nombre"], "tope max"))
+            elif not verificar_restricciones(m, dia, inicio, fin, espacio[cfg_esp["col_sala"]]):
+                excl_seguidas += 1
+                exceso = bloque_seguido(m, dia, inicio, fin) - max_seguidas if max_seguidas else 0
+                if se_cruza(m, dia, inicio, fin, espacio[cfg_esp["col_sala"]]):
+                    cercanos.append((0, m["nombre"], "cruce"))
+                elif exceso > 0:
+                    cercanos.append((exceso, m["nombre"], "seguidas"))
+                else:
+                    cercanos.append((0, m["nombre"], "traslado"))
+        
+        disponibles_set = set(disponibles)
+        for pos, cubiertas in indice.cobertura_parcial(dia, inicio, fin).items():
+            if pos not in disponibles_set and monitores[pos]["nombre"] not in ocupados:
+                cercanos.append((duracion - cubiertas, monitores[pos]["nombre"], "disponibilidad"))
+        
+        cercanos.sort(key=lambda x: (x[0], x[1]))
+        
+        filas.append({
+            'Sala': espacio[cfg_esp["col_sala"]],
+            'Día': espacio[cfg_esp["col_dia"]],
+            'Inicio': inicio,
+            'Fin': fin,
+            'Curso': espacio[cfg_esp["col_curso"]],
+            'Excl. Disponibilidad': len(monitores) - len(ocupados) - len(disponibles),
+            'Excl. Tope Max': excl_tope,
+            'Excl. Seguidas/Cruce': excl_seguidas,
+            'Más Cercanos': ", ".join(
+                f"{nombre} ({motivo} {horas:+g}h)" for horas, nombre, motivo in cercanos[:max_cercanos]
+            )
+        })
+    
+    return pd.DataFrame(filas)
+
+
+# ========================================================
+# VALIDACIÓN DE LA SOLUCIÓN
+# ========================================================
+#
+# Revisa el resultado contra los datos de entrada sin repetir el algoritmo:
+# solo usa las filas asignadas del DataFrame y 'disp'/'max' de cada monitor
+# (no sus 'asignaciones' ni 'horas', que son estado del propio algoritmo).
+# Todo sale de ordenar y agrupar, O(n log n) en el número de asignaciones.
+
+COLUMNAS_VALIDACION = ['Tipo', 'Monitor', 'Sala', 'Día', 'Inicio', 'Fin', 'Detalle']
+
+
+def _violaciones(tipo, nombres, filas, detalle):
+    """Filas de violación de un mismo tipo (filas: DataFrame ya recortado)"""
+    cfg_esp = CONFIG["espacios"]
+    return pd.DataFrame({
+        'Tipo': tipo,
+        'Monitor': nombres,
+        'Sala': filas[cfg_esp["col_sala"]].astype(object).to_numpy() if filas is not None else None,
+        'Día': filas['DIA_NORM'].astype(object).to_numpy() if filas is not None else None,
+        'Inicio': filas['_inicio'].to_numpy() if filas is not None else None,
+        'Fin': filas['_fin'].to_numpy() if filas is not None else None,
+        'Detalle': detalle
+    }, columns=COLUMNAS_VALIDACION)
+
+
+def validar_resultado(df_resultado, monitores, max_horas_seguidas=None):
+    """
+    Comprueba disponibilidad, tope 'max', cruces, max_horas_seguidas y traslados.
+    
+    Devuelve un DataFrame con una fila por violación (vacío si la solución
+    es válida). Dos filas del mismo monitor en la misma sala y franja son
+    el mismo espacio con varios cursos y no cuentan como cruce, salvo que
+    sean dos puestos del mismo espacio. Un bloque seguido encadena franjas
+    que se tocan o se cruzan y solo cuenta si une al menos dos, con la misma
+    regla que bloque_seguido usa al asignar.
+    """
+    cfg_esp = CONFIG["espacios"]
+    if max_horas_seguidas is None:
+        max_horas_seguidas = CONFIG["asignacion"].get("max_horas_seguidas")
+    
+    col_sala = cfg_esp["col_sala"]
+    asignadas = df_resultado[df_resultado["ESTADO"] == "✅"]
+    
+    pos_de = {m["nombre"]: pos for pos, m in enumerate(monitores)}
+    pos = asignadas["MONITOR"].map(pos_de)
+    partes = []
+    
+    desconocidos = pos.isna()
+    if desconocidos.any():
+        filas = asignadas[desconocidos].assign(
+            _inicio=asignadas[cfg_esp["col_hora_inicio"]], _fin=asignadas[cfg_esp["col_hora_fin"]]
+        )
+        partes.append(_violaciones("monitor", filas["MONITOR"].to_numpy(), filas, "no está en la lista de monitores"))
+    
+    dias = asignadas.loc[~desconocidos, 'DIA_NORM'].astype(object).to_numpy()
+    codigo_dia = {dia: k for k, dia in enumerate(
+        set(dias.tolist()).union(*(m["disp"] for m in monitores))
+    )}
+    
+    a = pd.DataFrame({
+        '_pos': pos[~desconocidos].astype(np.int64).to_numpy(),
+        '_dia': np.array([codigo_dia[d] for d in dias.tolist()], dtype=np.int64),
+        'DIA_NORM': asignadas.loc[~desconocidos, 'DIA_NORM'].astype(object).to_numpy(),
+        col_sala: asignadas.loc[~desconocidos, col_sala].astype(object).to_numpy(),
+        '_inicio': asignadas.loc[~desconocidos, cfg_esp["col_hora_inicio"]].to_numpy(dtype=np.int64),
+        '_fin': asignadas.loc[~desconocidos, cfg_esp["col_hora_fin"]].to_numpy(dtype=np.int64),
+        '_duracion': asignadas.loc[~desconocidos, 'DURACION'].to_numpy(dtype=np.int64),
+        '_espacio': asignadas.index[~desconocidos.to_numpy()]
+    })
+    nombres = np.array([m["nombre"] for m in monitores] + [""], dtype=object)
+    
+    # Disponibilidad: hay un rango con inicio <= franja.inicio y fin >= franja.fin
+    # si el mayor fin entre los rangos que empiezan a tiempo alcanza a cubrirla
+    rangos = pd.DataFrame(
+        [(p, codigo_dia[dia], r_inicio, r_fin)
+         for p, m in enumerate(monitores)
+         for dia, lista in m["disp"].items()
+         for r_inicio, r_fin in lista],
+        columns=['_pos', '_dia', '_r_inicio', '_r_fin'], dtype=np.int64
+    )
+    rangos = rangos.sort_values(['_pos', '_dia', '_r_inicio', '_r_fin'])
+    rangos['_r_fin'] = rangos.groupby(['_pos', '_dia'], sort=False)['_r_fin'].cummax()
+    
+    cruce = pd.merge_asof(
+        a.reset_index().sort_values('_inicio', kind='stable'), rangos.sort_values('_r_inicio', kind='stable'),
+        left_on='_inicio', right_on='_r_inicio', by=['_pos', '_dia'], direction='backward'
+    ).set_index('index').sort_index()
+    fuera = ~(cruce['_r_fin'] >= cruce['_fin'])
+    if fuera.any():
+        filas = a[fuera.to_numpy()]
+        partes.append(_violaciones(
+            "disponibilidad", nombres[filas['_pos']], filas, "fuera de los horarios disponibles del monitor"
+        ))
+    
+    # Tope 'max' (las horas se cuentan por fila, igual que el algoritmo)
+    horas = np.bincount(a['_pos'], weights=a['_duracion'], minlength=len(monitores))
+    topes = np.array([m["max"] for m in monitores], dtype=float)
+    excedidos = np.flatnonzero(horas > topes)
+    if len(excedidos):
+        partes.append(_violaciones(
+            "max", nombres[excedidos], None,
+            [f"{horas[p]:g}h asignadas, máximo {topes[p]:g}h" for p in excedidos]
+        ))
+    
+    # Un monitor no puede ocupar dos puestos del mismo espacio
+    if 'PUESTO' in df_resultado.columns:
+        repetidos = a.duplicated(['_espacio', '_pos']).to_numpy()
+        if repetidos.any():
+            filas = a[repetidos]
+            partes.append(_violaciones(
+                "puesto", nombres[filas['_pos']], filas, "ocupa más de un puesto del mismo espacio"
+            ))
+    
+    # Cruces y bloques seguidos, por monitor y día en orden de inicio
+    b = a.drop_duplicates(['_pos', '_dia', col_sala, '_inicio', '_fin'])
+    b = b.sort_values(['_pos', '_dia', '_inicio', '_fin'], kind='stable')
+    fin_previo = b.groupby(['_pos', '_dia'], sort=False)['_fin'].cummax()
+    fin_previo = fin_previo.groupby([b['_pos'], b['_dia']], sort=False).shift()
+    
+    cruzadas = (b['_inicio'] < fin_previo).to_numpy()
+    if cruzadas.any():
+        filas = b[cruzadas]
+        partes.append(_violaciones(
+            "cruce", nombres[filas['_pos']], filas,
+            [f"se cruza con otra franja del mismo día que termina a las {f:g}" for f in fin_previo[cruzadas]]
+        ))
+    
+    traslados = CONFIG["asignacion"].get("traslados")
+    if traslados and len(b):
+        anterior = b.groupby(['_pos', '_dia'], sort=False)[[col_sala, '_fin']].shift()
+        minutos = traslados["minutos"]
+        necesarios = np.array([
+            minutos.get(_canonico(origen), {}).get(_canonico(destino), 0) if isinstance(origen, str) else 0
+            for origen, destino in zip(anterior[col_sala].tolist(), b[col_sala].tolist())
+        ])
+        hueco = (b['_inicio'] - anterior['_fin']).to_numpy(dtype=float)
+        # Un hueco negativo entre salas distintas es estar en dos salas a la vez
+        otra_sala = np.array([
+            isinstance(origen, str) and _canonico(origen) != _canonico(destino)
+            for origen, destino in zip(anterior[col_sala].tolist(), b[col_sala].tolist())
+        ], dtype=bool)
+        tarde = ((hueco >= 0) & (necesarios > hueco * 60)) | ((hueco < 0) & otra_sala)
+        if tarde.any():
+            filas = b[tarde]
+            partes.append(_violaciones(
+                "traslado", nombres[filas['_pos']], filas,
+                [f"se superpone con {origen}" if h < 0 else f"{m:g} min desde {origen} con {h:g}h de hueco"
+                 for m, origen, h in zip(necesarios[tarde], anterior[col_sala][tarde], hueco[tarde])]
+            ))
+    
+    if max_horas_seguidas:
+        nuevo_bloque = ~(b['_inicio'] <= fin_previo).to_numpy()
+        bloques = b.assign(_bloque=np.cumsum(nuevo_bloque)).groupby('_bloque').agg(
+            _pos=('_pos', 'first'), DIA_NORM=('DIA_NORM', 'first'), _sala=(col_sala, 'first'),
+            _inicio=('_inicio', 'min'), _fin=('_fin', 'max'), _franjas=('_inicio', 'size')
+        ).rename(columns={'_sala': col_sala})
+        # Una franja sola no es un bloque seguido (bloque_seguido da 0 si no toca a otra)
+        largos = bloques[((bloques['_fin'] - bloques['_inicio']) > max_horas_seguidas) & (bloques['_franjas'] > 1)]
+        if len(largos):
+            partes.append(_violaciones(
+                "seguidas", nombres[largos['_pos']], largos,
+                [f"bloque de {f - i}h seguidas, máximo {max_horas_seguidas}h"
+                 for i, f in zip(largos['_inicio'], largos['_fin'])]
+            ))
+    
+    if not partes:
+        return pd.DataFrame(columns=COLUMNAS_VALIDACION)
+    return pd.concat(partes, ignore_index=True)
+
+
+# ========================================================
+# REPORTE Y EXPORTACIÓN
+# ========================================================
+
+def generar_reporte(df_result, monitores, sin_monitor, cota, df_diagnostico, ms_diagnostico):
+    """Texto del reporte que ven la GUI y los modos por lotes"""
+    exitosos = int((df_result["ESTADO"] == "✅").sum())
+    total = len(df_result)
+    
+    if exitosos >= cota:
+        veredicto = "→ Cobertura máxima posible: lo que falta es un problema de datos"
+    else:
+        veredicto = f"→ El algoritmo podría cubrir hasta {cota - exitosos} espacios más"
+    
+    puestos = ""
+    if 'PUESTO' in df_result.columns:
+        varios = df_result[df_result['REQUERIDOS'] > 1]
+        cubiertos = (varios["ESTADO"] == "✅").groupby(level=0).sum()
+        requeridos = varios['REQUERIDOS'].groupby(level=0).first()
+        puestos = (
+            f"\n   Espacios con varios monitores: {len(requeridos)}"
+            f" · completos {int((cubiertos >= requeridos).sum())}"
+            f" · parciales {int(((cubiertos > 0) & (cubiertos < requeridos)).sum())}"
+            f" · sin cubrir {int((cubiertos == 0).sum())}"
+        )
+    
+    conservadas = ""
+    arranque = df_result.attrs.get("arranque")
+    if arranque:
+        conservadas = (
+            f"\n   Conservadas de la corrida previa: {arranque['conservadas']}"
+            f" de {arranque['previas']}"
+        )
+    
+    preferencias = ""
+    resumen_pref = resumen_preferencias(monitores)
+    if resumen_pref["monitores"]:
+        etiquetas = {"jornada": "jornada", "dia": "día", "sala": "sala"}
+        preferencias = (
+            f"\n   Preferencias cumplidas ({resumen_pref['monitores']} monitores): "
+            + " · ".join(f"{etiquetas[tipo]} {pct:.0f}%" for tipo, pct in resumen_pref["porcentajes"].items())
+            + f" · {resumen_pref['evitadas']} franjas en algo a evitar"
+        )
+    
+    reporte = f"""
+📊 REPORTE DE ASIGNACIÓN
+{'='*50}
+
+🎯 Resumen:
+   Total horarios: {total}
+   Asignados: {exitosos} ({exitosos*100/total:.1f}%)
+   Sin monitor: {len(sin_monitor)} ({len(sin_monitor)*100/total:.1f}%)
+   Cota superior: {cota} ({cota*100/total:.1f}%) · brecha {max(cota - exitosos, 0)}
+   {veredicto}{puestos}{conservadas}{preferencias}
+
+👥 Monitores:
+"""
+    
+    for m in sorted(monitores, key=lambda x: x["horas"], reverse=True):
+        if m["horas"] > 0:
+            status = "✅"
+            if m["horas"] < m["min"]:
+                status = f"⚠️ <{m['min']}h"
+            elif m["horas"] > m["max"]:
+                status = f"❌ >{m['max']}h"
+    
+            reporte += f"\n   {m['nombre'][:30]:30} | {m['horas']:2}h {status}"
+    
+    if not df_diagnostico.empty:
+        reporte += f"\n\n🔍 Diagnóstico sin monitor ({ms_diagnostico:.1f} ms):"
+        for _, d in df_diagnostico.head(15).iterrows():
+            reporte += (
+                f"\n   {str(d['Sala'])[:12]:12} {str(d['Día'])[:9]:9} {d['Inicio']}-{d['Fin']}"
+                f" | disp ✗{d['Excl. Disponibilidad']} tope ✗{d['Excl. Tope Max']}"
+                f" seguidas ✗{d['Excl. Seguidas/Cruce']}"
+            )
+            if d['Más Cercanos']:
+                reporte += f"\n      ↳ {d['Más Cercanos']}"
+        if len(df_diagnostico) > 15:
+            reporte += f"\n   ... y {len(df_diagnostico) - 15} más (ver hoja 'Diagnóstico')"
+    
+    t0 = time.perf_counter()
+    df_validacion = validar_resultado(df_result, monitores)
+    ms_validacion = (time.perf_counter() - t0) * 1000
+    
+    if df_validacion.empty:
+        reporte += f"\n\n🔎 Validación ({ms_validacion:.1f} ms): ✅ disponibilidad, topes, cruces y horas seguidas"
+        if CONFIG["asignacion"].get("traslados"):
+            reporte += " · traslados"
+    else:
+        conteo = df_validacion['Tipo'].value_counts()
+        reporte += (
+            f"\n\n🔎 Validación ({ms_validacion:.1f} ms): ⚠️ {len(df_validacion)} violaciones ("
+            + ", ".join(f"{tipo} {n}" for tipo, n in conteo.items()) + ")"
+        )
+        for _, v in df_validacion.head(15).iterrows():
+            franja = "" if pd.isna(v['Día']) else f" {str(v['Sala'])[:12]:12} {str(v['Día'])[:9]:9} {v['Inicio']}-{v['Fin']}"
+            reporte += f"\n   {str(v['Monitor'])[:30]:30}{franja} | {v['Tipo']}: {v['Detalle']}"
+        if len(df_validacion) > 15:
+            reporte += f"\n   ... y {len(df_validacion) - 15} más (ver hoja 'Validación')"
+    
+    return reporte
+
+
+def tabla_monitores(monitores):
+    """Hoja 'Resumen Monitores' del archivo exportado"""
+    tabla = pd.DataFrame([{
+        'Monitor': m['nombre'],
+        'Horas': m['horas'],
+        'Min': m['min'],
+        'Max': m['max'],
+        'Horarios': len(m['asignaciones']),
+        'Estado': '✅' if m['min'] <= m['horas'] <= m['max'] else '⚠️'
+    } for m in monitores])
+    
+    if any(m.get("pref") for m in monitores):
+        tabla['% Preferencia'] = [
+            round(100 * sum(
+                puntaje_preferencia(m, a["dia"], a["inicio"], a.get("sala")) > 0 for a in m["asignaciones"]
+            ) / len(m["asignaciones"])) if m.get("pref") and m["asignaciones"] else None
+            for m in monitores
+        ]
+    
+    return tabla.sort_values('Horas', ascending=False)
+
+
+def exportar_resultado(ruta, df_resultado, monitores, df_diagnostico=None, traza=None):
+    """Escribe el libro de resultados (Asignaciones, Resumen Monitores, Diagnóstico, Validación y Traza)"""
+    df_validacion = validar_resultado(df_resultado, monitores)
+    
+    with pd.ExcelWriter(ruta, engine='openpyxl') as writer:
+        df_resultado.to_excel(writer, sheet_name='Asignaciones', index=False)
+        tabla_monitores(monitores).to_excel(writer, sheet_name='Resumen Monitores', index=False)
+        if df_diagnostico is not None and not df_diagnostico.empty:
+            df_diagnostico.to_excel(writer, sheet_name='Diagnóstico', index=False)
+        if not df_validacion.empty:
+            df_validacion.to_excel(writer, sheet_name='Validación', index=False)
+        if traza is not None and traza.n:
+            traza.tabla(monitores).to_excel(writer, sheet_name='Traza', index=False)
@@ -0,0 +1,341 @@
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import pandas as pd
+
+from motor_asignacion import (
+    CONFIG, IndiceDisponibilidad, asignar_monitores, verificar_restricciones,
+    cargar_monitores_desde_archivo, cargar_espacios_desde_archivo,
+    preparar_espacios, normalizar_dia, resumen_asignacion, diagnosticar_sin_monitor,
+    espacios_sin_monitor, cargar_traslados, _canonico
+)
+
+
+# ========================================================
+# SERVICIO LOCAL DE ASIGNACIÓN (HTTP/JSON, solo stdlib)
+# ========================================================
+#
+#   GET  /estado                                   -> tamaño de los datos y versión
+#   GET  /candidatos?sala=&dia=&inicio=&fin=       -> quién la cubre (todos los puestos) y quién podría
+#   POST /resolver                                 -> asignación completa
+#   POST /cambio   {"tipo": ..., ...}              -> cambio puntual + reasignación incremental
+#   GET  /reporte                                  -> resumen, carga y diagnóstico
+#
+# La reasignación tras un cambio arranca de la solución vigente (como
+# asignar_monitores con previo): conserva los pares que siguen siendo
+# factibles y solo resuelve lo que el cambio dejó libre. POST /resolver
+# siempre resuelve desde cero.
+#
+# Tipos de cambio:
+#   {"tipo": "disponibilidad", "monitor": "...", "dia": "jueves", "rangos": [[14, 18]]}
+#   {"tipo": "topes", "monitor": "...", "min": 8, "max": 20}
+#   {"tipo": "agregar_espacio", "espacio": {"SALA": ..., "DIA": ..., "HORA_INICIO": ..., ...}}
+#   {"tipo": "quitar_espacio", "sala": "...", "dia": "...", "inicio": 14}
+
+RAZONES = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+
+
+def _resolver_en_proceso(monitores, df_espacios, cfg_asignacion, previo=None):
+    """Se ejecuta en el pool: los datos llegan copiados, el estado del servicio no se toca"""
+    CONFIG["asignacion"].update(cfg_asignacion)
+    df_resultado, _, monitores = asignar_monitores(monitores, df_espacios, previo=previo)
+    return df_resultado, monitores
+
+
+def _json_default(valor):
+    """Tipos de numpy/pandas que json no conoce"""
+    if isinstance(valor, np.integer):
+        return int(valor)
+    if isinstance(valor, np.floating):
+        return None if np.isnan(valor) else float(valor)
+    return str(valor)
+
+
+class EstadoServicio:
+    """
+    Datos cargados una sola vez, con el índice de disponibilidad caliente.
+
+    Las consultas se responden en el propio bucle de eventos (solo leen el
+    índice y la última solución); las asignaciones completas van al pool de
+    procesos bajo un candado, y los cambios reindexan solo lo que tocan.
+    """
+
+    def __init__(self, monitores, df_espacios, procesos=1):
+        self.monitores = monitores
+        self.df_espacios = df_espacios
+        self.indice = IndiceDisponibilidad(monitores)
+        self.version = 0
+
+        self.df_resultado = None
+        self.monitores_asignados = None
+        self.version_resultado = None
+        self._monitores_en_franja = {}  # (sala, día, inicio) -> monitores por puesto
+
+        self._candado = asyncio.Lock()
+        self._tareas = set()  # tareas en segundo plano (el bucle solo guarda referencias débiles)
+        self.pool = ProcessPoolExecutor(max_workers=procesos)
+
+    # ---------------- consultas ----------------
+
+    def estado(self):
+        return {
+            "monitores": len(self.monitores),
+            "espacios": len(self.df_espacios),
+            "version": self.version,
+            "version_resultado": self.version_resultado
+        }
+
+    def candidatos(self, sala, dia, inicio, fin):
+        dia_norm = normalizar_dia(dia)
+        inicio = int(inicio)
+        fin = int(fin)
+
+        actuales = self._monitores_en_franja.get((_canonico(sala), dia_norm, inicio), []) if sala else []
+
+        disponibles = []
+        for pos in self.indice.candidatos(dia_norm, inicio, fin):
+            m = self.monitores[pos]
+            item = {"nombre": m["nombre"], "min": m["min"], "max": m["max"]}
+
+            if self.monitores_asignados is not None:
+                asignado = self.monitores_asignados[pos]
+                item["horas"] = asignado["horas"]
+                item["puede_tomarlo"] = (
+                    asignado["horas"] + (fin - inicio) <= asignado["max"]
+                    and verificar_restricciones(asignado, dia_norm, inicio, fin, sala)
+                )
+            disponibles.append(item)
+
+        return {
+            "sala": sala,
+            "dia": dia_norm,
+            "inicio": inicio,
+            "fin": fin,
+            "monitor_actual": actuales[0] if actuales else None,
+            "monitores_actuales": actuales,
+            "disponibles": disponibles
+        }
+
+    def reporte(self):
+        if self.df_resultado is None:
+            raise ValueError("Todavía no hay asignación; use POST /resolver")
+
+        sin_monitor = espacios_sin_monitor(self.df_resultado)
+        df_diagnostico = diagnosticar_sin_monitor(sin_monitor, self.monitores_asignados, self.indice)
+
+        return {
+            "version": self.version_resultado,
+            "resumen": resumen_asignacion(self.df_resultado, self.monitores_asignados),
+            "monitores": [
+                {"nombre": m["nombre"], "horas": m["horas"], "min": m["min"], "max": m["max"]}
+                for m in sorted(self.monitores_asignados, key=lambda x: x["horas"], reverse=True)
+            ],
+            "sin_monitor": df_diagnostico.to_dict("records")
+        }
+
+    # ---------------- asignación ----------------
+
+    async def resolver(self, incremental=False):
+        """
+        Asignación completa en el pool.
+
+        Con incremental=True (y una solución previa) se parte de esa
+        solución: sus pares siguen si todavía son factibles y solo se
+        resuelve el resto.
+        """
+        async with self._candado:
+            version = self.version
+            t0 = time.perf_counter()
+            previo = self.df_resultado if incremental else None
+
+            loop = asyncio.get_running_loop()
+            df_resultado, monitores = await loop.run_in_executor(
+                self.pool, _resolver_en_proceso,
+                self.monitores, self.df_espacios, dict(CONFIG["asignacion"]), previo
+            )
+
+            # Quién cubre cada franja: un monitor por puesto ocupado, en orden
+            # de puesto (varios espacios de la misma sala y hora se suman)
+            cfg_esp = CONFIG["espacios"]
+            puestos = df_resultado["PUESTO"].tolist() if "PUESTO" in df_resultado.columns else [1] * len(df_resultado)
+            en_franja = {}
+            for sala, dia, inicio, puesto, monitor, estado in zip(
+                df_resultado[cfg_esp["col_sala"]].tolist(),
+                df_resultado["DIA_NORM"].tolist(),
+                df_resultado[cfg_esp["col_hora_inicio"]].tolist(),
+                puestos,
+                df_resultado["MONITOR"].tolist(),
+                df_resultado["ESTADO"].tolist()
+            ):
+                if estado == "✅":
+                    en_franja.setdefault((_canonico(sala), dia, inicio), []).append((puesto, monitor))
+            self._monitores_en_franja = {
+                clave: [monitor for _, monitor in sorted(titulares, key=lambda t: t[0])]
+                for clave, titulares in en_franja.items()
+            }
+            self.df_resultado = df_resultado
+            self.monitores_asignados = monitores
+            self.version_resultado = version
+
+            respuesta = {
+                "version": version,
+                "ms": round((time.perf_counter() - t0) * 1000, 1),
+                "resumen": resumen_asignacion(df_resultado, monitores)
+            }
+            if previo is not None:
+                respuesta["conservadas"] = df_resultado.attrs["arranque"]["conservadas"]
+            return respuesta
+
+    def _buscar_monitor(self, nombre):
+        buscado = _canonico(nombre)
+        for pos, m in enumerate(self.monitores):
+            if _canonico(m["nombre"]) == buscado:
+                return pos
+        raise ValueError(f"Monitor no encontrado: {nombre}")
+
+    async def aplicar_cambio(self, cambio):
+        cfg_esp = CONFIG["espacios"]
+        tipo = cambio.get("tipo")
+
+        async with self._candado:
+            if tipo == "disponibilidad":
+                pos = self._buscar_monitor(cambio["monitor"])
+                dia = normalizar_dia(cambio["dia"])
+                self.monitores[pos]["disp"][dia] = [(int(a), int(b)) for a, b in cambio["rangos"]]
+                self.indice.actualizar_monitor(pos)
+
+            elif tipo == "topes":
+                pos = self._buscar_monitor(cambio["monitor"])
+                for campo in ("min", "max"):
+                    if campo in cambio:
+                        self.monitores[pos][campo] = int(cambio[campo])
+
+            elif tipo == "agregar_espacio":
+                nuevo = preparar_espacios(pd.DataFrame([cambio["espacio"]]))
+                df = pd.concat([self.df_espacios, nuevo], ignore_index=True)
+                for col in (cfg_esp["col_sala"], cfg_esp["col_dia"], cfg_esp["col_curso"], "DIA_NORM"):
+                    df[col] = df[col].astype("category")
+                self.df_espacios = df
+
+            elif tipo == "quitar_espacio":
+                df = self.df_espacios
+                quitar = (
+                    (df[cfg_esp["col_sala"]].map(_canonico).astype(str) == _canonico(cambio["sala"]))
+                    & (df["DIA_NORM"].astype(str) == normalizar_dia(cambio["dia"]))
+                    & (df[cfg_esp["col_hora_inicio"]] == int(cambio["inicio"]))
+                )
+                if not quitar.any():
+                    raise ValueError("No hay espacio en esa sala, día y hora")
+                self.df_espacios = df[~quitar].reset_index(drop=True)
+
+            else:
+                raise ValueError(f"Tipo de cambio desconocido: {tipo}")
+
+            self.version += 1
+
+        return await self.resolver(incremental=True)
+
+    # ---------------- HTTP ----------------
+
+    async def despachar(self, metodo, ruta, params, cuerpo):
+        if metodo == "GET" and ruta == "/estado":
+            return 200, self.estado()
+        if metodo == "GET" and ruta == "/candidatos":
+            return 200, self.candidatos(params.get("sala"), params["dia"], params["inicio"], params["fin"])
+        if metodo == "GET" and ruta == "/reporte":
+            return 200, self.reporte()
+        if metodo == "POST" and ruta == "/resolver":
+            return 200, await self.resolver()
+        if metodo == "POST" and ruta == "/cambio":
+            return 200, await self.aplicar_cambio(json.loads(cuerpo or b"{}"))
+        return 404, {"error": f"Ruta no encontrada: {metodo} {ruta}"}
+
+    async def atender(self, reader, writer):
+        try:
+            try:
+                linea = await reader.readline()
+                metodo, destino, _ = linea.decode("latin-1").split(" ", 2)
+
+                cabeceras = {}
+                while True:
+                    linea = await reader.readline()
+                    if linea in (b"\r\n", b"\n", b""):
+                        break
+                    clave, _, valor = linea.decode("latin-1").partition(":")
+                    cabeceras[clave.strip().lower()] = valor.strip()
+
+                cuerpo = await reader.readexactly(int(cabeceras.get("content-length") or 0))
+                url = urlsplit(destino)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+                codigo, datos = await self.despachar(metodo, url.path, params, cuerpo)
+            except (ValueError, KeyError) as e:
+                codigo, datos = 400, {"error": str(e)}
+            except Exception as e:
+                codigo, datos = 500, {"error": str(e)}
+
+            cuerpo = json.dumps(datos, ensure_ascii=False, default=_json_default).encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {codigo} {RAZONES[codigo]}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(cuerpo)}\r\n"
+                f"Connection: close\r\n\r\n".encode("latin-1") + cuerpo
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+    def _tarea_terminada(self, tarea):
+        """Suelta la referencia y muestra el error si la tarea falló"""
+        self._tareas.discard(tarea)
+        if not tarea.cancelled() and tarea.exception() is not None:
+            print(f"❌ Falló la asignación en segundo plano: {tarea.exception()}")
+
+    async def servir(self, host, puerto):
+        servidor = await asyncio.start_server(self.atender, host, puerto)
+        print(f"🚀 Servicio de asignación en http://{host}:{puerto}")
+
+        tarea = asyncio.create_task(self.resolver())
+        self._tareas.add(tarea)
+        tarea.add_done_callback(self._tarea_terminada)
+
+        try:
+            async with servidor:
+                await servidor.serve_forever()
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+
+
+# ========================================================
+# MAIN
+# ========================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servicio local de asignación de monitores")
+    parser.add_argument("--monitores", required=True, help="Excel o .parquet/.arrow de monitores")
+    parser.add_argument("--espacios", required=True, help="Excel o .parquet/.arrow de espacios")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--procesos", type=int, default=1, help="Procesos para resolver")
+    parser.add_argument("--traslados", help="Excel con la matriz de minutos de traslado entre salas")
+    args = parser.parse_args()
+
+    if args.traslados:
+        CONFIG["asignacion"]["traslados"] = cargar_traslados(args.traslados)
+
+    print("📂 Cargando datos...")
+    monitores = cargar_monitores_desde_archivo(args.monitores)
+    df_espacios = cargar_espacios_desde_archivo(args.espacios)
+    print(f"✅ {len(monitores)} monitores, {len(df_espacios)} espacios")
+
+    estado = EstadoServicio(monitores, df_espacios, procesos=args.procesos)
+
+    try:
+        asyncio.run(estado.servir(args.host, args.puerto))
+    except KeyboardInterrupt:
+        print("\n👋 Servicio detenido")
@@ -0,0 +1,230 @@
+import argparse
+import copy
+import hashlib
+import os
+import time
+from datetime import datetime
+
+from motor_asignacion import (
+    CONFIG, IndiceDisponibilidad, asignar_monitores, asignar_por_dia,
+    cargar_monitores_desde_archivo, cargar_espacios_desde_archivo,
+    cota_superior_cobertura, diagnosticar_sin_monitor, generar_reporte,
+    exportar_resultado, resumen_asignacion, cargar_traslados, CacheCorridas
+)
+
+
+# ========================================================
+# VIGILANCIA DE CARPETA
+# ========================================================
+#
+# Revisa cada `intervalo` segundos la firma (mtime, tamaño) de los dos
+# libros; en reposo eso son dos stat() por ciclo. Un cambio se atiende
+# cuando el archivo lleva `espera` segundos quieto, así una ráfaga de
+# guardados produce una sola corrida. Antes de parsear se compara el hash
+# del contenido: guardar sin cambios no dispara nada, y solo se vuelve a
+# leer el libro que cambió.
+
+def hash_archivo(ruta, bloque=1 << 20):
+    """SHA-256 del contenido del archivo"""
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for trozo in iter(lambda: f.read(bloque), b""):
+            h.update(trozo)
+    return h.hexdigest()
+
+
+def _firma(ruta):
+    try:
+        st = os.stat(ruta)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class VigilanteCarpeta:
+    def __init__(self, ruta_monitores, ruta_espacios, salida, intervalo=2.0, espera=5.0):
+        self.rutas = {"monitores": ruta_monitores, "espacios": ruta_espacios}
+        self.cargadores = {
+            "monitores": cargar_monitores_desde_archivo,
+            "espacios": cargar_espacios_desde_archivo
+        }
+        self.salida = salida
+        self.intervalo = intervalo
+        self.espera = espera
+
+        self.firmas = {tipo: None for tipo in self.rutas}
+        self.pendientes = {}  # tipo -> instante del último cambio visto
+        self.cache = {}  # tipo -> (hash, datos)
+        self.indice = None  # depende solo de los monitores
+        self.sin_resolver = set()  # libros releídos cuya corrida quedó pendiente
+        self.corridas = 0
+        self.cache_corridas = CacheCorridas()  # p. ej. un libro que vuelve a una versión anterior
+
+        os.makedirs(salida, exist_ok=True)
+        self.ruta_log = os.path.join(salida, "corridas.log")
+
+    def log(self, mensaje):
+        linea = f"{datetime.now().isoformat(timespec='seconds')} {mensaje}"
+        print(linea)
+        try:
+            with open(self.ruta_log, "a", encoding="utf-8") as f:
+                f.write(linea + "\n")
+        except OSError as e:
+            # Un log bloqueado o en un disco lleno no detiene la vigilancia
+            print(f"{datetime.now().isoformat(timespec='seconds')} ⚠️ No se pudo escribir el log: {e}")
+
+    def _recargar(self, tipo):
+        """Vuelve a leer un libro solo si su contenido cambió; devuelve True si cambió"""
+        ruta = self.rutas[tipo]
+        digest = hash_archivo(ruta)
+
+        if tipo in self.cache and self.cache[tipo][0] == digest:
+            return False
+
+        t0 = time.perf_counter()
+        datos = self.cargadores[tipo](ruta)
+        self.cache[tipo] = (digest, datos)
+        self.log(f"📂 {os.path.basename(ruta)} leído ({(time.perf_counter() - t0) * 1000:.0f} ms, {digest[:10]})")
+
+        if tipo == "monitores":
+            self.indice = IndiceDisponibilidad(datos)
+        return True
+
+    def procesar(self, tipos):
+        try:
+            for tipo in tipos:
+                if self._recargar(tipo):
+                    self.sin_resolver.add(tipo)
+        except Exception as e:
+            # Libro a medio guardar o con errores: se reintenta en el próximo cambio
+            self.log(f"❌ No se pudo leer: {e}")
+            return
+
+        cambiaron = sorted(self.sin_resolver)
+        if not cambiaron:
+            self.log("↺ Sin cambios de contenido; no se recalcula")
+            return
+        if len(self.cache) < 2:
+            return
+        self.sin_resolver.clear()
+
+        try:
+            self._corrida(cambiaron)
+        except Exception as e:
+            # Falla al resolver o exportar (p. ej. el xlsx abierto en Excel): se
+            # reintenta con el próximo cambio y la vigilancia sigue
+            self.sin_resolver.update(cambiaron)
+            self.log(f"❌ Falló la corrida: {type(e).__name__}: {e}")
+
+    def _corrida(self, cambiaron):
+        """Resuelve (o toma de la caché), exporta y registra una corrida"""
+        monitores = copy.deepcopy(self.cache["monitores"][1])
+        df_espacios = self.cache["espacios"][1]
+        por_dia = CONFIG["asignacion"].get("particionar_por_dia")
+        clave = self.cache_corridas.clave(monitores, df_espacios, "por_dia" if por_dia else "normal")
+        corrida = self.cache_corridas.obtener(clave)
+
+        t0 = time.perf_counter()
+        if corrida is None:
+            if por_dia:
+                df_resultado, sin_monitor, monitores = asignar_por_dia(monitores, df_espacios, indice=self.indice)
+            else:
+                df_resultado, sin_monitor, monitores = asignar_monitores(monitores, df_espacios, indice=self.indice)
+            cota = cota_superior_cobertura(monitores, df_resultado, self.indice)
+
+            t_diag = time.perf_counter()
+            df_diagnostico = diagnosticar_sin_monitor(sin_monitor, monitores, self.indice)
+            ms_diagnostico = (time.perf_counter() - t_diag) * 1000
+
+            corrida = {
+                "df_resultado": df_resultado,
+                "monitores": monitores,
+                "reporte": generar_reporte(df_resultado, monitores, sin_monitor, cota, df_diagnostico, ms_diagnostico),
+                "diagnostico": df_diagnostico,
+                "cota_superior": cota
+            }
+            self.cache_corridas.guardar(clave, corrida)
+            origen = ""
+        else:
+            origen = ", desde caché"
+        ms_asignacion = (time.perf_counter() - t0) * 1000
+
+        df_resultado, monitores = corrida["df_resultado"], corrida["monitores"]
+        marca = datetime.now().strftime("%Y%m%d_%H%M%S")
+        ruta_xlsx = os.path.join(self.salida, f"Asignacion_{marca}.xlsx")
+        exportar_resultado(ruta_xlsx, df_resultado, monitores, corrida["diagnostico"])
+        with open(os.path.join(self.salida, f"Reporte_{marca}.txt"), "w", encoding="utf-8") as f:
+            f.write(corrida["reporte"])
+
+        self.corridas += 1
+        resumen = resumen_asignacion(df_resultado, monitores)
+        self.log(
+            f"✅ Corrida {self.corridas} ({'+'.join(cambiaron)}): "
+            f"{resumen['asignados']}/{resumen['total']} asignados, cota {corrida['cota_superior']}, "
+            f"{ms_asignacion:.0f} ms{origen} -> {os.path.basename(ruta_xlsx)}"
+        )
+
+    def revisar(self):
+        """Un ciclo: detecta cambios y procesa los que ya se asentaron"""
+        ahora = time.monotonic()
+
+        for tipo, ruta in self.rutas.items():
+            firma = _firma(ruta)
+            if firma != self.firmas[tipo]:
+                self.firmas[tipo] = firma
+                if firma is not None:
+                    self.pendientes[tipo] = ahora
+
+        listos = [tipo for tipo, visto in self.pendientes.items() if ahora - visto >= self.espera]
+        if listos and len(listos) == len(self.pendientes):
+            self.pendientes.clear()
+            self.procesar(listos)
+
+    def vigilar(self):
+        self.log(f"👀 Vigilando {', '.join(self.rutas.values())} (cada {self.intervalo}s, espera {self.espera}s)")
+
+        # Primera corrida sin esperar
+        for tipo, ruta in self.rutas.items():
+            self.firmas[tipo] = _firma(ruta)
+        self.procesar([tipo for tipo, firma in self.firmas.items() if firma is not None])
+
+        while True:
+            time.sleep(self.intervalo)
+            self.revisar()
+
+
+# ========================================================
+# MAIN
+# ========================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recalcula la asignación cuando cambian los libros de una carpeta")
+    parser.add_argument("carpeta", help="Carpeta compartida con los libros")
+    parser.add_argument("--monitores", default="DISPONIBILIDAD HORARIA MONITORES DE SALAS 2025-II.xlsx",
+                        help="Nombre del libro de monitores dentro de la carpeta")
+    parser.add_argument("--espacios", default="Horario_Salas.xlsx",
+                        help="Nombre del libro de espacios dentro de la carpeta")
+    parser.add_argument("--salida", help="Carpeta de exportaciones y log (por defecto CARPETA/resultados)")
+    parser.add_argument("--intervalo", type=float, default=2.0, help="Segundos entre revisiones")
+    parser.add_argument("--espera", type=float, default=5.0, help="Segundos quieto antes de procesar un cambio")
+    parser.add_argument("--traslados", help="Excel con la matriz de minutos de traslado entre salas")
+    parser.add_argument("--cache", metavar="CARPETA", help="Guarda también en disco las corridas reutilizables")
+    args = parser.parse_args()
+
+    if args.traslados:
+        CONFIG["asignacion"]["traslados"] = cargar_traslados(args.traslados)
+    if args.cache:
+        CONFIG["cache"]["carpeta"] = args.cache
+
+    vigilante = VigilanteCarpeta(
+        os.path.join(args.carpeta, args.monitores),
+        os.path.join(args.carpeta, args.espacios),
+        args.salida or os.path.join(args.carpeta, "resultados"),
+        intervalo=args.intervalo,
+        espera=args.espera
+    )
+
+    try:
+        vigilante.vigilar()
+    except KeyboardInterrupt:
+        print("\n👋 Vigilancia detenida")